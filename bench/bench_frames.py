@@ -0,0 +1,260 @@
+# ==============================================================================
+#                    BookRain フレーム処理のベンチマーク(CPython)
+# ==============================================================================
+
+# bench/browser の代替品を使って、ブラウザなしで TheApp を動かし、
+# GameMainScene.onDraw を1フレームずつ実行して以下を計測する。
+#
+#   fps        : 1秒間に処理できたフレーム数(CPython上での値。Brythonでの値とは桁が違うが、
+#                変更前後の比較には使える)
+#   calls/f    : 1フレームあたりの2D contextのメソッド呼び出し回数(fillText、measureTextなど)
+#   sets/f     : 1フレームあたりの2D contextのプロパティ代入回数(font、fillStyleなど)
+#   alloc KiB/f: 1フレームの間に一時的に確保されたメモリの最大量(tracemallocのpeak)
+#   blocks/f   : 1フレームあたりに増えたメモリブロック数(解放されずに残ったもの)
+#   objs       : 計測終了時点で画面上にあるタイトルの数
+#   1st        : 最初のタイトルが届いたフレーム(ウォームアップの何フレーム目か)
+#                --repeat の時は、1回開いてlocalStorageにタイトルが保存された状態(2回目の訪問)での値
+#   gc         : GCSchedulerがgc.collect()を行った回数と、止まっていた時間の最大(ms)
+#                (依頼するのは ?renderer=objects の時だけなので、既定の描き方では 0 / 0.0 になる)
+#   titles     : タイトルの正規化(TitleNormalizer)で変わった数、重複の数、減ったメモリの見積もり
+#
+# --search "?profile=1" の時は、FrameProfilerで計測した段階ごとの時間(p50/p95/p99)も出力する。
+#
+# 同じ条件での比較)
+#   --seed N         : URLに ?seed=N を付けて、乱数をすべて種から作る。何度実行しても同じタイトルが同じように降る。
+#                      (品質の自動調整は実際の処理時間で決まるので、?quality の指定がなければ quality=off にする)
+#   --replay FILE    : ブラウザで ?profile=1&seed=N を付けて開き、Pキーでダウンロードした計測結果(profile.json)を読み、
+#                      そのときのURL、画面の大きさ、dprで開いて、記録したキー入力(ジャンルの切り替えも)をフレームごとに再生する。
+#                      (入力はフレーム単位で再生するので、ブラウザで実際に処理できたフレームと同じ順番になるとは限らない)
+#   --baseline FILE  : 以前に --json で保存した結果と、サイズごとにfpsと段階ごとの時間(p50/p95)を比べる。
+#
+# Book、GameObjectManager、Canvas を変更した時は、変更前後でこれを実行して比較すること。
+#
+# 使い方)
+#   python bench/bench_frames.py
+#   python bench/bench_frames.py --frames 600 --warmup 1200 --sizes 720p,4k --json
+#   python bench/bench_frames.py --seed 1 --search "?profile=1" --json > before.json
+#   python bench/bench_frames.py --seed 1 --search "?profile=1" --baseline before.json
+#   python bench/bench_frames.py --replay profile.json
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# bench/browser を `browser` として読み込ませ、リポジトリ直下のmain.pyなどを読めるようにする。
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+for path in (ROOT_DIR, BENCH_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import browser # noqa: E402
+import browser.ajax # noqa: E402
+from browser.widgets import dialog # noqa: E402
+
+# 計測するcanvasのサイズ
+SIZES:dict[str, tuple[int, int]] = {
+    "720p" : (1280,  720),
+    "1080p": (1920, 1080),
+    "4k"   : (3840, 2160),
+}
+
+# クエリ文字列searchに name=value を加える。(既にあれば変えない)
+def add_query(search:str, name:str, value:str) -> str:
+    params = search.lstrip("?")
+    if any(p.split("=", 1)[0] == name for p in params.split("&") if p):
+        return search
+    return "?" + (params + "&" if params else "") + f"{name}={value}"
+
+# サイズ(width, height)を指定してTheAppを作り直す。
+# search : URLのクエリ文字列
+# latency_ms : 非同期の通信1回にかかる仮想時間
+# dpr : window.devicePixelRatio
+def new_app(width:int, height:int, search:str = "", latency_ms:float = 0.0, dpr:float = 1.0):
+    browser.reset(width, height, search, dpr)
+    browser.ajax.latency_ms = latency_ms
+    import main
+    import req
+    req.clear_cache()
+    return main.TheApp()
+
+# 1つのサイズについて計測する。
+# frames : 計測するフレーム数
+# warmup : 計測前に回すフレーム数(画面がタイトルで埋まるまで回しておく)
+# fps    : 仮想時計を1フレームで進める量(GameTimerに渡しているfpsと同じにしておく)
+def run(width:int, height:int, frames:int, warmup:int, fps:float = 75,
+        alloc_frames:int = 100, search:str = "", latency_ms:float = 0.0, dpr:float = 1.0,
+        repeat:bool = False, replay:dict | None = None) -> dict:
+    dialog.opened.clear()
+    browser.local_storage.clear()
+    if repeat:
+        # 1回目の訪問。読み込みが終わってlocalStorageに保存されるまで回す。
+        app = new_app(width, height, search, latency_ms, dpr)
+        while not app.loader.done:
+            browser.window.advance(1000 / fps)
+    app = new_app(width, height, search, latency_ms, dpr)
+    if replay is not None:
+        # 記録したキー入力を再生する
+        app.keyinput.start_replay(replay)
+    window = browser.window
+    frame_ms = 1000 / fps
+
+    # 最初のタイトルが届くまでのフレーム数
+    first_title = -1
+    for i in range(warmup):
+        window.advance(frame_ms)
+        if first_title < 0 and app.titles:
+            first_title = i + 1
+
+    # 速度と2D contextの呼び出し回数
+    ctx = app.canvas.ctx
+    ctx.reset_counters()
+    start = time.perf_counter()
+    for _ in range(frames):
+        window.advance(frame_ms)
+    elapsed = time.perf_counter() - start
+    calls, sets = ctx.calls, ctx.sets
+    ops = dict(sorted(ctx.ops.items(), key=lambda kv: -kv[1]))
+    # tracemallocで遅くなる前の計測結果
+    profiler = app.gametimer.profiler
+    profile = json.loads(profiler.to_json())["stats"] if profiler is not None else None
+
+    # メモリの確保量(tracemallocは遅いので、速度の計測とは別に回す)
+    peak_total = 0
+    blocks_total = 0
+    tracemalloc.start()
+    for _ in range(alloc_frames):
+        before = tracemalloc.get_traced_memory()[0]
+        blocks = sys.getallocatedblocks()
+        tracemalloc.reset_peak()
+        window.advance(frame_ms)
+        peak_total += tracemalloc.get_traced_memory()[1] - before
+        blocks_total += sys.getallocatedblocks() - blocks
+    tracemalloc.stop()
+
+    if dialog.opened:
+        title, message = dialog.opened[0]
+        raise RuntimeError(f"{title}\n{message}")
+
+    return {
+        "size"      : f"{width}x{height}",
+        "frames"    : frames,
+        "fps"       : frames / elapsed if elapsed else float("inf"),
+        "calls_per_frame": calls / frames,
+        "sets_per_frame" : sets / frames,
+        "alloc_kib_per_frame": peak_total / alloc_frames / 1024 if alloc_frames else 0.0,
+        "blocks_per_frame"   : blocks_total / alloc_frames if alloc_frames else 0.0,
+        "objects"   : app.scene.book_count(),
+        "first_title_frame": first_title,
+        "gc"        : app.gametimer.gc.stats(),
+        "sprites"   : {"count": len(app.canvas.sprites), "pixels": app.canvas.sprites.pixels,
+                       "hits": app.canvas.sprites.hits, "misses": app.canvas.sprites.misses,
+                       "evictions": app.canvas.sprites.evictions},
+        "ops"       : {k: v / frames for k, v in ops.items()},
+        "profile"   : profile,
+        "titles"    : app.titles.normalizer.report() if app.titles.normalizer is not None else None,
+    }
+
+# resultsを、以前の結果baselineとサイズごとに比べて表示する。
+def print_comparison(results:list[dict], baseline:list[dict]):
+    before = {r["size"]: r for r in baseline}
+    for r in results:
+        b = before.get(r["size"])
+        if b is None:
+            print(f"{r['size']:>10} (no baseline)")
+            continue
+        change = (r["fps"] / b["fps"] - 1) * 100 if b["fps"] else 0.0
+        print(f"{r['size']:>10} fps {b['fps']:>10.1f} -> {r['fps']:>10.1f} ({change:+.1f}%)"
+              f"  objs {b['objects']} -> {r['objects']}")
+        if not r.get("profile") or not b.get("profile"):
+            continue
+        print(f"{'':>10} {'phase':>9} {'p50 before':>11} {'after':>8} {'p95 before':>11} {'after':>8}")
+        for name, st in r["profile"].items():
+            old = b["profile"].get(name)
+            if old is None:
+                continue
+            print(f"{'':>10} {name:>9} {old['p50']:>11.3f} {st['p50']:>8.3f} {old['p95']:>11.3f} {st['p95']:>8.3f}")
+
+def main(argv:list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="BookRainのフレーム処理のベンチマーク")
+    parser.add_argument("--frames", type=int, default=600, help="計測するフレーム数")
+    parser.add_argument("--warmup", type=int, default=1200, help="計測前に回すフレーム数")
+    parser.add_argument("--alloc-frames", type=int, default=100, help="メモリ確保量を計測するフレーム数")
+    parser.add_argument("--fps", type=float, default=75, help="1フレームで進める仮想時間(fps)")
+    parser.add_argument("--sizes", default=",".join(SIZES), help="計測するサイズ(720p,1080p,4k か WxH)")
+    parser.add_argument("--search", default="", help="URLのクエリ文字列(例: ?profile=1)")
+    parser.add_argument("--latency", type=float, default=0.0, help="通信1回にかかる仮想時間(ms)")
+    parser.add_argument("--dpr", type=float, default=1.0, help="window.devicePixelRatio")
+    parser.add_argument("--repeat", action="store_true", help="2回目の訪問(localStorageにタイトルがある状態)で計測する")
+    parser.add_argument("--seed", type=int, help="乱数の種(URLに ?seed=N を付ける)")
+    parser.add_argument("--replay", help="ブラウザで ?profile=1 で保存した計測結果(profile.json)のキー入力を再生する")
+    parser.add_argument("--baseline", help="以前に --json で保存した結果と比べる")
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出力する")
+    args = parser.parse_args(argv)
+
+    search = args.search
+    sizes = args.sizes
+    dpr = args.dpr
+    replay = None
+    if args.replay:
+        with open(args.replay, encoding="utf-8") as f:
+            meta = json.load(f).get("meta", {})
+        if "input" not in meta:
+            raise SystemExit(f"{args.replay}: no input record (open the page with ?profile=1)")
+        replay = meta["input"]
+        search = search or meta.get("search", "")
+        if meta.get("width") and meta.get("height"):
+            sizes = f"{meta['width']}x{meta['height']}"
+        dpr = meta.get("dpr") or dpr
+        if meta.get("seed") is None and args.seed is None:
+            print(f"warning: {args.replay} was recorded without ?seed=N; titles will differ", file=sys.stderr)
+    if args.seed is not None:
+        search = add_query(search, "seed", str(args.seed))
+    if args.seed is not None or replay is not None:
+        search = add_query(search, "quality", "off")
+
+    results = []
+    # アプリのprint()(品質の変更、タイトルの正規化の結果など)は、結果と混ざらないように標準エラー出力へ
+    with contextlib.redirect_stdout(sys.stderr):
+        for name in sizes.split(","):
+            name = name.strip().lower()
+            if name in SIZES:
+                width, height = SIZES[name]
+            else:
+                width, height = (int(v) for v in name.split("x"))
+            results.append(run(width, height, args.frames, args.warmup, args.fps,
+                               args.alloc_frames, search, args.latency, dpr, args.repeat, replay))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    print(f"{'size':>10} {'fps':>10} {'calls/f':>8} {'sets/f':>8} {'alloc KiB/f':>12} {'blocks/f':>9} {'objs':>5} {'1st':>4} {'gc':>12}")
+    for r in results:
+        print(f"{r['size']:>10} {r['fps']:>10.1f} {r['calls_per_frame']:>8.1f} {r['sets_per_frame']:>8.1f}"
+              f" {r['alloc_kib_per_frame']:>12.2f} {r['blocks_per_frame']:>9.2f} {r['objects']:>5} {r['first_title_frame']:>4}"
+              f" {r['gc']['collections']:>4} / {r['gc']['pause_max_ms']:>5.1f}")
+    for r in results:
+        if r["titles"]:
+            t = r["titles"]
+            print(f"{r['size']:>10} titles: {t['seen']} seen, {t['changed']} normalized, {t['duplicates']} duplicates,"
+                  f" {t['unique']} unique, {t['saved_bytes'] / 1024:.1f} KiB saved")
+    for r in results:
+        if not r["profile"]:
+            continue
+        print(f"\n{r['size']} {'phase':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for name, st in r["profile"].items():
+            print(f"{'':>{len(r['size'])}} {name:>9} {st['p50']:>8.3f} {st['p95']:>8.3f} {st['p99']:>8.3f}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print()
+        print_comparison(results, baseline)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+# ==============================================================================
+#               openBDクライアント(openbd.py)のベンチマーク(CPython)
+# ==============================================================================
+
+# bench/browser の代替品の上で OpenBDClient を動かし、遅延やエラーを混ぜた openBD の代わりから
+# count冊分のタイトルを問い合わせる。時間はすべて仮想時計(ms)なので、実行するたびに同じ結果になる。
+#
+#   first    : 最初のレコードが届くまでの時間
+#   total    : すべてのバッチが終わるまでの時間
+#   isbn/s   : 1秒あたりに問い合わせ終えたISBNの数(count / total)
+#   records  : 届いたレコードの数(失敗したバッチの分は含まない)
+#   req      : 問い合わせの回数(やり直しを含む)
+#   retry    : やり直した回数
+#   t/o      : タイムアウトの回数
+#   failed   : やり直しても失敗したバッチの数
+#   p50/p95/p99 : 1回の問い合わせにかかった時間
+#
+# 使い方)
+#   python bench/bench_openbd.py
+#   python bench/bench_openbd.py --concurrency 1,2,4,8 --latency 300 --tail-rate 0.05 --error-rate 0.1 --drop-rate 0.02
+
+import argparse
+import json
+import os
+import random
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+for path in (ROOT_DIR, BENCH_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import browser # noqa: E402
+import browser.ajax as ajax # noqa: E402
+from openbd import API_URL, OpenBDClient # noqa: E402
+
+# 1つの設定について計測する。
+# faults : FaultInjectorに渡す設定(latency_ms、error_rateなど)
+# client : OpenBDClientに渡す設定(concurrency、timeoutなど)
+def run(count:int = 500, seed:int = 1, faults:dict | None = None, client:dict | None = None) -> dict:
+    browser.reset(1280, 720)
+    ajax.reset()
+    handler = ajax.handler_for(API_URL)
+    injector = ajax.FaultInjector(handler, seed=seed, **(faults or {}))
+    ajax.register(API_URL, injector)
+
+    rnd = random.Random(seed)
+    isbns = rnd.sample([isbn for isbn in handler.coverage if isbn.startswith("9784")], count)
+    openbd = OpenBDClient(rng=random.Random(seed), **(client or {}))
+    fetch = openbd.fetch(isbns, lambda records: None)
+    window = browser.window
+    while not fetch.done:
+        window.advance(1)
+
+    total_s = fetch.elapsed_ms / 1000
+    return {
+        "concurrency": openbd.concurrency,
+        "first_ms"   : fetch.first_ms,
+        "total_ms"   : fetch.elapsed_ms,
+        "isbn_per_sec": count / total_s if total_s else float("inf"),
+        "records"    : fetch.records,
+        "requests"   : fetch.requests,
+        "retries"    : fetch.retries,
+        "timeouts"   : fetch.timeouts,
+        "failed"     : len(fetch.failed),
+        "p50_ms"     : fetch.latency(50),
+        "p95_ms"     : fetch.latency(95),
+        "p99_ms"     : fetch.latency(99),
+    }
+
+def main(argv:list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="openBDクライアントのベンチマーク(仮想時計)")
+    parser.add_argument("--count", type=int, default=500, help="問い合わせるISBNの数")
+    parser.add_argument("--concurrency", default="1,2,3,4,8", help="同時に問い合わせるバッチの数(カンマ区切り)")
+    parser.add_argument("--timeout", type=float, default=5.0, help="1回の問い合わせの制限時間(秒)")
+    parser.add_argument("--retries", type=int, default=2, help="やり直す最大の回数")
+    parser.add_argument("--latency", type=float, default=200.0, help="遅延の基準(ms)")
+    parser.add_argument("--jitter", type=float, default=0.5, help="遅延の揺らぎ(割合)")
+    parser.add_argument("--tail-rate", type=float, default=0.05, help="遅延が --tail-ms になる割合")
+    parser.add_argument("--tail-ms", type=float, default=2000.0, help="裾の遅延(ms)")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="503を返す割合")
+    parser.add_argument("--drop-rate", type=float, default=0.01, help="応答しない割合")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出力する")
+    args = parser.parse_args(argv)
+
+    faults = {"latency_ms": args.latency, "jitter": args.jitter, "tail_rate": args.tail_rate,
+              "tail_ms": args.tail_ms, "error_rate": args.error_rate, "drop_rate": args.drop_rate}
+    results = []
+    for n in args.concurrency.split(","):
+        client = {"concurrency": int(n), "timeout": args.timeout, "retries": args.retries}
+        results.append(run(args.count, args.seed, faults, client))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    print(f"{'conc':>4} {'first':>7} {'total':>8} {'isbn/s':>8} {'records':>7} {'req':>4} {'retry':>5} {'t/o':>4}"
+          f" {'failed':>6} {'p50':>6} {'p95':>6} {'p99':>6}")
+    for r in results:
+        print(f"{r['concurrency']:>4} {r['first_ms']:>7.0f} {r['total_ms']:>8.0f} {r['isbn_per_sec']:>8.1f}"
+              f" {r['records']:>7} {r['requests']:>4} {r['retries']:>5} {r['timeouts']:>4} {r['failed']:>6}"
+              f" {r['p50_ms']:>6.0f} {r['p95_ms']:>6.0f} {r['p99_ms']:>6.0f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+# ==============================================================================
+#          /v1/getの応答からのタイトルの取り出しのベンチマーク(CPython)
+# ==============================================================================
+
+# openbd.parse_records(正規表現で必要な部分だけを走査する)と
+# openbd.parse_records_json(json.loadsで全体をdictにする)を比べる。
+#
+#   ms       : 1回の応答の処理にかかった時間(repeat回の最小)
+#   peak KiB : 処理中に確保されたメモリの最大量(tracemallocのpeak)
+#   records  : 取り出したレコードの数(両方が同じ結果かも確かめる)
+#
+# 減るのはメモリ(使わない内容紹介などのオブジェクトを作らない)で、時間はCPythonではほぼ同じ。
+# Brythonでは json.loads はブラウザの JSON.parse で動き、re はJavaScriptで書かれた実装なので、
+# 正規表現で走査するほうが遅くなることもある。(Brythonでは計測していない)
+#
+# 使い方)
+#   python bench/bench_parse.py
+#   python bench/bench_parse.py --count 500 --null-rate 0.2
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+for path in (ROOT_DIR, BENCH_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from browser.ajax import OpenBDHandler # noqa: E402
+import openbd # noqa: E402
+
+# count冊分の /v1/get の応答を作る。
+def make_response(count:int, null_rate:float, seed:int = 1) -> str:
+    handler = OpenBDHandler(max(count * 2, 1000), seed, null_rate)
+    isbns = [isbn for isbn in handler.coverage if isbn.startswith("9784")][:count]
+    return handler("GET", openbd.API_URL + "/get?isbn=" + ",".join(isbns), None)[1]
+
+def measure(parse, text:str, repeat:int) -> dict:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        records = parse(text)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    parse(text)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"name": parse.__name__, "ms": best * 1000, "peak_kib": peak / 1024, "records": len(records)}
+
+def main(argv:list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="/v1/getの応答からのタイトルの取り出しのベンチマーク")
+    parser.add_argument("--count", type=int, default=500, help="応答に含めるレコードの数")
+    parser.add_argument("--null-rate", type=float, default=0.1, help="nullのレコードの割合")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出力する")
+    args = parser.parse_args(argv)
+
+    text = make_response(args.count, args.null_rate)
+    if openbd.parse_records(text) != openbd.parse_records_json(text):
+        raise RuntimeError("parse_records and parse_records_json disagree")
+    results = [measure(parse, text, args.repeat) for parse in (openbd.parse_records, openbd.parse_records_json)]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"response {len(text.encode('utf-8')) / 1024:.0f} KiB")
+    print(f"{'':>18} {'ms':>8} {'peak KiB':>9} {'records':>8}")
+    for r in results:
+        print(f"{r['name']:>18} {r['ms']:>8.2f} {r['peak_kib']:>9.0f} {r['records']:>8}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,460 @@
+# ==============================================================================
+#                  ヘッドレス計測用の browser モジュール代替品
+# ==============================================================================
+
+# Brythonの `browser` モジュールのうち、BookRain(main.py / yanesdk / req.py)が
+# 使っている部分だけをCPython上で再現したもの。ブラウザなしでフレーム処理を回して
+# 計測するためのもので、本番(Brython)では読み込まれない。
+#
+#  - document : getElementById相当の document[id]、addEventListener、createElement
+#  - window   : setInterval / setTimeout / requestAnimationFrame を仮想時計で動かす
+#  - 2D context : 呼び出しを記録するだけのcontext(RecordingContext2D)
+#  - ajax     : openBDの応答を返す(browser/ajax.py)
+#
+# 使い方)
+#   import browser
+#   browser.reset(1920, 1080)   # canvasのサイズ(wrapperのclientWidth/Height)を決める
+#   ... TheApp() ...
+#   browser.window.advance(1000/75) # 仮想時計を進めて、期限のきたタイマーを実行する
+
+import re
+
+# ------------------------------------------------------------------------------
+#                              DOMイベント
+# ------------------------------------------------------------------------------
+
+class DOMEvent:
+    # キーワード引数で渡したものがそのまま属性になる。
+    #   DOMEvent(keyCode=32)
+    def __init__(self, type:str = "", **kwargs):
+        self.type = type
+        self.defaultPrevented = False
+        self.propagationStopped = False
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+    def preventDefault(self):
+        self.defaultPrevented = True
+
+    def stopPropagation(self):
+        self.propagationStopped = True
+
+# addEventListener / removeEventListenerを持つものの基底class
+class EventTarget:
+    def __init__(self):
+        self._listeners:dict[str, list] = {}
+
+    def addEventListener(self, name:str, handler):
+        self._listeners.setdefault(name, []).append(handler)
+
+    def removeEventListener(self, name:str, handler):
+        handlers = self._listeners.get(name, [])
+        if handler in handlers:
+            handlers.remove(handler)
+
+    # Brythonの elt.bind(name, handler) 相当。
+    def bind(self, name:str, handler):
+        self.addEventListener(name, handler)
+
+    # 代替品専用。イベントを発生させる。
+    def dispatch(self, name:str, event:DOMEvent | None = None):
+        if event is None:
+            event = DOMEvent(name)
+        for handler in list(self._listeners.get(name, [])):
+            handler(event)
+        return event
+
+# ------------------------------------------------------------------------------
+#                              2D context
+# ------------------------------------------------------------------------------
+
+# measureText()の戻り値
+class TextMetrics:
+    def __init__(self, width:float):
+        self.width = width
+
+# font指定("32px serif"など)からpx数を取り出す
+_font_px = re.compile(r"(\d+(?:\.\d+)?)px")
+
+# 呼び出しを記録するだけの2D context
+# calls  : メソッド呼び出しの回数
+# sets   : プロパティ(fillStyle、fontなど)への代入回数
+# ops    : 名前ごとの回数
+class RecordingContext2D:
+    def __init__(self, canvas:"Element"):
+        object.__setattr__(self, "canvas", canvas)
+        object.__setattr__(self, "calls", 0)
+        object.__setattr__(self, "sets", 0)
+        object.__setattr__(self, "ops", {})
+        object.__setattr__(self, "font", "10px sans-serif")
+        object.__setattr__(self, "fillStyle", "#000000")
+        object.__setattr__(self, "strokeStyle", "#000000")
+        object.__setattr__(self, "textBaseline", "alphabetic")
+        object.__setattr__(self, "globalAlpha", 1.0)
+
+    def __setattr__(self, name:str, value):
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, "sets", self.sets + 1)
+        self._count(name + "=")
+
+    def _count(self, name:str):
+        ops = self.ops
+        ops[name] = ops.get(name, 0) + 1
+
+    def _call(self, name:str):
+        object.__setattr__(self, "calls", self.calls + 1)
+        self._count(name)
+
+    # 記録をリセットする。
+    def reset_counters(self):
+        object.__setattr__(self, "calls", 0)
+        object.__setattr__(self, "sets", 0)
+        object.__setattr__(self, "ops", {})
+
+    # 以下、canvasの2D contextのメソッド。記録するだけで何も描画しない。
+
+    def fillRect(self, x, y, w, h):
+        self._call("fillRect")
+
+    def strokeRect(self, x, y, w, h):
+        self._call("strokeRect")
+
+    def clearRect(self, x, y, w, h):
+        self._call("clearRect")
+
+    def fillText(self, text, x, y, *args):
+        self._call("fillText")
+
+    def measureText(self, text:str) -> TextMetrics:
+        self._call("measureText")
+        # 全角文字が多いので、1文字あたりfontのpx数ぶんの幅とみなす。
+        m = _font_px.search(self.font)
+        px = float(m.group(1)) if m else 10.0
+        return TextMetrics(len(text) * px)
+
+    def drawImage(self, image, *args):
+        self._call("drawImage")
+
+    def save(self):
+        self._call("save")
+
+    def restore(self):
+        self._call("restore")
+
+    def translate(self, x, y):
+        self._call("translate")
+
+    def scale(self, x, y):
+        self._call("scale")
+
+    def setTransform(self, *args):
+        self._call("setTransform")
+
+    def beginPath(self):
+        self._call("beginPath")
+
+    def rect(self, x, y, w, h):
+        self._call("rect")
+
+    def clip(self, *args):
+        self._call("clip")
+
+# ------------------------------------------------------------------------------
+#                              DOM要素
+# ------------------------------------------------------------------------------
+
+# canvasの attrs['width'] = ... が canvas.width に反映されるようにする。
+class _Attrs(dict):
+    def __init__(self, element:"Element"):
+        super().__init__()
+        self._element = element
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        if key in ("width", "height"):
+            object.__setattr__(self._element, key, int(value))
+
+# element.style。 style.width = "100px" と style["width"] のどちらでも書ける。
+class _Style(dict):
+    def __setattr__(self, key, value):
+        self[key] = value
+
+    def __getattr__(self, key):
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key)
+
+class Element(EventTarget):
+    def __init__(self, tag:str, id:str = "", width:int = 0, height:int = 0):
+        super().__init__()
+        self.tagName = tag.upper()
+        self.id = id
+        self.attrs = _Attrs(self)
+        self.style = _Style()
+        self.width = width
+        self.height = height
+        self.clientWidth = width
+        self.clientHeight = height
+        self.children:list[Element] = []
+        self._context:RecordingContext2D | None = None
+
+    def getContext(self, kind:str) -> RecordingContext2D:
+        if self._context is None:
+            self._context = RecordingContext2D(self)
+        return self._context
+
+    # audio["src"] = ... のような書き方用
+    def __setitem__(self, key, value):
+        self.attrs[key] = value
+
+    def __getitem__(self, key):
+        return self.attrs[key]
+
+    def appendChild(self, child:"Element"):
+        self.children.append(child)
+
+    def __le__(self, child:"Element"):
+        self.appendChild(child)
+
+    def click(self):
+        self.dispatch("click")
+
+    def remove(self):
+        pass
+
+    # audio要素用
+    def play(self):
+        pass
+
+    def pause(self):
+        pass
+
+    def stop(self):
+        pass
+
+class Document(EventTarget):
+    def __init__(self):
+        super().__init__()
+        self._elements:dict[str, Element] = {}
+        self.body = Element("body", "body")
+        self.hidden = False
+        self.visibilityState = "visible"
+        # createElement()で作られた要素の数(オフスクリーンcanvasの数などの確認用)
+        self.created:list[Element] = []
+
+    def __getitem__(self, id:str) -> Element:
+        return self._elements[id]
+
+    def __contains__(self, id:str) -> bool:
+        return id in self._elements
+
+    def getElementById(self, id:str) -> Element | None:
+        return self._elements.get(id)
+
+    def createElement(self, tag:str) -> Element:
+        element = Element(tag)
+        self.created.append(element)
+        return element
+
+    # 代替品専用。id付きの要素を登録する。
+    def register(self, element:Element):
+        self._elements[element.id] = element
+
+    # 代替品専用。タブの表示/非表示を切り替えて visibilitychange を発生させる。
+    def set_hidden(self, hidden:bool):
+        self.hidden = hidden
+        self.visibilityState = "hidden" if hidden else "visible"
+        self.dispatch("visibilitychange")
+
+# ------------------------------------------------------------------------------
+#                              window
+# ------------------------------------------------------------------------------
+
+# window.performance
+class Performance:
+    def __init__(self, window:"Window"):
+        self._window = window
+
+    def now(self) -> float:
+        return self._window.now_ms
+
+# window.Image.new() 用
+class _ImageFactory:
+    def new(self) -> Element:
+        element = Element("img")
+        element.naturalWidth = 0
+        element.naturalHeight = 0
+        return element
+
+# window.localStorage。reset()では消えない(ページを開き直しても残る)ので、消す時はclear()を呼ぶ。
+class Storage:
+    def __init__(self):
+        self._items:dict[str, str] = {}
+
+    def getItem(self, key:str) -> str | None:
+        return self._items.get(key)
+
+    def setItem(self, key:str, value):
+        self._items[key] = str(value)
+
+    def removeItem(self, key:str):
+        self._items.pop(key, None)
+
+    def clear(self):
+        self._items.clear()
+
+local_storage = Storage()
+
+# window.Blob.new() 用
+class Blob:
+    def __init__(self, parts:list, options:dict | None = None):
+        self.parts = parts
+        self.type = (options or {}).get("type", "")
+
+class _BlobFactory:
+    def new(self, parts:list, options:dict | None = None) -> Blob:
+        return Blob(parts, options)
+
+# window.URL。createObjectURL()に渡されたものを objects に残しておく。
+class URL:
+    def __init__(self):
+        self.objects:dict[str, Blob] = {}
+        self.downloads:list[Blob] = []
+
+    def createObjectURL(self, blob:Blob) -> str:
+        url = f"blob:{len(self.objects) + 1}"
+        self.objects[url] = blob
+        return url
+
+    def revokeObjectURL(self, url:str):
+        blob = self.objects.pop(url, None)
+        if blob is not None:
+            self.downloads.append(blob)
+
+class Location:
+    def __init__(self, search:str = ""):
+        self.search = search
+        self.href = "http://localhost/" + search
+
+# タイマー1つ分
+class _Timer:
+    def __init__(self, id:int, due:float, callback, interval:float | None, args:tuple):
+        self.id = id
+        self.due = due
+        self.callback = callback
+        self.interval = interval
+        self.args = args
+
+# 仮想時計で動くwindow。
+# advance(ms)を呼ぶまで時間は進まないので、何度実行しても同じ順でタイマーが呼ばれる。
+class Window(EventTarget):
+    def __init__(self):
+        super().__init__()
+        self.now_ms = 0.0
+        self._next_id = 1
+        self._timers:dict[int, _Timer] = {}
+        self._raf:dict[int, object] = {}
+        self.performance = Performance(self)
+        self.Image = _ImageFactory()
+        self.Blob = _BlobFactory()
+        self.localStorage = local_storage
+        self.URL = URL()
+        self.devicePixelRatio = 1.0
+        self.innerWidth = 0
+        self.innerHeight = 0
+        self.location = Location()
+
+    def _new_id(self) -> int:
+        id = self._next_id
+        self._next_id += 1
+        return id
+
+    def setInterval(self, callback, ms:float, *args) -> int:
+        id = self._new_id()
+        ms = max(float(ms), 1.0)
+        self._timers[id] = _Timer(id, self.now_ms + ms, callback, ms, args)
+        return id
+
+    def setTimeout(self, callback, ms:float = 0, *args) -> int:
+        id = self._new_id()
+        self._timers[id] = _Timer(id, self.now_ms + max(float(ms), 0.0), callback, None, args)
+        return id
+
+    def clearInterval(self, id:int | None):
+        self._timers.pop(id, None)
+
+    def clearTimeout(self, id:int | None):
+        self._timers.pop(id, None)
+
+    def requestAnimationFrame(self, callback) -> int:
+        id = self._new_id()
+        self._raf[id] = callback
+        return id
+
+    def cancelAnimationFrame(self, id:int | None):
+        self._raf.pop(id, None)
+
+    # 代替品専用。仮想時計をmsだけ進め、その間に期限がきたタイマーを順に実行する。
+    # 最後に、登録されていたrequestAnimationFrameのcallbackを(1回の描画として)呼び出す。
+    def advance(self, ms:float):
+        end = self.now_ms + ms
+        while True:
+            due = [t for t in self._timers.values() if t.due <= end]
+            if not due:
+                break
+            t = min(due, key=lambda t: (t.due, t.id))
+            self.now_ms = max(self.now_ms, t.due)
+            if t.interval is None:
+                del self._timers[t.id]
+            else:
+                t.due += t.interval
+            t.callback(*t.args)
+        self.now_ms = end
+
+        if self._raf:
+            callbacks = list(self._raf.values())
+            self._raf.clear()
+            for callback in callbacks:
+                callback(self.now_ms)
+
+    # 代替品専用。登録されているタイマーの数(interval含む)
+    def pending(self) -> int:
+        return len(self._timers) + len(self._raf)
+
+# ------------------------------------------------------------------------------
+#                              初期化
+# ------------------------------------------------------------------------------
+
+document = Document()
+window = Window()
+
+# 代替品専用。index.htmlと同じ #wrapper と #canvas を用意し直す。
+# width, height : wrapperのclientWidth/Height(= canvasの大きさになる)
+# search        : URLのクエリ文字列("?profile=1"など)
+def reset(width:int = 1920, height:int = 1080, search:str = "", dpr:float = 1.0):
+    global document, window
+    document.__init__()
+    window.__init__()
+    window.devicePixelRatio = dpr
+    window.innerWidth = width
+    window.innerHeight = height
+    window.location = Location(search)
+    document.register(Element("div", "wrapper", width, height))
+    document.register(Element("canvas", "canvas"))
+
+    from . import ajax
+    ajax.reset()
+
+# 画面の大きさ(とdevicePixelRatio)が変わったことにして、windowのresizeイベントを送る。
+def resize(width:int, height:int, dpr:float | None = None):
+    wrapper = document["wrapper"]
+    wrapper.clientWidth = width
+    wrapper.clientHeight = height
+    window.innerWidth = width
+    window.innerHeight = height
+    if dpr is not None:
+        window.devicePixelRatio = dpr
+    window.dispatch("resize")
+
+reset()
@@ -0,0 +1,314 @@
+# ==============================================================================
+#                  browser.ajax の代替品(openBDの応答を返す)
+# ==============================================================================
+
+# req.py が使う ajax.Ajax() (同期/非同期) と ajax.get() を再現する。
+# 通信はせず、register()で登録したハンドラが応答を作る。
+# デフォルトでは openBD の /v1/coverage と /v1/get の応答を返すハンドラが登録されている。
+# 応答の中身は seed から決定的に作られるので、何度実行しても同じになる。
+
+import json
+import os
+import random
+from urllib.parse import unquote, urlsplit, parse_qs
+
+# ------------------------------------------------------------------------------
+#                              openBDの応答の生成
+# ------------------------------------------------------------------------------
+
+# タイトルの材料
+_WORDS = [
+    "吾輩", "猫", "坊っちゃん", "こころ", "銀河鉄道", "夜", "雪国", "羅生門", "人間失格",
+    "入門", "はじめての", "Python", "プログラミング", "図解", "やさしい", "日本史", "世界",
+    "経済学", "物語", "短編集", "上巻", "下巻", "新装版", "完全版", "料理", "旅", "京都",
+    "宇宙", "数学", "哲学", "レシピ", "ガイド", "ＪＡＶＡ", "ｐｙｔｈｏｎ", "事典", "辞典",
+    "問題集", "詩集", "歌集", "随筆", "評論", "研究", "の", "と", "を", "ための", "による",
+    "第１巻", "第2巻", "2023年版", "（新書）", "  ",
+]
+
+# Cコードの材料(販売対象 + 発行形態 + 内容)
+_CCODE_TARGETS = "0123456789"
+_CCODE_FORMS = "0123456789"
+_CCODE_CONTENTS = ["93", "95", "97", "98", "04", "10", "21", "33", "40", "55", "71", "76", "77", "79", "87"]
+
+# ISBN-13のチェックディジットを付ける
+def isbn13(body12:str) -> str:
+    total = sum(int(c) * (1 if i % 2 == 0 else 3) for i, c in enumerate(body12))
+    return body12 + str((10 - total % 10) % 10)
+
+# 決定的なカバレッジ(ISBNのソート済みリスト)を作る。
+# 9784(日本)以外のISBNも混ぜておく。
+def make_coverage(n:int = 20000, seed:int = 1) -> list[str]:
+    rnd = random.Random(seed)
+    isbns = set()
+    while len(isbns) < n:
+        prefix = rnd.choice(["9784", "9784", "9784", "9784", "9780", "9791", "9798"])
+        isbns.add(isbn13(prefix + "".join(rnd.choice("0123456789") for _ in range(8))))
+    return sorted(isbns)
+
+# ISBNから決定的にタイトルを作る。
+def make_title(isbn:str) -> str:
+    rnd = random.Random(isbn)
+    return "".join(rnd.choice(_WORDS) for _ in range(rnd.randint(1, 6))) or "無題"
+
+# ISBNから決定的にCコードを作る。
+def make_ccode(isbn:str) -> str:
+    rnd = random.Random("c" + isbn)
+    return rnd.choice(_CCODE_TARGETS) + rnd.choice(_CCODE_FORMS) + rnd.choice(_CCODE_CONTENTS)
+
+# openBDの /v1/get が返す1冊分のレコード(の主な部分)を作る。
+# 実際のレコードと同じく、シリーズ名(Collection)のTitleTextや長い内容紹介も含めておく。
+def make_record(isbn:str) -> dict:
+    title = make_title(isbn)
+    ccode = make_ccode(isbn)
+    return {
+        "onix": {
+            "RecordReference": isbn,
+            "NotificationType": "03",
+            "ProductIdentifier": {"ProductIDType": "15", "IDValue": isbn},
+            "DescriptiveDetail": {
+                "ProductComposition": "00",
+                "ProductForm": "BA",
+                "Collection": {
+                    "CollectionType": "10",
+                    "TitleDetail": {
+                        "TitleType": "01",
+                        "TitleElement": [
+                            {"TitleElementLevel": "02", "TitleText": {"content": "シリーズ" + isbn[-3:]}},
+                        ],
+                    },
+                },
+                "TitleDetail": {
+                    "TitleType": "01",
+                    "TitleElement": {
+                        "TitleElementLevel": "01",
+                        "TitleText": {"collationkey": "タイトル", "content": title},
+                    },
+                },
+                "Contributor": [
+                    {"SequenceNumber": "1", "ContributorRole": ["A01"],
+                     "PersonName": {"collationkey": "チョシャ", "content": "著者" + isbn[-2:]}},
+                ],
+                "Language": [{"LanguageRole": "01", "LanguageCode": "jpn", "CountryCode": "JP"}],
+                "Extent": [{"ExtentType": "11", "ExtentValue": "256", "ExtentUnit": "03"}],
+                "Subject": [
+                    {"SubjectSchemeIdentifier": "78", "SubjectCode": ccode},
+                    {"SubjectSchemeIdentifier": "79", "SubjectCode": "11"},
+                ],
+            },
+            "CollateralDetail": {
+                "TextContent": [
+                    {"TextType": "03", "ContentAudience": "00", "Text": "内容紹介。" * 60},
+                    {"TextType": "04", "ContentAudience": "00", "Text": "目次。" * 40},
+                ],
+            },
+            "PublishingDetail": {
+                "Imprint": {"ImprintIdentifier": [{"ImprintIDType": "19", "IDValue": isbn[3:7]}],
+                            "ImprintName": "出版社"},
+                "PublishingDate": [{"PublishingDateRole": "01", "Date": "20200101"}],
+            },
+            "ProductSupply": {
+                "SupplyDetail": {"ProductAvailability": "99",
+                                 "Price": [{"PriceType": "03", "PriceAmount": "1500", "CurrencyCode": "JPY"}]},
+            },
+        },
+        "hanmoto": {"datemodified": "2020-01-01 00:00:00", "datecreated": "2020-01-01 00:00:00"},
+        "summary": {"isbn": isbn, "title": title, "volume": "", "series": "", "publisher": "出版社",
+                    "pubdate": "20200101", "cover": "", "author": "著者" + isbn[-2:]},
+    }
+
+# openBDの応答を返すハンドラ。
+# coverage_size : /v1/coverage で返すISBNの数
+# null_rate     : /v1/get で null を返す(openBDにデータが無い)割合
+class OpenBDHandler:
+    def __init__(self, coverage_size:int = 20000, seed:int = 1, null_rate:float = 0.0):
+        self.coverage = make_coverage(coverage_size, seed)
+        self.null_rate = null_rate
+        # 呼び出された回数(計測・確認用)
+        self.requests:list[str] = []
+
+    def __call__(self, method:str, url:str, data:str | None) -> tuple[int, str]:
+        self.requests.append(url)
+        parts = urlsplit(url)
+        if parts.path.endswith("/v1/coverage"):
+            return 200, json.dumps(self.coverage)
+        if parts.path.endswith("/v1/get"):
+            query = parse_qs(parts.query)
+            isbns = unquote(query.get("isbn", [""])[0] or (data or "").partition("=")[2])
+            records = []
+            for isbn in [s for s in isbns.split(",") if s]:
+                if random.Random("n" + isbn).random() < self.null_rate:
+                    records.append(None)
+                else:
+                    records.append(make_record(isbn))
+            return 200, json.dumps(records, ensure_ascii=False)
+        return 404, ""
+
+# 遅延とエラーを混ぜるハンドラ。(通信の遅い、不安定な状態でのベンチマーク用)
+# handler    : 応答を作るハンドラ
+# latency_ms : 遅延の基準(ms)。実際の遅延は latency_ms * (1 ± jitter)
+# tail_rate  : 遅延が tail_ms になる(裾の重い遅延)割合
+# error_rate : 503を返す割合
+# drop_rate  : 応答しない(タイムアウトになる)割合
+class FaultInjector:
+    def __init__(self, handler, latency_ms:float = 50.0, jitter:float = 0.5, tail_rate:float = 0.0,
+                 tail_ms:float = 2000.0, error_rate:float = 0.0, drop_rate:float = 0.0, seed:int = 1):
+        self.handler = handler
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.tail_rate = tail_rate
+        self.tail_ms = tail_ms
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.rnd = random.Random(seed)
+        # 返したエラーと、応答しなかった回数(確認用)
+        self.errors = 0
+        self.drops = 0
+
+    # 応答までの時間(ms)。応答しない時はNone。
+    def delay_ms(self, url:str) -> float | None:
+        rnd = self.rnd
+        if rnd.random() < self.drop_rate:
+            self.drops += 1
+            return None
+        if rnd.random() < self.tail_rate:
+            return self.tail_ms
+        return self.latency_ms * (1 + self.jitter * (2 * rnd.random() - 1))
+
+    def __call__(self, method:str, url:str, data) -> tuple[int, str | bytes]:
+        if self.rnd.random() < self.error_rate:
+            self.errors += 1
+            return 503, "Service Unavailable"
+        return self.handler(method, url, data)
+
+# ------------------------------------------------------------------------------
+#                              ajax
+# ------------------------------------------------------------------------------
+
+# 相対URL("data/titles.pack"など)はリポジトリ直下のファイルを返す。
+class StaticFileHandler:
+    def __init__(self, root:str):
+        self.root = root
+
+    def __call__(self, method:str, url:str, data) -> tuple[int, bytes]:
+        path = os.path.join(self.root, urlsplit(url).path.lstrip("/"))
+        if not os.path.isfile(path):
+            return 404, b""
+        with open(path, "rb") as f:
+            return 200, f.read()
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 非同期リクエストが完了するまでの仮想時間(ms)。通信の遅延の代わり。
+latency_ms = 0.0
+
+# (URLの前方一致, ハンドラ)のリスト。ハンドラは (method, url, data) -> (status, text)
+_handlers:list[tuple[str, object]] = []
+
+# 代替品専用。URLの前方一致でハンドラを登録する。後から登録したものが優先。
+def register(prefix:str, handler):
+    _handlers.insert(0, (prefix, handler))
+
+# 代替品専用。ハンドラをデフォルト(openBDのみ)に戻す。
+def reset():
+    _handlers.clear()
+    register("", StaticFileHandler(ROOT_DIR))
+    register("https://api.openbd.jp/", OpenBDHandler())
+
+# 代替品専用。prefixに対して登録されているハンドラを返す。
+def handler_for(url:str):
+    for prefix, handler in _handlers:
+        if url.startswith(prefix):
+            return handler
+    return None
+
+def _respond(method:str, url:str, data) -> tuple[int, str | bytes]:
+    handler = handler_for(url)
+    if handler is None:
+        return 404, ""
+    return handler(method, url, data)
+
+class Ajax:
+    def __init__(self):
+        self.readyState = 0
+        self.status = 0
+        self.text = ""
+        self._body:str | bytes = ""
+        self.responseType = ""
+        # "text" か "binary"(read()でbytesを返す)
+        self.mode = "text"
+        self.headers:dict[str, str] = {}
+        self._method = "GET"
+        self._url = ""
+        self._async = True
+        self._callbacks:dict[str, list] = {}
+        self.timeout = 0
+
+    def open(self, method:str, url:str, async_:bool = True):
+        self._method = method
+        self._url = url
+        self._async = async_
+        self.readyState = 1
+
+    def set_header(self, key:str, value:str):
+        self.headers[key] = value
+
+    def set_timeout(self, seconds:float, callback):
+        self.timeout = seconds
+        self.bind("timeout", callback)
+
+    def bind(self, event:str, callback):
+        self._callbacks.setdefault(event, []).append(callback)
+
+    def read(self):
+        if self.mode == "binary":
+            return self._body if isinstance(self._body, bytes) else self._body.encode("utf-8")
+        return self.text
+
+    def _complete(self, data):
+        self.status, self._body = _respond(self._method, self._url, data)
+        if isinstance(self._body, bytes):
+            self.text = self._body.decode("utf-8", "replace") if self.mode != "binary" else ""
+        else:
+            self.text = self._body
+        self.readyState = 4
+        for callback in self._callbacks.get("complete", []):
+            callback(self)
+
+    def _timeout(self):
+        self.readyState = 4
+        self.status = 0
+        for callback in self._callbacks.get("timeout", []):
+            callback(self)
+
+    def send(self, data=None):
+        if not self._async:
+            self._complete(data)
+            return
+        # 非同期の場合は、latency_msだけ後にwindowのタイマーで完了させる。
+        # ハンドラが delay_ms(url) を持っていれば、その値(Noneなら応答しない)にする。
+        # timeout(秒)を過ぎても完了しなければ、timeoutのcallbackを呼び出す。
+        from . import window
+        handler = handler_for(self._url)
+        delay = handler.delay_ms(self._url) if hasattr(handler, "delay_ms") else latency_ms
+        if self.timeout and (delay is None or delay > self.timeout * 1000):
+            window.setTimeout(self._timeout, self.timeout * 1000)
+        elif delay is not None:
+            window.setTimeout(lambda: self._complete(data), delay)
+
+# Brythonの ajax.get(url, mode=..., oncomplete=..., timeout=..., ontimeout=...)
+def get(url:str, blocking:bool = False, mode:str = "text", oncomplete=None, timeout:float = 0,
+        ontimeout=None, data:str | dict = "", **kw):
+    req = Ajax()
+    if isinstance(data, dict):
+        data = "&".join(f"{k}={v}" for k, v in data.items())
+    if data:
+        url = url + ("&" if "?" in url else "?") + data
+    req.open("GET", url, not blocking)
+    req.mode = mode
+    if oncomplete:
+        req.bind("complete", oncomplete)
+    if ontimeout:
+        req.set_timeout(timeout, ontimeout)
+    req.send()
+    return req
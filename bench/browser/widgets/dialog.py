@@ -0,0 +1,20 @@
+# browser.widgets.dialog の代替品。
+# 画面には何も出さず、開かれたダイアログを opened に記録するだけ。
+
+# 開かれたダイアログ(title, message)の一覧
+opened:list[tuple[str, str]] = []
+
+class Dialog:
+    def __init__(self, title:str = "", message:str = "", **kw):
+        self.title = title
+        self.message = message
+        opened.append((title, message))
+
+    def close(self):
+        pass
+
+class EntryDialog(Dialog):
+    pass
+
+class InfoDialog(Dialog):
+    pass
@@ -0,0 +1,86 @@
+# ==============================================================================
+#          openBDの代わりのHTTPサーバー(遅延やエラーを混ぜられる。CPython)
+# ==============================================================================
+
+# bench/browser/ajax.py の OpenBDHandler と FaultInjector を、本物のHTTPサーバーとして動かす。
+# ブラウザでBookRainを開く時に ?openbd=http://localhost:8001/v1 を付けると、openBDの代わりにここへ問い合わせ、
+# 問い合わせの結果(件数、やり直し、タイムアウト、p50/p95/p99)がコンソールに表示される。
+# (保存したタイトルが先に降るので、試す時は ?cache=0 を付けて開くこと。?pack= や ?shards= は付けない)
+#
+# 使い方)
+#   python bench/openbd_server.py --port 8001 --latency 300 --tail-rate 0.05 --error-rate 0.1 --drop-rate 0.02
+
+import argparse
+import os
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+if BENCH_DIR not in sys.path:
+    sys.path.insert(0, BENCH_DIR)
+
+from browser.ajax import FaultInjector, OpenBDHandler # noqa: E402
+
+# 応答しない時に、接続を切らずに待つ時間(秒)
+DROP_HOLD = 60.0
+
+def make_handler(injector:FaultInjector, quiet:bool = False):
+    # FaultInjectorの乱数はスレッドから同時に使わない
+    lock = Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with lock:
+                delay = injector.delay_ms(self.path)
+                status, body = injector("GET", self.path, None) if delay is not None else (0, "")
+            if delay is None:
+                time.sleep(DROP_HOLD)
+                return
+            time.sleep(delay / 1000)
+            data = body if isinstance(body, bytes) else body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            if not quiet:
+                super().log_message(format, *args)
+
+    return Handler
+
+def main(argv:list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="openBDの代わりのHTTPサーバー")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--coverage", type=int, default=20000, help="/v1/coverageで返すISBNの数")
+    parser.add_argument("--null-rate", type=float, default=0.0, help="/v1/getでnullを返す割合")
+    parser.add_argument("--latency", type=float, default=200.0, help="遅延の基準(ms)")
+    parser.add_argument("--jitter", type=float, default=0.5, help="遅延の揺らぎ(割合)")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="遅延が --tail-ms になる割合")
+    parser.add_argument("--tail-ms", type=float, default=2000.0, help="裾の遅延(ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="503を返す割合")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="応答しない割合")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--quiet", action="store_true", help="リクエストごとのログを出さない")
+    args = parser.parse_args(argv)
+
+    injector = FaultInjector(OpenBDHandler(args.coverage, args.seed, args.null_rate),
+                             args.latency, args.jitter, args.tail_rate, args.tail_ms,
+                             args.error_rate, args.drop_rate, args.seed)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(injector, args.quiet))
+    server.daemon_threads = True
+    print(f"openBD stand-in: http://127.0.0.1:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+# ==============================================================================
+#                        Cコードによるジャンルの索引
+# ==============================================================================
+
+# Cコード(4桁)は、1桁目が販売対象、2桁目が発行形態、3・4桁目が内容。内容の3桁目が大分類。
+#   https://www.asahi-net.or.jp/~ax2s-kmtn/ref/ccode.html
+#
+# タイトルごとにCコードから次のキーを作り、キー → タイトルの添字(slot) の転置索引にする。
+#   "a" + 1桁目       販売対象    例) a8 = 児童
+#   "g" + 3桁目       内容の大分類 例) g9 = 文学
+#   "c" + 3・4桁目    内容        例) c93 = 日本文学、小説・物語
+# 絞り込みはキー(か FILTERS の名前)を "+" でつないだもので、すべてに当てはまるタイトルを選ぶ。
+#   例) "literature"、"children+literature"、"a0+c93"
+
+AUDIENCES = {
+    "0": "一般", "1": "教養", "2": "実用", "3": "専門", "4": "検定教科書など",
+    "5": "婦人", "6": "学参I(小中)", "7": "学参II(高校)", "8": "児童", "9": "雑誌扱い",
+}
+
+GENRES = {
+    "0": "総記", "1": "哲学", "2": "歴史・地理", "3": "社会科学", "4": "自然科学",
+    "5": "工学・工業", "6": "産業", "7": "芸術・生活", "8": "語学", "9": "文学",
+}
+
+# 絞り込みの名前 → キー
+FILTERS = {
+    "general"   : "a0",
+    "children"  : "a8",
+    "general_works": "g0",
+    "philosophy": "g1",
+    "history"   : "g2",
+    "social"    : "g3",
+    "science"   : "g4",
+    "technology": "g5",
+    "industry"  : "g6",
+    "arts"      : "g7",
+    "language"  : "g8",
+    "literature": "g9",
+}
+
+# Cコードから索引のキーを作る。Cコードでなければ空のtuple。
+def keys_of(ccode:str) -> tuple[str, ...]:
+    if not ccode or len(ccode) != 4 or not ccode.isdigit():
+        return ()
+    return ("a" + ccode[0], "g" + ccode[2], "c" + ccode[2:4])
+
+# Cコードがすべてのキーに当てはまればTrue
+def ccode_matches(ccode:str, keys:tuple[str, ...]) -> bool:
+    own = keys_of(ccode)
+    return all(key in own for key in keys)
+
+# 絞り込みの指定("literature"、"a8+g9"など)をキーのtupleにする。
+# 空か"all"ならNone(絞り込まない)。知らない名前ならValueError。
+def parse_filter(spec:str | None) -> tuple[str, ...] | None:
+    if not spec or spec == "all":
+        return None
+    keys = []
+    for name in spec.split("+"):
+        key = FILTERS.get(name.strip(), name.strip())
+        kind, code = key[:1], key[1:]
+        if not (kind in "ag" and len(code) == 1 or kind == "c" and len(code) == 2) or not code.isdigit():
+            raise ValueError(f"unknown genre filter: {name!r}")
+        keys.append(key)
+    return tuple(keys)
+
+# キーの表示用の名前
+def describe(keys:tuple[str, ...] | None) -> str:
+    if not keys:
+        return "すべて"
+    names = []
+    for key in keys:
+        if key[0] == "a":
+            names.append(AUDIENCES[key[1]])
+        elif key[0] == "g":
+            names.append(GENRES[key[1]])
+        else:
+            names.append(f"{GENRES[key[1]]}({key[1:]})")
+    return " × ".join(names)
+
+# キー → slotの集合 の転置索引
+class GenreIndex:
+    def __init__(self):
+        self._slots:dict[str, set[int]] = {}
+
+    # slotのタイトルのCコードを登録する。
+    def add(self, slot:int, ccode:str):
+        for key in keys_of(ccode):
+            slots = self._slots.get(key)
+            if slots is None:
+                slots = self._slots[key] = set()
+            slots.add(slot)
+
+    # slotのタイトル(Cコードはccode)を取り除く。
+    def remove(self, slot:int, ccode:str):
+        for key in keys_of(ccode):
+            slots = self._slots.get(key)
+            if slots is not None:
+                slots.discard(slot)
+
+    # すべてのキーに当てはまるslotの集合
+    def slots(self, keys:tuple[str, ...]) -> set[int]:
+        sets = sorted((self._slots.get(key, set()) for key in keys), key=len)
+        if not sets:
+            return set()
+        return sets[0].intersection(*sets[1:])
+
+    # slotがすべてのキーに当てはまればTrue
+    def matches(self, slot:int, keys:tuple[str, ...]) -> bool:
+        for key in keys:
+            slots = self._slots.get(key)
+            if slots is None or slot not in slots:
+                return False
+        return True
+
+    # キーごとのタイトルの数
+    def counts(self) -> dict[str, int]:
+        return {key: len(slots) for key, slots in sorted(self._slots.items()) if slots}
@@ -0,0 +1,304 @@
+# ==============================================================================
+#                  openBDのダンプからタイトルの分割パックを作る(CPython)
+# ==============================================================================
+
+# openBDのダンプ(1行に1冊分のレコードのJSON。JSON Lines)を先頭から少しずつ読み、
+# 複数のプロセスで title、isbn、ccode を取り出して、ISBNのハッシュで分けたタイトルパック(シャード)を作る。
+# できたファイルはGitHub Pagesにそのまま置けば、req.py が manifest.json を見て、ランダムに1つずつ取得する。
+#
+#  - ダンプは全部を読み込まない。chunk行ずつワーカーに渡し、処理中のchunkは workers*2 個までにする。
+#  - 取り出したレコードはシャードごとにためておき、たまったらシャードごとの一時ファイルに(長さを前に付けて)追記する。
+#    最後に1シャードずつ、一時ファイルを2回読んでパックにする。(1回目で長さからoffsetsを、2回目でrecordsを書く)
+#    メモリに載るのは、処理中のchunkと、ためているレコード(FLUSH_BYTESまで)だけで、ダンプの大きさによらない。
+#  - 1シャードのrecordsは4GiBまで(offsetsがu32)。超えたらエラーにするので、--shards を増やすこと。
+#  - 一時ファイルは追記する時だけ開くので、シャードの数が多くても同時に開くファイルは1つだけ。
+#  - 途中経過と最後に、1秒あたりに処理したレコード数を表示する。
+#
+# 出力
+#   <output>/titles-000.pack ...  タイトルパック(titlepack.pyの形式。fieldsは title, isbn, ccode)
+#   <output>/manifest.json        {"version": 1, "fields": [...], "count": 全件数,
+#                                  "shards": [{"file": "titles-000.pack", "count": 件数, "bytes": サイズ}, ...]}
+#
+# 使い方)
+#   python ingest.py openbd-dump.jsonl -o data/shards
+#   python ingest.py openbd-dump.jsonl.gz -o data/shards --shards 64 --workers 4 --gzip
+
+import json
+import os
+import shutil
+import sys
+import time
+import zlib
+from array import array
+from collections import deque
+
+import titlepack
+
+FIELDS = ("title", "isbn", "ccode")
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 1
+
+# シャードのファイル名
+def shard_name(i:int) -> str:
+    return f"titles-{i:03d}.pack"
+
+# レコードを入れるシャードの番号。ISBNのハッシュで決める。(ISBNが無ければタイトル)
+def shard_of(isbn:str, title:str, shards:int) -> int:
+    return zlib.crc32((isbn or title).encode("utf-8")) % shards
+
+# 一時ファイルで各レコードの前に付ける長さ(u32 little endian)
+def _length_prefix(n:int) -> bytes:
+    return n.to_bytes(4, "little")
+
+# ワーカーで実行する。chunk(ダンプの行のlist)からレコードを取り出し、シャードごとに分ける。
+# 戻り値 : (行数, レコード数, {シャード番号: (長さを前に付けたレコードを並べたbytes, レコード数, recordsの部分のバイト数)})
+def extract_chunk(lines:list[bytes], shards:int):
+    parts:dict[int, list] = {}
+    nlines = 0
+    nrecords = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        nlines += 1
+        try:
+            r = json.loads(line)
+        except ValueError:
+            continue
+        for record in titlepack.records_from_openbd([r]):
+            try:
+                b = titlepack.encode_record(record, len(FIELDS))
+            except ValueError:
+                continue
+            part = parts.setdefault(shard_of(record[1], record[0], shards), [bytearray(), 0, 0])
+            part[0] += _length_prefix(len(b))
+            part[0] += b
+            part[1] += 1
+            part[2] += len(b)
+            nrecords += 1
+    return nlines, nrecords, {k: (bytes(body), count, size) for k, (body, count, size) in parts.items()}
+
+# ダンプをchunk行ずつに分けて返す。(.gzなら展開しながら読む)
+def read_chunks(path:str, chunk:int):
+    if path.endswith(".gz"):
+        import gzip
+        f = gzip.open(path, "rb")
+    else:
+        f = open(path, "rb")
+    with f:
+        lines:list[bytes] = []
+        for line in f:
+            lines.append(line)
+            if len(lines) >= chunk:
+                yield lines
+                lines = []
+        if lines:
+            yield lines
+
+# シャードごとの一時ファイル(.rec。長さを前に付けたレコードを並べたもの)。
+# レコードはシャードごとのbytearrayにためておき、合計がFLUSH_BYTESを超えたら、それぞれの一時ファイルに追記する。
+# ファイルは追記する間だけ開く。(シャードごとに開いたままにすると、--shards 1000 でファイルの数の上限を超える)
+class ShardSpool:
+    # ためておくレコードの合計(バイト)
+    FLUSH_BYTES = 16 << 20
+    # 1シャードのrecordsの部分の上限(offsetsがu32なので)
+    MAX_SHARD_BYTES = 0xFFFFFFFF
+    # build()で一度に書き出すoffsetsの数
+    OFFSETS_BATCH = 1 << 16
+
+    def __init__(self, tmp_dir:str, shards:int):
+        self.tmp_dir = tmp_dir
+        self.shards = shards
+        self.counts = [0] * shards
+        # シャードごとのrecordsの部分のバイト数
+        self.sizes = [0] * shards
+        self._buffers = [bytearray() for _ in range(shards)]
+        self._buffered = 0
+
+    def _rec_path(self, i:int) -> str:
+        return os.path.join(self.tmp_dir, f"{i:03d}.rec")
+
+    # extract_chunk()の結果を書き込む。
+    def write(self, parts:dict):
+        for i, (body, count, size) in parts.items():
+            self.sizes[i] += size
+            if self.sizes[i] > ShardSpool.MAX_SHARD_BYTES:
+                raise ValueError(f"shard {i} is larger than 4 GiB; increase --shards (now {self.shards})")
+            self._buffers[i] += body
+            self._buffered += len(body)
+            self.counts[i] += count
+        if self._buffered >= ShardSpool.FLUSH_BYTES:
+            self.flush()
+
+    # ためているレコードを一時ファイルに追記する。
+    def flush(self):
+        for i, buf in enumerate(self._buffers):
+            if buf:
+                with open(self._rec_path(i), "ab") as f:
+                    f.write(buf)
+                del buf[:]
+        self._buffered = 0
+
+    def close(self):
+        self.flush()
+
+    # 一時ファイルfのレコードを順に (長さ, 中身) で返す。with_body=Falseなら中身は読まずにNoneを返す。
+    @staticmethod
+    def _iter_records(f, with_body:bool = True):
+        while True:
+            prefix = f.read(4)
+            if not prefix:
+                return
+            n = int.from_bytes(prefix, "little")
+            if with_body:
+                yield n, f.read(n)
+            else:
+                f.seek(n, 1)
+                yield n, None
+
+    # i番目のシャードをタイトルパックにしてpathに書き出す。書いたバイト数を返す。
+    def build(self, i:int, path:str, compress:bool = False) -> int:
+        if compress:
+            import gzip
+            out = gzip.GzipFile(path, "wb", mtime=0)
+        else:
+            out = open(path, "wb")
+        with out:
+            out.write(titlepack.encode_header(FIELDS, self.counts[i]))
+            # 1回目 : 長さだけを読み、offsetsを少しずつ書き出す
+            offsets = array("I", [0])
+            if self.counts[i]:
+                with open(self._rec_path(i), "rb") as f:
+                    total = 0
+                    for n, _ in ShardSpool._iter_records(f, False):
+                        total += n
+                        offsets.append(total)
+                        if len(offsets) >= ShardSpool.OFFSETS_BATCH:
+                            ShardSpool._write_offsets(out, offsets)
+                            del offsets[:]
+            ShardSpool._write_offsets(out, offsets)
+            # 2回目 : 長さを除いてrecordsを書き出す
+            if self.counts[i]:
+                with open(self._rec_path(i), "rb") as f:
+                    for _, body in ShardSpool._iter_records(f):
+                        out.write(body)
+        return os.path.getsize(path)
+
+    @staticmethod
+    def _write_offsets(out, offsets:array):
+        if sys.byteorder != "little":
+            offsets = array("I", offsets)
+            offsets.byteswap()
+        out.write(offsets.tobytes())
+
+# 1秒あたりのレコード数などを表示する。
+def _report(nlines:int, nrecords:int, elapsed:float, file=sys.stderr):
+    rate = nrecords / elapsed if elapsed > 0 else 0.0
+    print(f"{nlines} lines, {nrecords} records, {elapsed:.1f}s, {rate:.0f} records/s", file=file)
+
+# ダンプからシャードとmanifest.jsonを作る。
+# dump     : openBDのダンプ(JSON Lines。.gzでもよい)
+# out_dir  : 出力先のディレクトリ
+# shards   : シャードの数
+# workers  : ワーカーのプロセス数。1以下ならこのプロセスだけで処理する。
+# chunk    : 1回にワーカーに渡す行数
+# compress : シャードをgzipで圧縮する
+# progress : 途中経過を表示する間隔(秒)。0なら表示しない。
+# 戻り値は manifest の内容に、処理した行数(lines)、かかった時間(elapsed)、1秒あたりのレコード数(records_per_sec)を加えたもの。
+def ingest(dump:str, out_dir:str, shards:int = 32, workers:int | None = None, chunk:int = 2000,
+           compress:bool = False, progress:float = 5.0) -> dict:
+    if not 1 <= shards <= 1000:
+        raise ValueError("shards must be between 1 and 1000")
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    os.makedirs(out_dir, exist_ok=True)
+    tmp_dir = os.path.join(out_dir, ".ingest-tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    start = time.perf_counter()
+    last_report = start
+    nlines = 0
+    nrecords = 0
+    spool = ShardSpool(tmp_dir, shards)
+
+    def collect(result):
+        nonlocal nlines, nrecords, last_report
+        n, m, parts = result
+        nlines += n
+        nrecords += m
+        spool.write(parts)
+        now = time.perf_counter()
+        if progress and now - last_report >= progress:
+            last_report = now
+            _report(nlines, nrecords, now - start)
+
+    try:
+        if workers <= 1:
+            for lines in read_chunks(dump, chunk):
+                collect(extract_chunk(lines, shards))
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(workers) as pool:
+                # 処理中のchunkを workers*2 個までにする(ダンプを先読みしすぎない)
+                pending = deque()
+                for lines in read_chunks(dump, chunk):
+                    if len(pending) >= workers * 2:
+                        collect(pending.popleft().result())
+                    pending.append(pool.submit(extract_chunk, lines, shards))
+                while pending:
+                    collect(pending.popleft().result())
+        spool.close()
+
+        # 前回の出力を消してから書き出す
+        for name in os.listdir(out_dir):
+            if name.startswith("titles-") and name.endswith(".pack"):
+                os.remove(os.path.join(out_dir, name))
+        entries = []
+        for i in range(shards):
+            size = spool.build(i, os.path.join(out_dir, shard_name(i)), compress)
+            entries.append({"file": shard_name(i), "count": spool.counts[i], "bytes": size})
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "fields" : list(FIELDS),
+        "count"  : nrecords,
+        "shards" : entries,
+    }
+    with open(os.path.join(out_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+    elapsed = time.perf_counter() - start
+    return dict(manifest, lines=nlines, elapsed=elapsed,
+                records_per_sec=nrecords / elapsed if elapsed > 0 else 0.0)
+
+# ------------------------------------------------------------------------------
+#                              コマンドライン
+# ------------------------------------------------------------------------------
+
+def main(argv:list[str] | None = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="openBDのダンプ(JSON Lines)からタイトルの分割パックを作る")
+    parser.add_argument("dump", help="openBDのダンプ(1行に1レコードのJSON。.gzでもよい)")
+    parser.add_argument("-o", "--output", default="data/shards", help="出力先のディレクトリ")
+    parser.add_argument("--shards", type=int, default=32, help="シャードの数")
+    parser.add_argument("--workers", type=int, default=None, help="ワーカーのプロセス数(省略時はCPUの数)")
+    parser.add_argument("--chunk", type=int, default=2000, help="1回にワーカーに渡す行数")
+    parser.add_argument("--gzip", action="store_true", help="シャードをgzipで圧縮する")
+    parser.add_argument("--progress", type=float, default=5.0, help="途中経過を表示する間隔(秒)。0なら表示しない")
+    args = parser.parse_args(argv)
+
+    try:
+        result = ingest(args.dump, args.output, args.shards, args.workers, args.chunk, args.gzip, args.progress)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    _report(result["lines"], result["count"], result["elapsed"], file=sys.stdout)
+    sizes = [s["bytes"] for s in result["shards"]]
+    print(f"{len(sizes)} shards, {sum(sizes)} bytes (max {max(sizes)}) -> {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+# ==============================================================================
+#                       openBDのカバレッジ(ISBN一覧)の索引
+# ==============================================================================
+
+# openBDの /v1/coverage は数百万件のISBN(13文字の文字列)のJSON配列。
+# json.loadsでlistにすると、それだけで大量の文字列オブジェクトができてしまう。
+# ここでは9784(日本)の範囲のISBNだけを、応答の文字列から直接取り出して
+#   ISBN - 9784000000000 (10億未満の整数)
+# の差分(delta)を array('H') に詰めて持つ。1件あたりほぼ2バイト。
+# 差分が0xFFFF以上になる時だけ、0xFFFFに続けて上位16bit、下位16bitの3要素で持つ。
+#
+# 差分のままだとi番目を取り出すのに先頭から足していく必要があるので、
+# CHECKPOINT件ごとに (値, 差分の配列上の位置) を array に控えておく。
+# i番目の取り出しは、最寄りのcheckpointから高々CHECKPOINT-1件たどるだけで済む。
+#
+# sample(k) は random.sample(ISBNのlist, k) と同じ乱数の使い方で添字を選ぶので、
+# 同じ乱数の状態からは、従来の bisect + random.sample と同じISBNが選ばれる。
+
+import random
+import re
+from array import array
+
+# 9784の範囲の先頭。これを引いた値を持つ。
+BASE = 9784000000000
+# 13桁のISBNのうち9784ではじまるもの(JSON文字列として)
+_ISBN_9784 = re.compile(r'"(9784\d{9})"')
+# JSON文字列としてのISBN1件分の長さ( "9784xxxxxxxxx", )
+_STRIDE = 16
+
+class CoverageIndex:
+    # 何件ごとにcheckpointを置くか
+    CHECKPOINT = 64
+
+    def __init__(self):
+        # 差分
+        self._deltas = array('H')
+        # CHECKPOINT件ごとの値と、その値の次の差分が始まる_deltas上の位置
+        self._marks = array('I')
+        self._mark_pos = array('I')
+        # 件数
+        self._count = 0
+        # 最後に追加した値
+        self._last = 0
+
+    # ソート済みの値(ISBN - BASE)を順に追加していく。
+    def _extend(self, values):
+        deltas = self._deltas
+        marks = self._marks
+        mark_pos = self._mark_pos
+        checkpoint = self.CHECKPOINT
+        count = self._count
+        last = self._last
+        for value in values:
+            if count % checkpoint == 0:
+                marks.append(value)
+                mark_pos.append(len(deltas))
+            else:
+                delta = value - last
+                if delta < 0:
+                    raise ValueError("coverage is not sorted")
+                if delta < 0xFFFF:
+                    deltas.append(delta)
+                else:
+                    deltas.append(0xFFFF)
+                    deltas.append(delta >> 16)
+                    deltas.append(delta & 0xFFFF)
+            last = value
+            count += 1
+        self._count = count
+        self._last = last
+
+    # ISBN(文字列)の並びから作る。9784ではじまる13桁のもの以外は無視する。
+    @classmethod
+    def from_isbns(cls, isbns) -> "CoverageIndex":
+        values = [int(s) - BASE for s in isbns if len(s) == 13 and s.startswith('9784') and s.isdigit()]
+        values.sort()
+        index = cls()
+        index._extend(values)
+        return index
+
+    # /v1/coverage の応答(JSON文字列)から、ISBNのlistを作らずに作る。
+    # 応答はソート済みなので、9784の範囲は連続している。その範囲だけを走査する。
+    @classmethod
+    def from_text(cls, text:str) -> "CoverageIndex":
+        index = cls()
+        start = text.find('"9784')
+        if start < 0:
+            return index
+        end = text.find('"', text.rfind('"9784') + 1) + 1
+
+        # openBDの応答は空白のない ["...","...",...] なので、1件ずつ同じ幅で並んでいる。
+        # その場合は正規表現を使わずに、決まった位置から数字を切り出す。
+        if (end - start + 1) % _STRIDE == 0:
+            try:
+                index._extend(int(text[p:p+13]) - BASE for p in range(start + 1, end, _STRIDE))
+                return index
+            except ValueError:
+                # 並びが想定と違った。
+                index = cls()
+
+        try:
+            index._extend(int(m.group(1)) - BASE for m in _ISBN_9784.finditer(text, start, end))
+        except ValueError:
+            # ソートされていなかった。(openBDの仕様上は起きないはず)
+            return cls.from_isbns(m.group(1) for m in _ISBN_9784.finditer(text))
+        return index
+
+    def __len__(self) -> int:
+        return self._count
+
+    # i番目のISBNを整数(BASEを引いたもの)で返す。
+    def value(self, i:int) -> int:
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        j = i // self.CHECKPOINT
+        value = self._marks[j]
+        pos = self._mark_pos[j]
+        deltas = self._deltas
+        for _ in range(i - j * self.CHECKPOINT):
+            delta = deltas[pos]
+            if delta == 0xFFFF:
+                delta = (deltas[pos+1] << 16) | deltas[pos+2]
+                pos += 3
+            else:
+                pos += 1
+            value += delta
+        return value
+
+    # i番目のISBN(13桁の文字列)
+    def __getitem__(self, i:int) -> str:
+        return str(BASE + self.value(i))
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self[i]
+
+    # ランダムにk件のISBNを選ぶ。random.sample(ISBNのlist, k)と同じ。
+    # rng : random.Randomのインスタンス(省略時はrandomモジュール)
+    def sample(self, k:int, rng=random) -> list[str]:
+        return [self[i] for i in rng.sample(range(self._count), k)]
+
+    # 索引が使っているおおよそのバイト数
+    def nbytes(self) -> int:
+        return len(self._deltas) * self._deltas.itemsize + \
+            (len(self._marks) + len(self._mark_pos)) * self._marks.itemsize
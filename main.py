@@ -1,6 +1,16 @@
-﻿import gc
-from yanesdk import *
-from meigen import author,told
+﻿# from yanesdk import * だとダイアログやtypingなども読み込む(起動が遅くなる)ので、使う名前だけをimportする。
+# ダイアログなどは yanesdk.InfoDialog のように、使う時に参照して読み込む。
+import yanesdk
+from yanesdk import (document, window, DOMEvent, cast, traceback, math, random,
+                     MathTools, Vector2D, MVector2D, Rect, query_params, VKEY, VirtualKeyInput,
+                     Canvas, FrameProfiler, GameTimer, GameContext, GameObject, GameObjectManager)
+import meigen
+import req
+from titlepool import TitlePool
+import genre
+from quality import QualityController, QualityLevel
+from titlecache import TitleCache, MemoryStorage
+from array import array
 
 
 # 基底クラスはどちらも__init__を持たず、onDrawのみを持っている。
@@ -18,33 +28,441 @@ class Scene:
 
 # 以下はゲームオブジェクト----------------------------
 
+# 元々は75fpsで1フレームごとに進める量で速度を決めていたので、その見え方を保つための換算用。
+BASE_FPS = 75
+
+# 画面の大きさから決まる値。
+# 毎フレーム計算し直さないように、canvasの大きさが変わった時だけupdate()で計算し直す。
+# (Canvas.add_resize_listener()で登録しておく)
+class Layout:
+    def __init__(self, canvas:Canvas):
+        self.update(canvas)
+
+    def update(self, canvas:Canvas):
+        self.width = canvas.width
+        self.height = canvas.height
+        # タイトルが生まれるところを見せたくないので、yohakuだけ上で生成する。
+        self.yohaku = int(canvas.height*0.1)
+        # 降らせるタイトルのフォントサイズの範囲(最小, 最大)。画面の幅に合わせる。
+        self.min_font = int(10*canvas.width/1920)
+        self.max_font = int(60*canvas.width/1920)
+        # ウェルカムメッセージのフォントサイズ
+        self.welcome_font = int(30*canvas.width/1920)
+        # 画面範囲外かどうかの判定に使う矩形。
+        # canvasそのものの範囲を指定すると突然消えてしまうように見えるので、yohakuを足している
+        self.area = Rect(Vector2D(0,-self.yohaku), Vector2D(canvas.width, canvas.height+self.yohaku*2))
+        # 変わった回数(BookLayersなどが、変わったかどうかを調べるのに使う)
+        self.version = getattr(self, 'version', -1) + 1
+
+
 # 本
 class Book(MyGameObject):
+    # v : 速度(px/秒)
     def __init__(self, app:'TheApp', p:Vector2D, v:Vector2D, title:str, size:int):
         super().__init__()
         # 座標
-        self.p = p
-        # ベクトル
+        # 毎フレーム動かすので、書き換えられるMVector2Dで持つ。
+        self.p = MVector2D()
+        # 1つ前のシミュレーションの時点での座標(補間用)
+        self.prev = MVector2D()
+        self.reset(app, p, v, title, size)
+
+    # 削除されたBookを使い回す時に、GameObjectManager.create()から呼び出される。
+    def reset(self, app:'TheApp', p:Vector2D, v:Vector2D, title:str, size:int):
+        self.deleted = False
+        self.p.set(p.x, p.y)
+        self.prev.set(p.x, p.y)
+        # ベクトル(px/秒)
         self.v = v
         # タイトル
         self.title = title
         # フォントサイズ
         self.size = size
+        # font指定の文字列(落ちている間は変わらない)
+        self.font = f"{size}px serif"
 
     def onDraw(self, app:"TheApp"):
-        if self.deleted == True:
-            del app.titles[0]
-            gc.collect()
+        # 移動
+        # 経過時間(秒)に速度を掛けて進めるので、fpsが変わっても落ちる速さは変わらない。
+        # (p、prevはその場で書き換えて、フレームごとにVector2Dを作らないようにしている)
+        p = self.p
+        if app.interpolate:
+            # 一定間隔(app.tick)で進め、描画はその間を補間した位置に行う。
+            prev = self.prev
+            for _ in range(app.steps):
+                prev.set(p.x, p.y)
+                p.iadd_scaled(self.v, app.tick)
+            draw_x = prev.x + (p.x - prev.x) * app.alpha
+            draw_y = prev.y + (p.y - prev.y) * app.alpha
+        else:
+            draw_x = p.x
+            draw_y = p.y
+            p.iadd_scaled(self.v, app.dt)
+
         # 描画
         canvas = app.canvas
-        # タイトルが生まれるところを見せたくないのでVector2D(0,int(app.canvas.height*0.1))分だけ上で生成
-        yohaku = int(canvas.height*0.1)
-        canvas.draw_text_center(self.title, self.p+Vector2D(0,-yohaku), font=f"{self.size}px serif", color=app.color[app.wordcolor])
-        # 移動
-        self.p += self.v
+        # タイトルが生まれるところを見せたくないのでVector2D(0,yohaku)分だけ上で生成
+        yohaku = app.layout.yohaku
+        color = app.color[app.wordcolor]
+        if app.text_mode == 'sprite':
+            # 落ちている間は文字列・大きさ・色が変わらないので、画像にしたものをキャッシュから描く。
+            canvas.draw_text_center_cached_xy(self.title, draw_x, draw_y-yohaku, self.font, color)
+        elif app.text_mode == 'batch':
+            # シーンの最後にまとめて描いてもらう。
+            app.text_batch.append((self.title, draw_x, draw_y-yohaku, self.font, color))
+        else:
+            canvas.draw_text_center_xy(self.title, draw_x, draw_y-yohaku, self.font, color)
         # 画面範囲外に出たものは削除。
-        # canvasそのものの範囲を指定すると突然消えてしまうように見えるので、yohakuを足している
-        self.deleted = not self.p.is_in_rect(Rect(Vector2D(0,-yohaku), Vector2D(canvas.width, canvas.height+yohaku*2)))
+        self.deleted = not app.layout.area.contains(p.x, p.y)
+        # メモリの解放は、フレームに余裕のある時にまとめて行ってもらう。
+        if self.deleted:
+            app.gametimer.gc.request()
+
+
+# 落ちてくるタイトルをまとめて持つもの。(Bookの代わり)
+# Bookは1冊ごとにオブジェクトで、動かすたびにVector2Dを作り直すので、冊数に比例してメモリを確保する。
+# こちらは座標などを項目ごとのarrayで持ち(struct of arrays)、1つのループで全冊を動かして描く。
+# 画面外に出たものはそのループのなかで詰めていくので、フレームごとのメモリ確保はほぼ無い。
+# arrayは最大の冊数まで伸びたら、あとは使い回す。
+class BookField(MyGameObject):
+    def __init__(self):
+        super().__init__()
+        # 項目ごとの列。添字が同じものが1冊分。
+        # x, y   : 座標(タイトルの中央、上端)
+        # prev_y : 1つ前のシミュレーションの時点でのy座標(補間用)
+        # vy     : 落ちる速度(px/秒)
+        # size   : フォントサイズ
+        self.x = array('d')
+        self.y = array('d')
+        self.prev_y = array('d')
+        self.vy = array('d')
+        self.size = array('i')
+        # タイトルとfont指定の文字列。(文字列はarrayに入らないので、参照をlistで持つ)
+        self.text:list[str] = []
+        self.font:list[str] = []
+        # 使っている冊数。[0, count)が有効で、その先は使い回す領域。
+        self.count = 0
+
+    def __len__(self)->int:
+        return self.count
+
+    # 1冊追加する。
+    def spawn(self, x:float, y:float, vy:float, size:int, title:str):
+        i = self.count
+        font = f"{size}px serif"
+        if i < len(self.x):
+            self.x[i] = x
+            self.y[i] = y
+            self.prev_y[i] = y
+            self.vy[i] = vy
+            self.size[i] = size
+            self.text[i] = title
+            self.font[i] = font
+        else:
+            self.x.append(x)
+            self.y.append(y)
+            self.prev_y.append(y)
+            self.vy.append(vy)
+            self.size.append(size)
+            self.text.append(title)
+            self.font.append(font)
+        self.count = i + 1
+
+    # 全冊を動かして描く。画面外に出たものは詰める。
+    def onDraw(self, app:'TheApp'):
+        canvas = app.canvas
+        # タイトルが生まれるところを見せたくないので、yohakuだけ上で生成している。(Bookと同じ)
+        layout = app.layout
+        yohaku = layout.yohaku
+        top = -yohaku
+        bottom = layout.height + yohaku
+        width = layout.width
+        color = app.color[app.wordcolor]
+        mode = app.text_mode
+        interpolate = app.interpolate
+        steps = app.steps
+        tick = app.tick
+        alpha = app.alpha
+        dt = app.dt
+
+        xs = self.x
+        ys = self.y
+        prev_ys = self.prev_y
+        vys = self.vy
+        sizes = self.size
+        texts = self.text
+        fonts = self.font
+
+        # 書き込み先。生き残ったものを前に詰めていく。
+        w = 0
+        for i in range(self.count):
+            x = xs[i]
+            y = ys[i]
+            vy = vys[i]
+
+            # 移動
+            if interpolate:
+                prev_y = prev_ys[i]
+                for _ in range(steps):
+                    prev_y = y
+                    y += vy * tick
+                draw_y = prev_y + (y - prev_y) * alpha
+            else:
+                prev_y = y
+                draw_y = y
+                y += vy * dt
+
+            # 描画
+            if mode == 'sprite':
+                canvas.draw_text_center_cached_xy(texts[i], x, draw_y - yohaku, fonts[i], color)
+            elif mode == 'batch':
+                app.text_batch.append((texts[i], x, draw_y - yohaku, fonts[i], color))
+            else:
+                canvas.draw_text_center_xy(texts[i], x, draw_y - yohaku, fonts[i], color)
+
+            # 画面範囲外に出たものは削除。(詰めずに飛ばす)
+            if not (top <= y < bottom and 0 <= x < width):
+                continue
+            if w != i:
+                xs[w] = x
+                vys[w] = vy
+                sizes[w] = sizes[i]
+                texts[w] = texts[i]
+                fonts[w] = fonts[i]
+            ys[w] = y
+            prev_ys[w] = prev_y
+            w += 1
+
+        self.count = w
+
+
+# 落ちる速さが同じタイトルをまとめて描いておく層。BookLayersが使う。
+class BookLayer:
+    def __init__(self, vy:float):
+        # 落ちる速度(px/秒)
+        self.vy = vy
+        # 落ちた距離(px)と、1つ前のシミュレーションの時点での距離(補間用)
+        self.s = 0.0
+        self.prev_s = 0.0
+        # 最後に描画した時の落ちた距離(整数)
+        self.last_si = 0
+        # この層のタイトル。(描いた時の落ちた距離, x, タイトル, font, フォントサイズ) を古い順に。
+        # 色が変わった時などに、これを使って描き直す。
+        self.records:list[tuple[int, float, str, str, int]] = []
+        # オフスクリーンのcanvas。最初にタイトルを描く時に作る。
+        self.element = None
+        self.ctx = None
+
+
+# 落ちる速さ(フォントサイズ)の帯ごとの層に分けて、タイトルを描いておくもの。(BookFieldの代わり)
+# 同じ層のタイトルは同じ速さで落ちるので、層ごとのオフスクリーンのcanvasに1回だけ描いておき、
+# 毎フレームは層をずらしてメインのcanvasに貼り付ける(層ごとにdrawImage 1～2回)だけにする。
+# フレームごとの処理はタイトルの数ではなく、層の数に比例する。
+#
+# 層のcanvasは縦方向に輪になっている(ring buffer)。輪の高さ height は画面の高さ+yohaku。
+# 層が落ちた距離を s とすると、層の行 u はメインのcanvasの y = (u + s) % height - yohaku に表示される。
+#  - 新しいタイトルは u = -s % height (画面の上の見えないところ)に描く。
+#  - 画面の下から出て上に回ってきた行は、毎フレームclearRectで消しておく。
+#
+# 層の中のタイトルは、層の代表のフォントサイズ(帯の真ん中)の速さで落ちる。(自分のサイズの速さとは少し違う)
+# 層ごとに画面と同じくらいの大きさのcanvasを持つので、4K(dpr 1)では1層あたり35MBほど使う。
+# 全部の層のピクセル数がMAX_PIXELSを超える時は、層の解像度をdprより下げる。(文字は少しぼやける)
+# 層の数はURLの ?bands=N で変えられる。
+class BookLayers(MyGameObject):
+    # 全部の層のcanvasのピクセル数の上限。(1ピクセル4バイトなので64MBほど)
+    MAX_PIXELS = 4096 * 4096
+
+    def __init__(self, bands:int = 4):
+        super().__init__()
+        self.bands = max(1, bands)
+        self.layers:list[BookLayer] = []
+        self.canvas:Canvas | None = None
+        # 層を作った時の (Layoutのversion, canvasのdpr)
+        self._layout_key = (-1, 0.0)
+        # 層を作った時の (canvasの幅, 高さ)
+        self._size = (0, 0)
+        # 層のcanvasの、1pxあたりの実際のピクセル数。ふつうはdprと同じで、MAX_PIXELSを超える時は小さくする。
+        self.scale = 1.0
+        # 輪の高さ(画面の高さ+yohaku)とyohaku
+        self.height = 0
+        self.yohaku = 0
+        # フォントサイズの範囲(最小, 最大)
+        self._font_range = (0, 0)
+        # 層に描いてある文字色。変わったら描き直す。
+        self._color = ""
+
+    # 画面上のタイトルの数
+    def __len__(self)->int:
+        return sum(len(layer.records) for layer in self.layers)
+
+    # canvasの大きさが変わっていたら、層の大きさと速さを決め直す。変わっていたらTrue。
+    def _layout(self, app:'TheApp')->bool:
+        canvas = app.canvas
+        layout = app.layout
+        key = (layout.version, canvas.dpr)
+        if key == self._layout_key:
+            return False
+        self._layout_key = key
+        self.canvas = canvas
+        self._size = (layout.width, layout.height)
+        # タイトルが生まれるところを見せたくないので、yohakuだけ上で生成している。(Bookと同じ)
+        self.yohaku = layout.yohaku
+        self.height = layout.height + self.yohaku
+        pixels = max(layout.width * self.height, 1)
+        self.scale = min(canvas.dpr, math.sqrt(BookLayers.MAX_PIXELS / self.bands / pixels))
+        lo, hi = self._font_range = (layout.min_font, layout.max_font)
+        if not self.layers:
+            self.layers = [BookLayer(0.0) for _ in range(self.bands)]
+        for b, layer in enumerate(self.layers):
+            # 帯の真ん中のフォントサイズの速さ(px/秒)
+            size_b = lo + (b + 0.5) * (hi - lo + 1) / self.bands - 0.5
+            layer.vy = (0.016*size_b+0.84)*BASE_FPS
+            if layer.element is not None:
+                # 大きさを設定し直すと中身とcontextの状態は消える。
+                self._allocate(layer)
+        return True
+
+    # 層のオフスクリーンのcanvasを(作り直して)用意する。
+    # メインのcanvasと同じく、実際のピクセル数はdpr倍(scale倍)にしておく。
+    def _allocate(self, layer:BookLayer):
+        if layer.element is None:
+            layer.element = document.createElement("canvas")
+        layer.element.attrs['width'] = int(self._size[0] * self.scale)
+        layer.element.attrs['height'] = int(self.height * self.scale)
+        layer.ctx = layer.element.getContext("2d")
+        layer.ctx.setTransform(self.scale, 0, 0, self.scale, 0, 0)
+
+    # フォントサイズから層の番号を決める。
+    def _band_of(self, size:int)->int:
+        lo, hi = self._font_range
+        b = (size - lo) * self.bands // (hi - lo + 1)
+        return min(max(b, 0), self.bands - 1)
+
+    # 画面の下から出ていったタイトルを捨てる。
+    def _cull(self, layer:BookLayer, si:int):
+        records = layer.records
+        n = 0
+        while n < len(records) and si - records[n][0] >= self.height:
+            n += 1
+        if n:
+            del records[:n]
+
+    # 層の行 [u, u+h) を消す。(輪の端をまたぐ時は2回に分ける)
+    def _clear_rows(self, layer:BookLayer, u:int, h:int):
+        height = self.height
+        width = self._size[0]
+        if u + h <= height:
+            layer.ctx.clearRect(0, u, width, h)
+        else:
+            layer.ctx.clearRect(0, u, width, height - u)
+            layer.ctx.clearRect(0, 0, width, u + h - height)
+
+    # タイトルを層の行uに描く。文字が輪の端をまたぐ時は、反対側にも描く。
+    def _fill_title(self, ctx, title:str, x:float, u:int, font:str, size:int):
+        tx = x - cast(Canvas, self.canvas).measure_text(title, font)//2
+        ctx.fillText(title, tx, u)
+        # 文字の高さはfontのpx数より少し大きくとっておく。(TextSpriteCacheと同じ)
+        if u + int(size*1.3) + 2 > self.height:
+            ctx.fillText(title, tx, u - self.height)
+
+    # 層を描き直す。(色が変わった時、canvasの大きさが変わった時)
+    def _redraw(self, layer:BookLayer):
+        if layer.ctx is None:
+            return
+        height = self.height
+        width = self._size[0]
+        ctx = layer.ctx
+        ctx.clearRect(0, 0, width, height)
+        si = layer.last_si
+        self._cull(layer, si)
+        ctx.fillStyle = self._color
+        ctx.textBaseline = "top"
+        font = ""
+        for s0, x, title, record_font, size in layer.records:
+            if record_font != font:
+                font = record_font
+                ctx.font = font
+            u = -s0 % height
+            # タイトルの上端が画面の下端に近く、文字の下のほうがすでに上に回って消されているもの。
+            # 消された部分まで描いてしまわないように、画面の下端までに切り抜いて描く。
+            rows = height - (si - s0)
+            if rows < int(size*1.3) + 2:
+                ctx.save()
+                ctx.beginPath()
+                if u + rows <= height:
+                    ctx.rect(0, u, width, rows)
+                else:
+                    ctx.rect(0, u, width, height - u)
+                    ctx.rect(0, 0, width, u + rows - height)
+                ctx.clip()
+                self._fill_title(ctx, title, x, u, font, size)
+                ctx.restore()
+            else:
+                self._fill_title(ctx, title, x, u, font, size)
+
+    # 1冊追加する。(BookFieldと同じ引数)
+    # 層の速さで、画面の上の見えないところから落とすので、y、vyは使わない。
+    def spawn(self, x:float, y:float, vy:float, size:int, title:str):
+        layer = self.layers[self._band_of(size)]
+        if layer.ctx is None:
+            self._allocate(layer)
+        font = f"{size}px serif"
+        s0 = layer.last_si
+        layer.records.append((s0, x, title, font, size))
+        ctx = layer.ctx
+        ctx.font = font
+        ctx.fillStyle = self._color
+        ctx.textBaseline = "top"
+        self._fill_title(ctx, title, x, -s0 % self.height, font, size)
+
+    # 層を動かして、メインのcanvasに貼り付ける。
+    def onDraw(self, app:'TheApp'):
+        canvas = app.canvas
+        color = app.color[app.wordcolor]
+        resized = self._layout(app)
+        if resized or color != self._color:
+            self._color = color
+            for layer in self.layers:
+                self._redraw(layer)
+
+        height = self.height
+        yohaku = self.yohaku
+        width = self._size[0]
+        scale = self.scale
+        ctx = canvas.ctx
+        for layer in self.layers:
+            # 移動(BookFieldと同じく、動かす前の位置に描く)
+            if app.interpolate:
+                for _ in range(app.steps):
+                    layer.prev_s = layer.s
+                    layer.s += layer.vy * app.tick
+                draw_s = layer.prev_s + (layer.s - layer.prev_s) * app.alpha
+            else:
+                draw_s = layer.s
+                layer.s += layer.vy * app.dt
+            si = int(draw_s)
+
+            # 前のフレームから今回までに、下から上に回ってきた行を消す。
+            d = si - layer.last_si
+            if layer.ctx is not None and d > 0:
+                self._clear_rows(layer, -si % height, min(d, height))
+            layer.last_si = si
+            self._cull(layer, si)
+            if not layer.records:
+                continue
+
+            # 貼り付け。層の行 [0, height-k) は y = u+k-yohaku に、[height-k, height) は y = u+k-height-yohaku に来る。
+            # 画面の上(y < 0)にはみ出す部分は貼り付けない。
+            # 層の側の座標は、実際のピクセル(scale倍)で指定する。
+            k = si % height
+            y0 = max(0, yohaku - k)
+            h = height - k - y0
+            if h > 0:
+                ctx.drawImage(layer.element, 0, y0*scale, width*scale, h*scale, 0, y0 + k - yohaku, width, h)
+            y0 = height - k + yohaku
+            h = k - yohaku
+            if h > 0:
+                ctx.drawImage(layer.element, 0, y0*scale, width*scale, h*scale, 0, 0, width, h)
 
 
 # 本のマネージャー
@@ -54,6 +472,10 @@ class BookManager(MyGameObject):
         # 進行フレーム数を記録する変数
         # 60fpsなので、1秒間に60フレーム増える（1秒で60cntとなる）。
         self.cnt = 0
+        # タイトルを生成する間隔(秒)。元は75fpsで15フレームごと。
+        self.spawn_interval = 15 / BASE_FPS
+        # 前回タイトルを生成してからの経過時間(秒)
+        self.spawn_timer = 0.0
     
     def onDraw(self, app:'TheApp'):
         # このメソッドは、GameMainSceneからしか呼び出さない。
@@ -63,100 +485,223 @@ class BookManager(MyGameObject):
         # 表示するタイトルのリスト
         books = scene.books
 
+        # 読み込み済みのタイトルの数
+        app.lentitles = len(app.titles)
+
         if app.flg == False: 
             # ウェルカムメッセージの表示
-            welcom_size = int(30*app.canvas.width/1920)
+            # タイトルが届くまでは表示し続ける。
+            welcom_size = app.layout.welcome_font
             center_width = app.canvas.width//2
             center_height = app.canvas.height//2
             size = app.math.randint(welcom_size, welcom_size)
             p = Vector2D(center_width, center_height*0.95)
             pp = Vector2D(center_width, center_height*1.05)
-            app.canvas.draw_text_center(told, p, font=f"{size}px serif", color=app.color[app.wordcolor])
-            app.canvas.draw_text_center(author, pp, font=f"{size//2}px serif", color=app.color[app.wordcolor])
-            app.flg = True
+            app.canvas.draw_text_center(app.told, p, font=f"{size}px serif", color=app.color[app.wordcolor])
+            app.canvas.draw_text_center(app.author, pp, font=f"{size//2}px serif", color=app.color[app.wordcolor])
+            if app.lentitles > 0:
+                app.flg = True
 
-        else:
-            # タイトルの読み込み
-            if app.fflg == False:
-                import req
-                app.titles = req.titles
-                app.fflg == True
-            app.lentitles = len(app.titles)
+        elif app.lentitles > 0:
             # タイトルを書き込む範囲
             rect = app.canvas.rect
 
             # タイトルを生成する処理
-            if self.cnt%15 == 0:
-                scene = cast(GameMainScene, app.scene)
+            # フレーム数ではなく経過時間で数えるので、fpsが変わっても降る量は変わらない。
+            self.spawn_timer += app.dt
+            if self.spawn_timer >= self.spawn_interval:
+                self.spawn_timer = min(self.spawn_timer - self.spawn_interval, self.spawn_interval)
+                # 画面上のタイトルが多すぎる時は生成しない。(QualityControllerが決める)
+                if scene.book_count() >= app.max_visible:
+                    return
                 # 文字の横位置、フォントサイズ、タイトルをランダム指定
-                maxnum = int(60*app.canvas.width/1920)
-                minnum = int(10*app.canvas.width/1920)
+                minnum, maxnum = app.layout.min_font, app.layout.max_font
+                maxnum = minnum + int((maxnum - minnum) * app.font_scale)
                 size = app.math.randint(minnum, maxnum)
-                p = Vector2D(app.math.randint(0, int(rect.s.x)), 0)
-                title = app.titles[app.math.randint(0, app.lentitles)]
-                # 速度は一定
-                v = Vector2D(0,0.016*size+0.84)
-                # インスタンス追加
-                books.append(Book(app,p,v,title,size))
+                x = app.math.randint(0, int(rect.s.x))
+                title = app.titles.next()
+                # ジャンルで絞り込んでいて、当てはまるタイトルが無い
+                if title is None:
+                    return
+                # 速度は一定(px/秒)
+                vy = (0.016*size+0.84)*BASE_FPS
+                # 追加
+                if isinstance(books, (BookField, BookLayers)):
+                    books.spawn(x, 0, vy, size, title)
+                else:
+                    books.create(Book, app, Vector2D(x,0), Vector2D(0,vy), title, size)
 
 
 # メイン画面
 class GameMainScene(Scene):
-    def __init__(self):
+    # renderer : 'field'ならBookField、'objects'ならBookをGameObjectManagerで管理する。
+    #            'layer'ならBookLayersで、落ちる速さの帯ごとの層に描いておく。
+    # bands    : renderer == 'layer' の時の層の数
+    def __init__(self, renderer:str = 'field', bands:int = 4):
         # 描画中に個数が増減するインスタンスを管理するスタックはGameobjectManager()として定義。
         # そのスタックの中にインスタンスを入れる。消すときはスタックからの削除とインスタンスのdeletedをTrueにする。
         # ゲーム中で個数が一定のインスタンスはGameobjectを継承したインスタンスを作成。
 
         # 描画する本のリスト
-        self.books = GameObjectManager()
+        self.books:GameObjectManager | BookField | BookLayers
+        if renderer == 'objects':
+            self.books = GameObjectManager()
+        elif renderer == 'layer':
+            self.books = BookLayers(bands)
+        else:
+            self.books = BookField()
+
+        # ここでゲームにただひとつだけ必要なインスタンスを生成する。
+        # initはここでしか呼ばれない。
+        self.manager = BookManager()
 
         # 描画優先順位の逆順で登録しておく。(その順番で呼び出したいので)
         self.draw_objects = (
             self.books,
-            # ここでゲームにただひとつだけ必要なインスタンスを生成する。
-            # initはここでしか呼ばれない。
-            BookManager(), 
+            self.manager,
         )
+        # FrameProfilerで計測する時の、draw_objectsそれぞれの段階の名前
+        self.phase_names = ("objects", "spawn")
 
     #ここで各gameobjectのondrawの処理が呼ばれる
     def onDraw(self, app:"TheApp"):
         # スクリーンのクリアと画面幅の調整
         # canvasの引数にcolorを入れるとcanvasの背景色を指定できる。          
         app.canvas.clear(color=app.color[app.backcolor])
+        # 処理時間の計測(URLの ?profile=1 の時だけ)
+        prof = app.gametimer.profiler
+        if prof is not None:
+            prof.lap("clear")
+
+        # 前のフレームからの経過時間(秒)
+        app.dt = app.gametimer.dt
+        if app.interpolate:
+            # 一定間隔(app.tick)で何回進めるかと、描画する位置の補間の割合を決める。
+            app.sim_acc += app.dt
+            app.steps = min(int(app.sim_acc // app.tick), 5)
+            app.sim_acc = min(app.sim_acc - app.steps * app.tick, app.tick)
+            app.alpha = app.sim_acc / app.tick
+        # 品質の自動調整に、前のフレームの処理時間を渡す。
+        app.quality.observe(app.gametimer.work_ms, app.dt)
 
         # スペースキー相当のキーが押されたら色反転
         app.keyinput.update()
+        if prof is not None:
+            prof.lap("keyinput")
         if app.keyinput.is_key_pushed(VKEY.SPACE):
             app.backcolor = (-app.backcolor+1)
             app.wordcolor = (-app.wordcolor+1)
+            # 前の色で描いた文字列の画像はもう使わないので捨てる。
+            app.canvas.sprites.clear()
+        # ジャンルの切り替え(TheApp.on_genre_keyでイベントにしたもの)
+        for spec in app.keyinput.events:
+            app.set_genre(spec)
 
         # 描画優先順位の逆順で描画していく。
-        for object in self.draw_objects:
-            object.onDraw(app)
+        if prof is None:
+            for object in self.draw_objects:
+                object.onDraw(app)
+        else:
+            for name, object in zip(self.phase_names, self.draw_objects):
+                object.onDraw(app)
+                prof.lap(name)
+
+        # text_mode == 'batch' の時にたまった文字列をまとめて描く。
+        if app.text_batch:
+            app.canvas.draw_texts_center(app.text_batch)
+            app.text_batch.clear()
+
+        if prof is not None:
+            prof.lap("flush")
+            app.canvas.draw_profiler(prof)
+            prof.lap("overlay")
+
+    # 画面上のタイトルの数
+    def book_count(self)->int:
+        if isinstance(self.books, (BookField, BookLayers)):
+            return len(self.books)
+        return len(self.books.objects)
 
     
 # ゲームアプリのメインコントローラ
 class TheApp(GameContext):
     def __init__(self):
+        # URLのクエリ文字列での設定
+        params = query_params()
 
         # 描画用スクリーン
-        self.canvas = Canvas()
+        # devicePixelRatioの上限はURLの ?dpr=N で指定(省略時は2)
+        self.canvas = Canvas(max_dpr=float(params.get('dpr', 2)))
+        # 画面の大きさから決まる値。大きさが変わったら計算し直す。
+        self.layout = Layout(self.canvas)
+        self.canvas.add_resize_listener(self.layout.update)
+
+        # 乱数の種(URLの ?seed=N)。指定した時は、タイトルの選び方や降る位置などの乱数をすべて種から作るので、
+        # 同じ操作なら毎回同じように降る。(bench/bench_frames.py --seed、--replay)
+        # 用途ごとに別の乱数にしておき、タイトルの届く順番などが変わっても互いに影響しないようにする。
+        self.seed = int(params['seed']) if params.get('seed', '').isdigit() else None
+        def new_rng(name:str):
+            return random.Random(f"{self.seed}:{name}") if self.seed is not None else random
+        MathTools.set_rng(new_rng("math"))
+        req.set_rng(new_rng("req"))
+        meigen_rng = new_rng("meigen")
+        titles_rng = new_rng("titles")
+        # ウェルカムメッセージの名言と著者
+        self.told, self.author = meigen.choose(meigen_rng)
 
         # 数学関連のツール
         self.math = MathTools()
         
         # 最初に遷移すべきScene
-        self.scene:Scene = GameMainScene()
+        # タイトルの持ち方はURLの ?renderer=field|objects|layer で指定(layerの層の数は ?bands=N。1～8、省略時は4)
+        bands = min(max(int(params['bands']), 1), 8) if params.get('bands', '').isdigit() else 4
+        self.scene:Scene = GameMainScene(params.get('renderer', 'field'), bands)
         # ゲームの最終スコア記録用
         self.score = 0
 
         # タイトル
-        self.titles = []
+        # 読み込みは非同期で、届いた分からadd_titles()で追加される。
+        # 残りが少なくなったらrefill_titles()で補充される。
+        # 前回までに読み込んだタイトルはlocalStorageに保存しておき、次に開いた時にすぐ降らせる。
+        # (URLの ?cache=0 で保存したものを使わない)
+        self.title_cache = TitleCache(MemoryStorage() if params.get('cache') == '0' else None)
+        # openBDの代わりに問い合わせるサーバー(URLの ?openbd=http://localhost:8001/v1。bench/openbd_server.py)
+        # 指定した時は、問い合わせの結果をコンソールに表示する。
+        if params.get('openbd'):
+            req.set_api(params['openbd'], echo=True)
+        # あらかじめ作っておいたタイトルパック(?pack=data/titles.pack)や、その分割(?shards=data/shards/manifest.json)から読み込む。
+        # 1を指定するとそれぞれ置く場所から取得する。指定しなければ最初からopenBDに問い合わせる。
+        req.set_sources(params.get('shards'), params.get('pack'))
+        self.titles = TitlePool(capacity=2000, low_watermark=100, on_low=self.refill_titles, rng=titles_rng)
         self.lentitles = 0
+        self.refill_titles()
+
+        # ジャンル(Cコード)での絞り込み。URLの ?genre=literature や ?genre=children+g9 で指定する。
+        # 数字キーで内容の大分類(9なら文学)、Kキーで児童書、Aキーですべてに切り替える。
+        # 読み込み済みのタイトルから選び直すだけなので、切り替えても読み込みは行わない。
+        if params.get('genre'):
+            self.set_genre(params['genre'])
+        document.bind("keydown", self.on_genre_key)
 
         # ウェルカムメッセージのフラグ
         self.flg = False
-        self.fflg = False
+
+        # タイトルの描き方(URLの ?text=sprite|batch|direct で指定)
+        #   sprite : 画像にしてキャッシュしたものを描く
+        #   batch  : fontと色でまとめて描く
+        #   direct : 1つずつdraw_text_centerで描く
+        self.text_mode = params.get('text', 'sprite')
+        self.text_batch:list[tuple[str, float, float, str, str]] = []
+
+        # 動きの計算
+        # dt          : 前のフレームからの経過時間(秒)
+        # interpolate : Trueなら一定間隔tick(秒)で動きを計算し、描画はその間を補間する(URLの ?interp=1)
+        self.dt = 1 / BASE_FPS
+        self.interpolate = params.get('interp') == '1'
+        self.tick = 1 / BASE_FPS
+        self.sim_acc = 0.0
+        self.steps = 0
+        self.alpha = 1.0
 
         # 文字色と背景色
         self.color = {0:'black',1:'white'}
@@ -167,15 +712,102 @@ class TheApp(GameContext):
         self.keyinput.configure_1key_game()
 
         # 音声ファイル
-        # audio_loader = AudioLoader(Audio.audio_file_list)
+        # audio_loader = yanesdk.AudioLoader(yanesdk.Audio.audio_file_list)
         # self.audios = audio_loader.audios
         # 描画のloop
-        self.gametimer = GameTimer(lambda : self.scene.onDraw(self), fps=75)
+        # 画面の更新に合わせて(requestAnimationFrameで)描画する。タブが非表示の間は止まる。
+        self.gametimer = GameTimer(lambda : self.scene.onDraw(self), fps=75, use_raf=True)
+
+        # 品質の自動調整。遅い端末では、タイトルの数や大きさ、fpsを下げる。
+        # URLの ?quality=off で自動調整をやめ、?quality=N で N段目(0が最高)に固定する。
+        # max_visible : 画面上のタイトルの最大数
+        # font_scale  : フォントサイズの範囲の倍率
+        self.max_visible = 1000
+        self.font_scale = 1.0
+        self.quality = QualityController(on_change=self.apply_quality, echo=True)
+        quality = params.get('quality', '')
+        if quality == 'off':
+            self.quality.fix(0)
+        elif quality.isdigit():
+            self.quality.fix(min(int(quality), len(self.quality.levels) - 1))
+        self.apply_quality(self.quality.level)
+
+        # 起動時の各モジュールの読み込み時間をコンソールに表示する(URLの ?startup=1)
+        if params.get('startup') == '1':
+            print(yanesdk.format_startup_report())
+
+        # 処理時間の計測(URLの ?profile=1)。画面の左上に表示し、Pキーで計測結果をJSONでダウンロードする。
+        # 計測中はキー入力も記録しておき、計測結果の "meta" に入れる。
+        # ?seed=N も付けておけば、bench/bench_frames.py --replay で同じ操作をCPython上で再現できる。
+        if params.get('profile') == '1':
+            self.gametimer.profiler = FrameProfiler()
+            self.gametimer.profiler.meta.update({
+                "seed"  : self.seed,
+                "search": window.location.search,
+                "width" : self.canvas.width,
+                "height": self.canvas.height,
+                "dpr"   : self.canvas.dpr,
+            })
+            self.keyinput.start_recording()
+            document.bind("keydown", self.on_profile_key)
+
+    # 品質を設定する。(QualityControllerから呼び出される)
+    def apply_quality(self, level:QualityLevel):
+        scene = cast(GameMainScene, self.scene)
+        scene.manager.spawn_interval = 15 / BASE_FPS * level.spawn_scale
+        self.max_visible = level.max_visible
+        self.font_scale = level.font_scale
+        self.tick = 1 / level.fps
+        self.gametimer.set_fps(level.fps)
+
+    # Pキーで計測結果をダウンロードする。
+    def on_profile_key(self, e:DOMEvent):
+        if getattr(e, 'key', '') in ('p', 'P') and self.gametimer.profiler is not None:
+            if self.keyinput.recording:
+                self.gametimer.profiler.meta["input"] = self.keyinput.get_recording()
+            self.gametimer.profiler.download()
+
+    # ジャンルの絞り込みを変える。spec は genre.parse_filter() の形式。
+    def set_genre(self, spec:str):
+        try:
+            self.titles.set_filter(spec)
+        except ValueError as e:
+            print(e)
+            return
+        print(f"genre: {genre.describe(self.titles.filter)} ({self.titles.remaining()} titles)")
+
+    # ジャンルを切り替えるキー。すぐには切り替えず、次のフレームでkeyinputのイベントとして切り替える。
+    # (?profile=1 の時にキー入力と一緒に記録され、--replay で同じフレームに切り替わる)
+    def on_genre_key(self, e:DOMEvent):
+        key = getattr(e, 'key', '')
+        if key.isdigit() and len(key) == 1:
+            self.keyinput.push_event('g' + key)
+        elif key in ('k', 'K'):
+            self.keyinput.push_event('children')
+        elif key in ('a', 'A'):
+            self.keyinput.push_event('all')
+
+    # 読み込めたタイトルを追加する。(req.TitleLoaderから呼び出される)
+    # ccodes : タイトルのCコード
+    def add_titles(self, titles:list[str], ccodes:list[str] | None = None):
+        self.titles.add(titles, ccodes)
+
+    # タイトルの読み込み(補充)を開始する。(TitlePoolの残りが少なくなった時にも呼び出される)
+    def refill_titles(self, pool:TitlePool | None = None):
+        self.titles.refilling = True
+        self.loader = req.load_titles(self.add_titles, on_done=self.on_titles_loaded, cache=self.title_cache)
+
+    # タイトルの読み込みが終わった時に呼び出される。
+    # 処理時間の計測中(?profile=1)は、タイトルの正規化の結果(重複の数、減ったメモリ)をコンソールに表示する。
+    def on_titles_loaded(self):
+        self.titles.refill_done()
+        if self.gametimer.profiler is not None and self.titles.normalizer is not None:
+            print(self.titles.normalizer.format_report())
 
 
 if __name__ == '__main__':
     try:
         TheApp()
     except:
-        InfoDialog('エラーが発生しました。', traceback.format_exc())
+        yanesdk.InfoDialog('エラーが発生しました。', traceback.format_exc())
     
\ No newline at end of file
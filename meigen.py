@@ -35,4 +35,9 @@ say={
     '本を読むことを止めることは、思索することを止めることである。': 'フョードル・ドストエフスキー（ロシアの小説家、思想家／1821－1881）',
     '少しの隙あらば、物の本を、文字のある物を懐に入れ、常に人目を忍び、見るべし。': '北条早雲（戦国時代初期の武将／1456－1519）',
 }
-told, author = random.choice(list(say.items()))
+
+# 名言と著者を1つ選ぶ。(rng : 乱数。種をそろえた実行ではrandom.Randomを渡す)
+def choose(rng=random) -> tuple[str, str]:
+    return rng.choice(list(say.items()))
+
+told, author = choose()
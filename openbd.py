@@ -0,0 +1,375 @@
+# ==============================================================================
+#                     openBD /v1/get のクライアント(非同期)
+# ==============================================================================
+
+# ISBNのlistを小さいバッチに分けて /v1/get に問い合わせる。
+#
+#  - 同時に問い合わせるバッチは concurrency 個まで。1つ終わるたびに次のバッチを送る。
+#  - 1回の問い合わせは timeout 秒で打ち切る。
+#  - 失敗(通信エラー、429、5xx、タイムアウト、応答が壊れている)したバッチは retries 回までやり直す。
+#    やり直すまでの待ち時間は backoff * 2**(やり直した回数) 秒(max_backoff まで)に、0.5〜1.5倍の揺らぎ(jitter)を掛けたもの。
+#    (同時に失敗したバッチが、同じ時刻にそろってやり直さないように)
+#  - 届いたバッチから on_records(レコードのlist) を呼び出す(届いた順)。
+#    やり直しても失敗したバッチは failed に残して飛ばし、届いた分だけで続ける。
+#  - すべてのバッチが終わったら(失敗したものがあっても) on_done(fetch) を呼び出す。
+#
+# 使い方)
+#   client = OpenBDClient(concurrency=3)
+#   client.fetch(isbns, on_records, on_done)
+
+import json
+import random
+import re
+
+API_URL = 'https://api.openbd.jp/v1'
+# 1回の/v1/getで問い合わせるISBNの数。
+# 最初の1回は、はやくタイトルを降らせはじめるために小さくしておく。
+FIRST_BATCH_SIZE = 20
+BATCH_SIZE = 60
+
+# ISBNのlistを、/v1/getで問い合わせる単位に分ける。
+def split_batches(isbns, first=FIRST_BATCH_SIZE, size=BATCH_SIZE):
+    batches = [isbns[:first]]
+    for i in range(first, len(isbns), size):
+        batches.append(isbns[i:i+size])
+    return [batch for batch in batches if batch]
+
+# ------------------------------------------------------------------------------
+#                     /v1/getの応答から必要な部分だけを取り出す
+# ------------------------------------------------------------------------------
+
+# /v1/getの応答は、1冊あたり数KBのONIX、hanmoto、summaryのJSON。
+# json.loadsで全体をdictにすると、使わない内容紹介なども含めて大量のオブジェクトができる。
+# ここでは応答の文字列を正規表現で先頭から走査し、各レコードの
+#   onix.RecordReference                                          (ISBN)
+#   onix.DescriptiveDetail.TitleDetail.TitleElement.TitleText.content (タイトル)
+#   onix.DescriptiveDetail.Subject の SubjectSchemeIdentifier 78 の SubjectCode (Cコード)
+# だけを文字列として取り出す。null のレコードやタイトルのないレコードは飛ばす。
+#
+# シリーズ名(DescriptiveDetail.Collection.TitleDetail)にも TitleText があるので、
+# "TitleDetail" がDescriptiveDetailの直下にあるかを、間の括弧の深さで確かめる。
+# ("Subject" はONIXではDescriptiveDetailの直下にしかないので、確かめない)
+# Subjectの要素は、文字列だけのオブジェクト({...})として1つずつ切り出してから、その中でキーを探す。
+# (キーの順番や間のキーによらない) 要素が入れ子になっているなど、切り出せないレコードはjson.loadsで読む。
+
+# JSONの文字列(中身)
+_STR = r'"([^"\\]*(?:\\.[^"\\]*)*)"'
+# レコードの先頭。null のレコードは、前のレコードの範囲に入るだけで何も取り出されない。
+_RECORD = re.compile(r'"onix"\s*:')
+_ISBN = re.compile(r'"RecordReference"\s*:\s*' + _STR)
+_DESCRIPTIVE = re.compile(r'"DescriptiveDetail"\s*:\s*\{')
+_TITLE_DETAIL = re.compile(r'"TitleDetail"\s*:')
+# TitleTextのオブジェクト(値はすべて文字列)。group(1)が中身。
+# 組の間の , は省略できないようにしておく。(省略できると、壊れた応答で照合のやり直しが組の数の指数になる)
+_PAIR = _STR + r'\s*:\s*' + _STR
+_TITLE_TEXT = re.compile(r'"TitleText"\s*:\s*\{(\s*(?:' + _PAIR + r'(?:\s*,\s*' + _PAIR + r')*)?)\s*\}')
+_CONTENT = re.compile(r'"content"\s*:\s*' + _STR)
+_SUBJECT = re.compile(r'"Subject"\s*:\s*\[')
+# Subjectの要素1つ(中に括弧のないオブジェクト)。group(1)が要素。
+_FLAT_ELEMENT = re.compile(r'\s*,?\s*(\{[^{}\[\]"]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^{}\[\]"]*)*\})')
+_ARRAY_END = re.compile(r'\s*\]')
+_SCHEME_CCODE = re.compile(r'"SubjectSchemeIdentifier"\s*:\s*"78"')
+_SUBJECT_CODE = re.compile(r'"SubjectCode"\s*:\s*' + _STR)
+_ANY_STR = re.compile(_STR)
+# 文字列か括弧1つ(レコードの先頭を探す時に、括弧の深さを数える)
+_TOKEN = re.compile(_STR + r'|[{}\[\]]')
+
+# JSONの文字列の中身をPythonの文字列にする。(エスケープがある時だけjson.loadsを使う)
+def _unescape(raw:str) -> str:
+    return json.loads('"' + raw + '"') if '\\' in raw else raw
+
+# text[start:end]の括弧の深さ。(文字列の中の括弧は数えない)
+def _depth(text:str, start:int, end:int) -> int:
+    part = _ANY_STR.sub('', text[start:end])
+    return part.count('{') + part.count('[') - part.count('}') - part.count(']')
+
+# オブジェクト(中身がstartから始まる)の直下にあるpatternを探す。無ければNone。
+def _search_direct(pattern, text:str, start:int, end:int):
+    pos = start
+    while True:
+        m = pattern.search(text, pos, end)
+        if m is None or _depth(text, start, m.start()) == 0:
+            return m
+        pos = m.end()
+
+# DescriptiveDetail(中身がdetailから始まる)のSubjectからCコードを取り出す。無ければ''。
+# 要素を切り出せなければValueError。
+def _scan_ccode(text:str, detail:int, end:int) -> str:
+    m = _SUBJECT.search(text, detail, end)
+    if m is None:
+        return ""
+    pos = m.end()
+    while not _ARRAY_END.match(text, pos, end):
+        e = _FLAT_ELEMENT.match(text, pos, end)
+        if e is None:
+            raise ValueError("unexpected Subject element")
+        pos = e.end()
+        if _SCHEME_CCODE.search(text, e.start(1), pos):
+            code = _SUBJECT_CODE.search(text, e.start(1), pos)
+            return _unescape(code.group(1)) if code else ""
+    return ""
+
+# text[start:end](1冊分)から (タイトル, ISBN, Cコード) を取り出す。タイトルが無ければNone。
+def _scan_record(text:str, start:int, end:int):
+    m = _DESCRIPTIVE.search(text, start, end)
+    if m is None:
+        return None
+    detail = m.end()
+    t = _search_direct(_TITLE_DETAIL, text, detail, end)
+    if t is None:
+        return None
+    tt = _TITLE_TEXT.search(text, t.end(), end)
+    c = _CONTENT.search(tt.group(1)) if tt else None
+    if c is None or not c.group(1):
+        return None
+    isbn = _ISBN.search(text, start, end)
+    return (_unescape(c.group(1)),
+            _unescape(isbn.group(1)) if isbn else "",
+            _scan_ccode(text, detail, end))
+
+# "onix"(startの位置)を直下に持つレコードの { の位置。
+# prev は1つ前のレコードの "onix" の位置(そのレコードの直下)で、最初のレコードならNone(配列の [ から数える)。
+# "hanmoto" や "summary" が "onix" より前にあることもあるので、直前の { ではなく、括弧の深さで探す。
+def _record_begin(text:str, start:int, prev:int | None) -> int:
+    if prev is None:
+        pos, depth = text.index('[') + 1, 0
+    else:
+        pos, depth = prev, 1
+    begin = -1
+    for m in _TOKEN.finditer(text, pos, start):
+        c = text[m.start()]
+        if c == '{' or c == '[':
+            depth += 1
+            if depth == 1 and c == '{':
+                begin = m.start()
+        elif c == '}' or c == ']':
+            depth -= 1
+    if begin < 0 or depth != 1:
+        raise ValueError("record start not found")
+    return begin
+
+# text[start:end](1冊分)を、json.loadsで読んで取り出す。(_scan_recordでたどれなかった時)
+# prev : 1つ前のレコードの "onix" の位置(_record_beginを参照)
+def _load_record(text:str, start:int, prev:int | None):
+    decoder = json.JSONDecoder()
+    try:
+        r = decoder.raw_decode(text, _record_begin(text, start, prev))[0]
+    except ValueError:
+        return None
+    records = _records_of([r])
+    return records[0] if records else None
+
+# /v1/getの応答から (タイトル, ISBN, Cコード) を1冊ずつ返す。
+# データのない(null)レコードやタイトルのないレコードは飛ばす。JSONの配列でなければValueError。
+def iter_records(text:str):
+    if not text.lstrip().startswith('['):
+        raise ValueError("not a JSON array")
+    starts = [m.start() for m in _RECORD.finditer(text)]
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else len(text)
+        try:
+            record = _scan_record(text, start, end)
+        except ValueError:
+            record = _load_record(text, start, starts[i - 1] if i else None)
+        if record is not None:
+            yield record
+
+# /v1/getの応答から (タイトル, ISBN, Cコード) のlistを返す。
+def parse_records(text):
+    return list(iter_records(text))
+
+# ONIXのレコード(dict)からCコードを取り出す。(SubjectSchemeIdentifierが78のSubjectCode) 無ければ''。
+def ccode_of(onix):
+    for subject in onix["DescriptiveDetail"].get("Subject", []):
+        if subject.get("SubjectSchemeIdentifier") == "78":
+            return subject.get("SubjectCode", "")
+    return ""
+
+# json.loadsで読んだレコードのlistから (タイトル, ISBN, Cコード) のlistを返す。
+def _records_of(rs):
+    records = []
+    for r in rs:
+        if not r:
+            continue
+        try:
+            title = r["onix"]["DescriptiveDetail"]["TitleDetail"]["TitleElement"]["TitleText"].get("content")
+        except (KeyError, TypeError):
+            continue
+        if title:
+            records.append((title, r["onix"].get("RecordReference", ""), ccode_of(r["onix"])))
+    return records
+
+# parse_records()と同じものを、json.loadsで全体をdictにしてから取り出す。(比較・確認用)
+def parse_records_json(text):
+    return _records_of(json.loads(text))
+
+# やり直す価値のあるステータスコードならTrue。(0は通信エラー)
+def retryable(status:int) -> bool:
+    return status == 0 or status == 429 or status >= 500
+
+# 1回のfetch()の進み具合と結果
+class OpenBDFetch:
+    def __init__(self, client:'OpenBDClient', batches:list, on_records, on_done):
+        self.client = client
+        self.on_records = on_records
+        self.on_done = on_done
+        # まだ送っていないバッチ。(バッチ, やり直した回数)
+        self._queue = [(batch, 0) for batch in reversed(batches)]
+        # 問い合わせ中とやり直し待ちのバッチの数
+        self.in_flight = 0
+        self.waiting = 0
+        self.batches = len(batches)
+        # 結果
+        self.records = 0
+        self.requests = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.errors = 0
+        # やり直しても失敗したバッチ
+        self.failed:list[list[str]] = []
+        # 各問い合わせにかかった時間(ms)。失敗したものも含む。
+        self.latencies:list[float] = []
+        # fetch()を呼んでから、最初のレコードが届くまでと、終わるまでの時間(ms)
+        self.started_ms = client._now()
+        self.first_ms = -1.0
+        self.elapsed_ms = -1.0
+        self.done = False
+        self.cancelled = False
+
+    # 残りのバッチを送らない。(問い合わせ中のものの応答は捨てる)
+    def cancel(self):
+        self.cancelled = True
+        self._queue.clear()
+
+    # 空きがあるだけバッチを送る。
+    def _pump(self):
+        client = self.client
+        while self._queue and self.in_flight < client.concurrency:
+            batch, attempt = self._queue.pop()
+            self.in_flight += 1
+            self._send(batch, attempt)
+        if not self._queue and self.in_flight == 0 and self.waiting == 0 and not self.done:
+            self.done = True
+            self.elapsed_ms = client._now() - self.started_ms
+            if self.on_done and not self.cancelled:
+                self.on_done(self)
+
+    def _send(self, batch, attempt):
+        client = self.client
+        self.requests += 1
+        sent = client._now()
+        # 完了とタイムアウトの両方が来ても、先に来た方だけを扱う。
+        settled = [False]
+
+        def complete(req):
+            if settled[0]:
+                return
+            settled[0] = True
+            self.latencies.append(client._now() - sent)
+            if req.status == 200:
+                try:
+                    records = parse_records(req.text)
+                except (ValueError, KeyError, TypeError):
+                    self._failed(batch, attempt, 0)
+                    return
+                self._received(records)
+            else:
+                self._failed(batch, attempt, req.status)
+
+        def timeout(*args):
+            if settled[0]:
+                return
+            settled[0] = True
+            self.latencies.append(client._now() - sent)
+            self.timeouts += 1
+            self._failed(batch, attempt, 0)
+
+        client._get(client.api_url + '/get?isbn=' + '%2C'.join(batch), complete, timeout)
+
+    def _received(self, records):
+        self.in_flight -= 1
+        if not self.cancelled:
+            if self.first_ms < 0:
+                self.first_ms = self.client._now() - self.started_ms
+            self.records += len(records)
+            self.on_records(records)
+        self._pump()
+
+    def _failed(self, batch, attempt, status):
+        self.in_flight -= 1
+        self.errors += 1
+        client = self.client
+        if self.cancelled or attempt >= client.retries or not retryable(status):
+            self.failed.append(batch)
+            self._pump()
+            return
+        # 少し待ってからやり直す
+        self.retries += 1
+        self.waiting += 1
+
+        def retry():
+            self.waiting -= 1
+            if not self.cancelled:
+                self._queue.append((batch, attempt + 1))
+            self._pump()
+
+        client._set_timeout(retry, client.retry_delay(attempt))
+        self._pump()
+
+    # 各問い合わせにかかった時間のpパーセンタイル(ms)
+    def latency(self, p:float) -> float:
+        if not self.latencies:
+            return 0.0
+        values = sorted(self.latencies)
+        return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+    # 結果の要約(表示用)
+    def summary(self) -> str:
+        return (f"openBD: {self.records} records, {self.batches} batches, {self.requests} requests, "
+                f"{self.retries} retries, {self.timeouts} timeouts, {len(self.failed)} failed, "
+                f"first {self.first_ms:.0f}ms, total {self.elapsed_ms:.0f}ms, "
+                f"p50 {self.latency(50):.0f}ms, p95 {self.latency(95):.0f}ms, p99 {self.latency(99):.0f}ms")
+
+class OpenBDClient:
+    # api_url     : openBDのAPIのURL(末尾の/v1まで)。テスト用のサーバーを指定することもできる。
+    # concurrency : 同時に問い合わせるバッチの最大数
+    # timeout     : 1回の問い合わせの制限時間(秒)
+    # retries     : 失敗したバッチをやり直す最大の回数
+    # backoff     : 1回目のやり直しまでの待ち時間(秒)
+    # max_backoff : やり直しまでの待ち時間の上限(秒)
+    # rng         : jitterに使う乱数(random.Randomのインスタンスかrandomモジュール)
+    def __init__(self, api_url:str = API_URL, concurrency:int = 3, timeout:float = 5.0, retries:int = 2,
+                 backoff:float = 0.5, max_backoff:float = 4.0, rng=random):
+        self.api_url = api_url
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rng = rng
+
+    # attempt回やり直した後の、次のやり直しまでの待ち時間(ms)
+    def retry_delay(self, attempt:int) -> float:
+        delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+        return delay * (0.5 + self.rng.random()) * 1000
+
+    # isbnsのタイトルを問い合わせる。
+    # on_records : 届いたバッチごとに、(タイトル, ISBN, Cコード) のlistを渡して呼び出す。
+    # on_done    : すべてのバッチが終わった時に、OpenBDFetchを渡して呼び出す。
+    def fetch(self, isbns, on_records, on_done=None, first:int = FIRST_BATCH_SIZE, size:int = BATCH_SIZE) -> OpenBDFetch:
+        fetch = OpenBDFetch(self, split_batches(isbns, first, size), on_records, on_done)
+        fetch._pump()
+        return fetch
+
+    def _get(self, url, on_complete, on_timeout):
+        from browser import ajax # type:ignore
+        ajax.get(url, mode='text', oncomplete=on_complete, timeout=self.timeout, ontimeout=on_timeout)
+
+    def _set_timeout(self, callback, ms:float):
+        from browser import window # type:ignore
+        window.setTimeout(callback, ms)
+
+    # 現在時刻(ms)
+    def _now(self) -> float:
+        from browser import window # type:ignore
+        return window.performance.now()
@@ -0,0 +1,194 @@
+# ==============================================================================
+#                       描画の品質の自動調整
+# ==============================================================================
+
+# フレームの処理時間を見て、目標のfpsを保てるように品質(QualityLevel)を上げ下げする。
+#
+#  - WINDOWフレームごとに、処理時間の90パーセンタイル(p90)と、フレームの間隔(dt)の中央値を調べる。
+#  - p90がfpsの1フレーム分の時間(budget)の DOWN_RATIO 倍を超えているか、
+#    dtの中央値が目標の間隔の SLOW_DT_RATIO 倍を超えていれば「遅い」。
+#    遅いのが down_after 回続いたら、品質を1段下げる。
+#  - p90が1段上の品質のbudgetの UP_RATIO 倍を下回り、dtも遅くなければ「速い」。
+#    速いのが up_after 回続いたら、品質を1段上げる。
+#  - 変えた直後の COOLDOWN 回は様子を見る(変えない)。
+#  - 上げてすぐに下げることになったら、次に上げるまでの回数(up_after)を倍にする。(行ったり来たりしないように)
+#
+# 変えるたびに on_change(level) を呼び出す。
+# 判定のたびに(変えなかった時も)、結果と理由、p90、dt、続いた回数を log に残す。
+
+from array import array
+
+# 品質の1段分
+# spawn_scale : タイトルを生成する間隔の倍率
+# max_visible : 画面上のタイトルの最大数
+# font_scale  : フォントサイズの範囲(最大 - 最小)の倍率
+# fps         : 1秒間のフレーム数
+class QualityLevel:
+    def __init__(self, spawn_scale:float, max_visible:int, font_scale:float, fps:int):
+        self.spawn_scale = spawn_scale
+        self.max_visible = max_visible
+        self.font_scale = font_scale
+        self.fps = fps
+
+    def __str__(self):
+        return f"spawn x{self.spawn_scale}, max {self.max_visible}, font x{self.font_scale}, {self.fps}fps"
+
+# 高い品質の順
+DEFAULT_LEVELS = (
+    QualityLevel(1.0, 1000, 1.0, 75),
+    QualityLevel(1.5,  200, 0.9, 60),
+    QualityLevel(2.0,  120, 0.8, 45),
+    QualityLevel(3.0,   60, 0.7, 30),
+)
+
+class QualityController:
+    # 何フレームごとに判定するか
+    WINDOW = 60
+    # 遅い、速いの判定に使う割合
+    DOWN_RATIO = 0.85
+    UP_RATIO = 0.5
+    SLOW_DT_RATIO = 1.5
+    # 変えた直後に様子を見る判定の回数
+    COOLDOWN = 3
+    # up_afterの上限
+    MAX_UP_AFTER = 64
+    # logに残す判定の数(古いものから捨てる)
+    LOG_SIZE = 1000
+
+    # levels     : 品質(高い順)
+    # on_change  : 品質を変えた時に呼び出す関数。on_change(level)
+    # level      : 最初の品質の段(levelsの添字)
+    # down_after : 遅いのが何回続いたら下げるか
+    # up_after   : 速いのが何回続いたら上げるか
+    # echo       : Trueなら判定の記録をprint()でも出力する
+    def __init__(self, levels=DEFAULT_LEVELS, on_change=None, level:int = 0,
+                 down_after:int = 2, up_after:int = 5, echo:bool = False):
+        self.levels = levels
+        self.on_change = on_change
+        self.index = level
+        self.down_after = down_after
+        self.up_after = up_after
+        self.echo = echo
+        # Falseなら判定しない(品質を固定する)
+        self.enabled = True
+
+        # 今の判定の区間の処理時間(ms)とフレームの間隔(ms)
+        self._work = array('d')
+        self._dt = array('d')
+        # 遅い、速いが続いた回数
+        self._slow = 0
+        self._fast = 0
+        self._cooldown = 0
+        # 最後に品質を上げた時の判定の回数
+        self._raised_at = -1
+        # 判定した回数
+        self.windows = 0
+        # 判定の記録
+        self.log:list[dict] = []
+
+    # 今の品質
+    @property
+    def level(self) -> QualityLevel:
+        return self.levels[self.index]
+
+    # 1フレーム分を記録する。
+    # work_ms : フレームの処理にかかった時間(ms)
+    # dt      : 前のフレームからの経過時間(秒)
+    def observe(self, work_ms:float, dt:float):
+        if not self.enabled:
+            return
+        self._work.append(work_ms)
+        self._dt.append(dt * 1000)
+        if len(self._work) >= QualityController.WINDOW:
+            self._decide()
+            del self._work[:]
+            del self._dt[:]
+
+    # 区間の結果から品質を決める。
+    def _decide(self):
+        self.windows += 1
+        work = sorted(self._work)
+        p90 = work[len(work) * 90 // 100]
+        dts = sorted(self._dt)
+        dt_median = dts[len(dts) // 2]
+
+        level = self.level
+        budget = 1000 / level.fps
+        slow_dt = dt_median > budget * QualityController.SLOW_DT_RATIO
+        slow = p90 > budget * QualityController.DOWN_RATIO or slow_dt
+        fast = False
+        if self.index > 0:
+            upper_budget = 1000 / self.levels[self.index - 1].fps
+            fast = p90 < upper_budget * QualityController.UP_RATIO and not slow_dt
+
+        # action : down(下げた)、up(上げた)、hold(変えなかった)
+        action = "hold"
+        index = self.index
+        if self._cooldown > 0:
+            self._cooldown -= 1
+            reason = "cooldown"
+        elif slow:
+            self._fast = 0
+            self._slow += 1
+            reason = f"slow: p90 {p90:.1f}ms / budget {budget:.1f}ms, dt {dt_median:.1f}ms"
+            if self._slow >= self.down_after and self.index < len(self.levels) - 1:
+                if self._raised_at >= 0 and self.windows - self._raised_at <= QualityController.COOLDOWN + self.down_after:
+                    # 上げたらすぐに遅くなったので、次に上げるまでを長くする。
+                    self.up_after = min(self.up_after * 2, QualityController.MAX_UP_AFTER)
+                action = "down"
+                index = self.index + 1
+        elif fast:
+            self._slow = 0
+            self._fast += 1
+            reason = f"fast: p90 {p90:.1f}ms / budget {upper_budget:.1f}ms, dt {dt_median:.1f}ms"
+            if self._fast >= self.up_after:
+                action = "up"
+                index = self.index - 1
+                self._raised_at = self.windows
+        else:
+            self._slow = 0
+            self._fast = 0
+            reason = "steady"
+
+        entry = self._record(action, index, reason, p90, dt_median)
+        if action != "hold":
+            self._change(entry)
+
+    # 判定の記録をlogに残す。(品質を変えなかった判定も残す)
+    # slow、fast は判定した時点での、遅い、速いが続いた回数
+    def _record(self, action:str, index:int, reason:str, p90:float, dt_median:float) -> dict:
+        entry = {
+            "window"  : self.windows,
+            "action"  : action,
+            "from"    : self.index,
+            "to"      : index,
+            "reason"  : reason,
+            "p90_ms"  : p90,
+            "dt_ms"   : dt_median,
+            "slow"    : self._slow,
+            "fast"    : self._fast,
+            "cooldown": self._cooldown,
+            "up_after": self.up_after,
+            "level"   : str(self.levels[index]),
+        }
+        self.log.append(entry)
+        if len(self.log) > QualityController.LOG_SIZE:
+            del self.log[0]
+        return entry
+
+    # 品質をentry["to"]の段にする。
+    def _change(self, entry:dict):
+        if self.echo:
+            print(f"quality {entry['from']} -> {entry['to']} ({entry['level']}): {entry['reason']}")
+        self.index = entry["to"]
+        self._slow = 0
+        self._fast = 0
+        self._cooldown = QualityController.COOLDOWN
+        if self.on_change:
+            self.on_change(self.level)
+
+    # 品質を固定する。(自動調整をやめる)
+    def fix(self, index:int):
+        self.enabled = False
+        if index != self.index:
+            self._change(self._record("fix", index, "fixed", 0.0, 0.0))
@@ -1,39 +1,274 @@
 import json
 import random
-import bisect
 from array import array
+from isbnindex import CoverageIndex
+from titlepack import TitlePack
+from openbd import API_URL, OpenBDClient, parse_records, split_batches # noqa: F401
 
-def get_url(send_url,params="None"):
-    from browser import document, ajax
+# ingest.pyで作ったタイトルパックの分割(シャード)の一覧を置く場所。この中からランダムに1つずつ取得する。(PackDrawを参照)
+SHARDS_URL = 'data/shards/manifest.json'
+# あらかじめ作っておいたタイトルパック(titlepack.pyを参照)を置く場所
+PACK_URL = 'data/titles.pack'
+# 降らせるタイトルの数
+TITLE_COUNT = 500
 
-    #paramsが設定されていた場合に実行(パラメータをセット)
-    if params != "None":
-        send_url = send_url + "?isbn=" + params
+# openBDへの問い合わせ。set_api()で問い合わせ先を変えられる。
+_client = OpenBDClient()
+# Trueなら問い合わせの結果(件数、やり直しの回数、時間)をprint()で出力する
+_echo = False
+# タイトルを選ぶ時の乱数。set_rng()で変えられる。
+_rng = random
+# 取得するシャードの一覧とタイトルパックのURL。Noneなら取得しない。set_sources()で変えられる。
+# 置いていないファイルを取りに行って待たないように、指定しなければ最初からopenBDに問い合わせる。
+_shards_url = None
+_pack_url = None
 
-    # send a POST request to the url
-    # Bind the complete State to the on_get_complete function
-    req = ajax.Ajax()
-    req.open('GET', send_url, False)
-    req.set_header('content-type', 'application/x-www-form-urlencoded')
-    req.send()
-    return req
+# openBDのAPIのURL(末尾の/v1まで)を変える。bench/openbd_server.py などで試す時に使う。
+# echo : Trueなら問い合わせの結果をprint()で出力する
+# kw   : OpenBDClientの設定(concurrency、timeout、retriesなど)
+def set_api(api_url=API_URL, echo=False, **kw):
+    global _client, _echo
+    kw.setdefault('rng', _client.rng)
+    _client = OpenBDClient(api_url, **kw)
+    _echo = echo
 
-# すべてのISBNを取得
-res = get_url('https://api.openbd.jp/v1/coverage')
-seq = json.loads(res.text)
+# シャードの一覧(manifest.json)とタイトルパックのURLを設定する。Noneなら取得しない。'1'なら置く場所(SHARDS_URL、PACK_URL)。
+def set_sources(shards_url=None, pack_url=None):
+    global _shards_url, _pack_url
+    _shards_url = SHARDS_URL if shards_url == '1' else shards_url or None
+    _pack_url = PACK_URL if pack_url == '1' else pack_url or None
 
-# isbnが9784からはじまるものだけにする
-seq = seq[bisect.bisect_left(seq,'9784000000000'):bisect.bisect_right(seq,'9784999999999')]
+# タイトルを選ぶ時とopenBDへのやり直しの間隔に使う乱数を変える。(種をそろえた実行ではrandom.Randomを渡す)
+def set_rng(rng=random):
+    global _rng
+    _rng = rng
+    _client.rng = rng
 
-# ランダムに500冊を選んでjsonを取得
-ranseq = random.sample(seq, 500)
+# urlを非同期に取得する。完了したらon_complete(中身)が呼ばれる。
+# mode : 'text'なら文字列、'binary'ならbytesが渡される。
+# on_error : 失敗した時にステータスコードを渡して呼ばれる。
+def get_async(url, on_complete, mode='text', on_error=None):
+    from browser import ajax
 
-# 書籍情報の取得
-res = get_url('https://api.openbd.jp/v1/get', params='%2C'.join(ranseq))
-seq = json.loads(res.text)
+    def complete(req):
+        if req.status == 200:
+            on_complete(req.read() if mode == 'binary' else req.text)
+        elif on_error:
+            on_error(req.status)
 
-# titleを取得
-titles = array('u',[r["onix"]["DescriptiveDetail"]["TitleDetail"]["TitleElement"]["TitleText"].get("content") for r in seq])
-# print(titles)
-# 使わない変数を削除してメモリを確保
-del seq,res,ranseq
+    ajax.get(url, mode=mode, oncomplete=complete)
+
+# /v1/getの応答からタイトルを取り出す。
+def parse_titles(text):
+    return [record[0] for record in parse_records(text)]
+
+# manifest.jsonの中身から、ランダムに選んだ空でないシャードのURLを返す。無ければNone。
+# exclude : 選ばないシャードのURL(今のシャード)。ほかに無ければそれを返す。
+def choose_shard(text, manifest_url=SHARDS_URL, exclude=None):
+    try:
+        manifest = json.loads(text)
+        files = [s['file'] for s in manifest['shards'] if s.get('count', 0) > 0]
+    except (ValueError, KeyError, TypeError):
+        return None
+    if not files:
+        return None
+    base = manifest_url.rpartition('/')[0]
+    urls = [(base + '/' if base else '') + f for f in files]
+    others = [url for url in urls if url != exclude]
+    return _rng.choice(others or urls)
+
+# タイトルパックのindicesの位置の (タイトル, ISBN, Cコード) を返す。選ばれたものだけをデコードする。
+def _pack_records(pack, indices):
+    isbn = pack.fields.index('isbn') if 'isbn' in pack.fields else -1
+    ccode = pack.fields.index('ccode') if 'ccode' in pack.fields else -1
+    return [(pack.title(i), pack.field(i, isbn) if isbn >= 0 else '', pack.field(i, ccode) if ccode >= 0 else '')
+            for i in indices]
+
+# タイトルパックから、ランダムにk冊の (タイトル, ISBN, Cコード) を取り出す。
+def records_from_pack(pack, k=TITLE_COUNT):
+    return _pack_records(pack, _rng.sample(range(len(pack)), min(k, len(pack))))
+
+# タイトルパックから、ランダムにk冊のタイトルを取り出す。
+def titles_from_pack(pack, k=TITLE_COUNT):
+    return [record[0] for record in records_from_pack(pack, k)]
+
+# 読み込んだタイトルパックから、補充のたびにまだ選んでいないものをk冊ずつ選ぶ。
+# 全部選び終わったら、シャード(url)ならmanifestからほかのシャードを選んで取得し直し、
+# 1つだけのタイトルパックなら最初から選び直す。
+# 長く開いていても、同じシャードのタイトルばかりが降り続けることはない。
+class PackDraw:
+    # url : シャードのURL(manifestから選んだ時だけ)
+    def __init__(self, pack, url=None):
+        self.pack = pack
+        self.url = url
+        # 添字の並び。先頭からpos個が選び終わったもの(選ぶたびに少しずつシャッフルする)
+        self._order = array('I', range(len(pack)))
+        self._pos = 0
+
+    # まだ選んでいない数
+    def remaining(self):
+        return len(self._order) - self._pos
+
+    # 最初から選び直す。
+    def rewind(self):
+        self._pos = 0
+
+    # まだ選んでいないものから、ランダムにk冊の (タイトル, ISBN, Cコード) を取り出す。
+    def records(self, k=TITLE_COUNT):
+        order = self._order
+        n = len(order)
+        start = self._pos
+        end = min(start + k, n)
+        for i in range(start, end):
+            j = _rng.randrange(i, n)
+            order[i], order[j] = order[j], order[i]
+        self._pos = end
+        return _pack_records(self.pack, order[start:end])
+
+# 取得したタイトルパック(PackDraw)、manifest.json、coverageの索引。2回目以降の読み込み(補充)では取得し直さない。
+# 'served' は、TitleCacheに保存されていたタイトルをこのページで出したかどうか。
+_cache = {}
+
+# キャッシュを捨てる。(次の読み込みで取得し直す)
+def clear_cache():
+    _cache.clear()
+
+# タイトルを非同期に少しずつ読み込む。
+# 読み込めた分から on_titles(タイトルのlist, Cコードのlist) を呼び出すので、
+# 呼び出し側は最初の分が届いた時点で降らせはじめられる。
+# すべて終わったら(失敗しても) on_done() を呼び出す。
+#
+# 0. cache(TitleCache)に前回までに読み込んだタイトルがあれば、ページを開いて最初の1回だけ、すぐにそれを渡す。
+#    そのあとも以下の読み込みは行い(裏で取り直し)、届いたタイトルは終わった時にcacheに保存する。
+# 1. シャードの一覧(shards_url)を指定していれば、ランダムに選んだシャードを1回取得して終わり。
+#    補充ではそのシャードからまだ選んでいないものを選び、選び終わったらほかのシャードを取得する。(PackDraw)
+# 2. 無ければ(取得できなければ)、タイトルパック(pack_url)を1回取得して終わり。
+# 3. それも無ければ、openBDのcoverageからk冊を選び、小さいバッチに分けて/v1/getする。(openbd.OpenBDClient)
+# どちらも指定しなければ(省略時)、最初から3.を行うので、最初のタイトルは/coverageと/v1/getの往復だけで届く。
+class TitleLoader:
+    def __init__(self, on_titles, k=TITLE_COUNT, pack_url=None, on_done=None, cache=None, shards_url=None):
+        self.on_titles = on_titles
+        self.on_done = on_done
+        self.k = k
+        self.pack_url = pack_url
+        self.shards_url = shards_url
+        self.cache = cache
+        # 今回届いた (タイトル, ISBN, Cコード)。終わった時にcacheに保存する。
+        self._fetched = []
+        # 読み込んだタイトルの数
+        self.loaded = 0
+        # すべて読み込み終わったらTrue
+        self.done = False
+        # openBDへの問い合わせ(openbd.OpenBDFetch)。問い合わせていなければNone。
+        self.fetch = None
+
+    def start(self):
+        if self.cache is not None and not _cache.get('served'):
+            _cache['served'] = True
+            records = self.cache.records()
+            if records:
+                records = _rng.sample(records, min(self.k, len(records)))
+                self.loaded += len(records)
+                self.on_titles([r[0] for r in records], [r[2] for r in records])
+
+        if 'pack' in _cache:
+            self._next_pack(_cache['pack'])
+        elif 'coverage' in _cache:
+            self._from_coverage(_cache['coverage'])
+        elif self.shards_url:
+            get_async(self.shards_url, self._on_manifest, on_error=lambda status: self._load_pack())
+        else:
+            self._load_pack()
+
+    def _on_manifest(self, text):
+        url = choose_shard(text, self.shards_url)
+        if url is None:
+            self._load_pack()
+            return
+        _cache['manifest'] = text
+        get_async(url, lambda data: self._on_pack(data, self._load_pack, url), mode='binary',
+                  on_error=lambda status: self._load_pack())
+
+    # 読み込んだタイトルパックから補充する。選び終わっていたら、ほかのシャードを取得する。
+    def _next_pack(self, draw):
+        if draw.remaining() > 0:
+            self._from_pack(draw)
+            return
+        url = choose_shard(_cache['manifest'], self.shards_url, draw.url) if draw.url and 'manifest' in _cache else None
+        if url is None or url == draw.url:
+            draw.rewind()
+            self._from_pack(draw)
+            return
+
+        # 取得できなかった時は、今のシャードから選び直す
+        def fallback():
+            draw.rewind()
+            self._from_pack(draw)
+        get_async(url, lambda data: self._on_pack(data, fallback, url), mode='binary',
+                  on_error=lambda status: fallback())
+
+    def _load_pack(self):
+        if not self.pack_url:
+            self._load_coverage()
+            return
+        get_async(self.pack_url, self._on_pack, mode='binary', on_error=lambda status: self._load_coverage())
+
+    # records : (タイトル, ISBN, Cコード)のlist
+    def _publish(self, records):
+        records = [r for r in records if r[0]]
+        if records:
+            self.loaded += len(records)
+            self._fetched.extend(records)
+            self.on_titles([r[0] for r in records], [r[2] for r in records])
+
+    # fallback : 読めなかった時に呼び出す。省略時はcoverageから読み込む。
+    # url      : シャードのURL(manifestから選んだ時だけ)
+    def _on_pack(self, data, fallback=None, url=None):
+        try:
+            pack = TitlePack(bytes(data))
+        except ValueError:
+            pack = None
+        if pack is None or len(pack) == 0:
+            (fallback or self._load_coverage)()
+            return
+        draw = PackDraw(pack, url)
+        _cache['pack'] = draw
+        self._from_pack(draw)
+
+    def _from_pack(self, draw):
+        self._publish(draw.records(self.k))
+        self._finish()
+
+    def _load_coverage(self):
+        get_async(_client.api_url + '/coverage', self._on_coverage, on_error=lambda status: self._finish())
+
+    def _on_coverage(self, text):
+        # isbnが9784からはじまるものだけを、listにせずに索引にする
+        index = CoverageIndex.from_text(text)
+        _cache['coverage'] = index
+        self._from_coverage(index)
+
+    def _from_coverage(self, index):
+        # ランダムにk冊を選び、小さいバッチに分けて問い合わせる(同時にいくつか)
+        ranseq = index.sample(min(self.k, len(index)), _rng)
+        self.fetch = _client.fetch(ranseq, self._publish, self._on_fetched)
+
+    def _on_fetched(self, fetch):
+        if _echo:
+            print(fetch.summary())
+        self._finish()
+
+    def _finish(self):
+        self.done = True
+        if self.cache is not None and self._fetched:
+            self.cache.add(self._fetched)
+            self._fetched = []
+        if self.on_done:
+            self.on_done()
+
+# タイトルの読み込みを開始する。
+# cache : TitleCache。保存されているタイトルがあれば最初にそれを渡し、読み込んだものを保存する。
+def load_titles(on_titles, k=TITLE_COUNT, on_done=None, cache=None):
+    loader = TitleLoader(on_titles, k, _pack_url, on_done, cache, _shards_url)
+    loader.start()
+    return loader
@@ -0,0 +1,144 @@
+# ==============================================================================
+#                  読み込んだタイトルのキャッシュ(localStorage)
+# ==============================================================================
+
+# openBDなどから読み込んだタイトルとISBN、Cコードを localStorage に保存しておき、
+# 次に開いた時はそれをすぐに降らせる。(そのあとの読み込みは今まで通り行い、届いたものでキャッシュを更新する)
+#
+#  - 1件ごとに保存した時刻を持ち、ttl(秒)より古いものは使わない(読み込んだ時に捨てる)。
+#  - 件数は max_entries まで。あふれたら古いものから捨てるので、訪れるたびに少しずつ入れ替わる。
+#  - 同じタイトルは1件だけ持つ。(新しく届いたら、時刻を新しくする)
+#
+# localStorageが使えない時(プライベートブラウズなど)や、テスト・ベンチマークでは MemoryStorage を使う。
+#
+# 保存する形式(JSON)
+#   {"v": 1, "entries": [[タイトル, ISBN, 保存した時刻(秒), Cコード], ...]}   古い順
+#   (Cコードの無い、3要素の古い形式も読める)
+
+import json
+import time
+
+# localStorageの代わりにメモリ上に持つもの。(localStorageと同じメソッドを持つ)
+class MemoryStorage:
+    def __init__(self):
+        self._items:dict[str, str] = {}
+
+    def getItem(self, key:str) -> str | None:
+        return self._items.get(key)
+
+    def setItem(self, key:str, value:str):
+        self._items[key] = str(value)
+
+    def removeItem(self, key:str):
+        self._items.pop(key, None)
+
+    def clear(self):
+        self._items.clear()
+
+# ブラウザのlocalStorage。使えなければMemoryStorage。
+def default_storage():
+    try:
+        from browser import window # type:ignore
+        storage = window.localStorage
+        # 使えるか確かめる(プライベートブラウズなどでは例外になる)
+        storage.setItem("bookrain.test", "1")
+        storage.removeItem("bookrain.test")
+        return storage
+    except Exception:
+        return MemoryStorage()
+
+class TitleCache:
+    # localStorageのキー
+    KEY = "bookrain.titles"
+    VERSION = 1
+
+    # storage     : localStorageかMemoryStorage。省略時はdefault_storage()
+    # ttl         : 1件を使う期間(秒)
+    # max_entries : 持っておく最大の件数
+    # clock       : 現在時刻(秒)を返す関数
+    def __init__(self, storage=None, ttl:float = 7 * 24 * 3600, max_entries:int = 2000, clock=time.time):
+        self.storage = storage if storage is not None else default_storage()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        # 読み込んだ(か保存した)内容。タイトル → (ISBN, 保存した時刻, Cコード)。dictの順番が古い順。
+        self._entries:dict[str, tuple[str, float, str]] | None = None
+
+    # 保存されている内容を読み込む。期限切れのものは捨てる。
+    def _load(self) -> dict[str, tuple[str, float, str]]:
+        if self._entries is not None:
+            return self._entries
+        entries:dict[str, tuple[str, float, str]] = {}
+        text = None
+        try:
+            text = self.storage.getItem(TitleCache.KEY)
+        except Exception:
+            pass
+        if text:
+            try:
+                data = json.loads(text)
+                if data.get("v") == TitleCache.VERSION:
+                    limit = self.clock() - self.ttl
+                    for entry in data.get("entries", []):
+                        title, isbn, saved_at = entry[:3]
+                        if saved_at >= limit and title:
+                            entries[title] = (isbn, saved_at, entry[3] if len(entry) > 3 else "")
+            except (ValueError, TypeError, AttributeError):
+                # 壊れているので使わない
+                entries = {}
+        self._entries = entries
+        return entries
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    # 期限内のタイトルのlist(古い順)
+    def titles(self) -> list[str]:
+        return list(self._load())
+
+    # 期限内の (タイトル, ISBN, Cコード) のlist(古い順)
+    def records(self) -> list[tuple[str, str, str]]:
+        return [(title, isbn, ccode) for title, (isbn, _, ccode) in self._load().items()]
+
+    # タイトルを追加して保存する。
+    # records : (タイトル, ISBN, Cコード) か (タイトル, ISBN) か タイトル の並び
+    def add(self, records):
+        entries = self._load()
+        now = self.clock()
+        for record in records:
+            if isinstance(record, str):
+                title, isbn, ccode = record, "", ""
+            else:
+                title, isbn = record[0], record[1]
+                ccode = record[2] if len(record) > 2 else ""
+            if not title:
+                continue
+            # 新しく届いたものは末尾(新しい側)へ
+            entries.pop(title, None)
+            entries[title] = (isbn or "", now, ccode or "")
+        # あふれた分は古いものから捨てる
+        over = len(entries) - self.max_entries
+        if over > 0:
+            for title in list(entries)[:over]:
+                del entries[title]
+        self._save()
+
+    def _save(self):
+        entries = self._load()
+        text = json.dumps({
+            "v": TitleCache.VERSION,
+            "entries": [[title, isbn, saved_at, ccode] for title, (isbn, saved_at, ccode) in entries.items()],
+        }, ensure_ascii=False)
+        try:
+            self.storage.setItem(TitleCache.KEY, text)
+        except Exception:
+            # 容量オーバーなど。次の起動ではキャッシュなしで読み込むだけなので無視する。
+            pass
+
+    # キャッシュを消す。
+    def clear(self):
+        self._entries = {}
+        try:
+            self.storage.removeItem(TitleCache.KEY)
+        except Exception:
+            pass
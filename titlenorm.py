@@ -0,0 +1,88 @@
+# ==============================================================================
+#                        タイトルの正規化と重複の除去
+# ==============================================================================
+
+# openBDのタイトルは全角・半角が混ざっていたり("ＪＡＶＡ"、"第１巻")、前後や途中に空白が入っていたりする。
+# TitlePoolに入れる前にここを通して、
+#
+#  - NFKCで正規化する(全角英数字・記号を半角に、半角カナを全角に)
+#  - 前後の空白を取り、途中の空白の並び(全角空白を含む)を1つの半角空白にする
+#  - 空になったものは捨てる
+#  - 同じタイトル(正規化したもの)は、前に見た文字列オブジェクトを返す(intern)
+#
+# 補充をまたいで同じタイトルが届いても、プールには同じ文字列オブジェクトが1つあるだけになる。
+# 覚えておくタイトルは max_entries 件まで(古いものから忘れる)。
+#
+# saved_bytes は、届いた文字列をそのまま持っていた場合と比べて減ったメモリの量(の見積もり)。
+#   重複 : 届いた文字列の大きさ全部
+#   正規化で短くなった : 届いた文字列との大きさの差
+
+import sys
+import unicodedata
+
+# 文字列の大きさ(バイト)。sys.getsizeofが無い時(Brythonなど)はUTF-16として見積もる。
+def str_size(s:str) -> int:
+    try:
+        return sys.getsizeof(s)
+    except (AttributeError, TypeError):
+        return 2 * len(s)
+
+# タイトルを正規化する。
+def normalize(title:str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", title).split())
+
+class TitleNormalizer:
+    # max_entries : 覚えておくタイトルの最大数
+    def __init__(self, max_entries:int = 8000):
+        self.max_entries = max_entries
+        # 正規化したタイトル → そのタイトルの文字列オブジェクト。dictの順番が古い順。
+        self._table:dict[str, str] = {}
+        # 通したタイトルの数、正規化で変わった数、空になって捨てた数、重複の数
+        self.seen = 0
+        self.changed = 0
+        self.dropped = 0
+        self.duplicates = 0
+        self.saved_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    # タイトルを正規化して、同じタイトルなら前に見た文字列オブジェクトを返す。空になったらNone。
+    def intern(self, title:str | None) -> str | None:
+        self.seen += 1
+        norm = normalize(title) if title else ""
+        if not norm:
+            self.dropped += 1
+            return None
+        if norm != title:
+            self.changed += 1
+            self.saved_bytes += max(0, str_size(title) - str_size(norm))
+        table = self._table
+        canon = table.pop(norm, None)
+        if canon is not None:
+            self.duplicates += 1
+            self.saved_bytes += str_size(norm)
+        else:
+            canon = norm
+        # 新しく見たものとして末尾へ
+        table[canon] = canon
+        if len(table) > self.max_entries:
+            del table[next(iter(table))]
+        return canon
+
+    # 結果の要約
+    def report(self) -> dict:
+        return {
+            "seen"       : self.seen,
+            "changed"    : self.changed,
+            "dropped"    : self.dropped,
+            "duplicates" : self.duplicates,
+            "unique"     : len(self._table),
+            "saved_bytes": self.saved_bytes,
+        }
+
+    # report()を表示用の文字列にする。
+    def format_report(self) -> str:
+        r = self.report()
+        return (f"titles: {r['seen']} seen, {r['changed']} normalized, {r['duplicates']} duplicates, "
+                f"{r['dropped']} dropped, {r['unique']} unique, {r['saved_bytes'] / 1024:.1f} KiB saved")
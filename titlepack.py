@@ -0,0 +1,204 @@
+# ==============================================================================
+#                         タイトルパック(バイナリ形式)
+# ==============================================================================
+
+# openBDから毎回 coverage(数MB) と 500冊分のONIXレコードを取得する代わりに、
+# あらかじめタイトルだけを詰めたバイナリファイル(タイトルパック)を作っておき、
+# クライアントはそれを1回だけ取得する。
+# 中身は必要になった時に1件ずつスライスしてデコードする(全件をデコードしない)。
+#
+# 形式(数値はすべてリトルエンディアン)
+#   header : magic b"BRTP" | version u8 | nfields u8 | reserved u16 | count u32
+#   fields : nfields個の (名前の長さ u8 | 名前 ASCII)        例) "title", "isbn", "ccode"
+#   offsets: (count+1)個の u32。records先頭からの各レコードの開始位置。最後は終端。
+#   records: 各レコードは nfields個の (長さ u16 | UTF-8文字列)
+#
+# ファイル全体をgzipで圧縮してもよい(先頭が 1f 8b ならgzipとして展開する)。
+#
+# 作り方)
+#   python titlepack.py build openbd_get.json -o data/titles.pack
+#   python titlepack.py dump data/titles.pack
+
+MAGIC = b"BRTP"
+VERSION = 1
+
+# タイトルパックの読み込み。
+# data : ファイルの中身(bytes)。gzipされていれば展開する。
+class TitlePack:
+    def __init__(self, data:bytes):
+        if data[:2] == b"\x1f\x8b":
+            import gzip
+            data = gzip.decompress(data)
+        if data[:4] != MAGIC:
+            raise ValueError("not a title pack")
+        if data[4] != VERSION:
+            raise ValueError(f"unsupported title pack version {data[4]}")
+
+        self.data = data
+        nfields = data[5]
+        self.count:int = int.from_bytes(data[8:12], "little")
+
+        # フィールド名
+        pos = 12
+        fields:list[str] = []
+        for _ in range(nfields):
+            n = data[pos]
+            fields.append(data[pos+1:pos+1+n].decode("ascii"))
+            pos += 1 + n
+        self.fields:tuple[str, ...] = tuple(fields)
+
+        # offsetsとrecordsの開始位置
+        self._offsets = pos
+        self._records = pos + 4 * (self.count + 1)
+
+    def __len__(self) -> int:
+        return self.count
+
+    # i番目のレコードのバイト列上の開始位置
+    def _offset(self, i:int) -> int:
+        p = self._offsets + 4 * i
+        return self._records + int.from_bytes(self.data[p:p+4], "little")
+
+    # i番目のレコードのk番目のフィールドを返す。
+    def field(self, i:int, k:int = 0) -> str:
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        data = self.data
+        pos = self._offset(i)
+        for _ in range(k):
+            pos += 2 + int.from_bytes(data[pos:pos+2], "little")
+        n = int.from_bytes(data[pos:pos+2], "little")
+        return data[pos+2:pos+2+n].decode("utf-8")
+
+    # i番目のタイトル(先頭のフィールド)
+    def title(self, i:int) -> str:
+        return self.field(i, 0)
+
+    # i番目のレコードを {フィールド名:値} で返す。
+    def record(self, i:int) -> dict[str, str]:
+        return {name: self.field(i, k) for k, name in enumerate(self.fields)}
+
+    def __getitem__(self, i:int) -> str:
+        return self.title(i)
+
+# 1件分のレコードをrecordsの形式にする。
+# record : フィールドの値のtuple。タイトルだけなら文字列でもよい。
+# nfields: フィールドの数
+def encode_record(record, nfields:int = 1) -> bytes:
+    if isinstance(record, str):
+        record = (record,)
+    if len(record) != nfields:
+        raise ValueError(f"record has {len(record)} fields, expected {nfields}")
+    out = bytearray()
+    for value in record:
+        b = (value or "").encode("utf-8")
+        if len(b) > 0xFFFF:
+            raise ValueError("field too long")
+        out += len(b).to_bytes(2, "little")
+        out += b
+    return bytes(out)
+
+# header と fields の部分を作る。(offsets、recordsはこの後ろに続ける)
+def encode_header(fields:tuple[str, ...], count:int) -> bytes:
+    out = bytearray(MAGIC)
+    out += bytes([VERSION, len(fields)]) + b"\0\0" + count.to_bytes(4, "little")
+    for name in fields:
+        b = name.encode("ascii")
+        out += bytes([len(b)]) + b
+    return bytes(out)
+
+# タイトルパックを作る。
+# records : 各レコードのフィールドの値のtuple(fieldsと同じ順番)。タイトルだけなら文字列でもよい。
+# fields  : フィールド名。先頭はタイトル。
+def encode(records, fields:tuple[str, ...] = ("title",), compress:bool = False) -> bytes:
+    body = bytearray()
+    offsets = [0]
+    for record in records:
+        body += encode_record(record, len(fields))
+        offsets.append(len(body))
+
+    count = len(offsets) - 1
+    out = bytearray(encode_header(fields, count))
+    for offset in offsets:
+        out += offset.to_bytes(4, "little")
+    out += body
+
+    if compress:
+        import gzip
+        return gzip.compress(bytes(out), mtime=0)
+    return bytes(out)
+
+# openBDの /v1/get の応答(のlist)から (title, isbn, ccode) を取り出す。
+# データのない(null)レコードやタイトルのないレコードは飛ばす。
+def records_from_openbd(seq:list) -> list[tuple[str, str, str]]:
+    records = []
+    for r in seq:
+        if not r:
+            continue
+        try:
+            onix = r["onix"]
+            detail = onix["DescriptiveDetail"]
+            title = detail["TitleDetail"]["TitleElement"]["TitleText"].get("content")
+        except (KeyError, TypeError):
+            continue
+        if not title:
+            continue
+        ccode = ""
+        for subject in detail.get("Subject", []):
+            if subject.get("SubjectSchemeIdentifier") == "78":
+                ccode = subject.get("SubjectCode", "")
+                break
+        records.append((title, onix.get("RecordReference", ""), ccode))
+    return records
+
+# ------------------------------------------------------------------------------
+#                              コマンドライン(CPython用)
+# ------------------------------------------------------------------------------
+
+def main(argv:list[str] | None = None) -> int:
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="タイトルパックの作成・確認")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="openBDの/v1/getの応答(JSON)かタイトルのlist(JSON)からパックを作る")
+    build.add_argument("inputs", nargs="+", help="入力のJSONファイル")
+    build.add_argument("-o", "--output", required=True, help="出力ファイル")
+    build.add_argument("--gzip", action="store_true", help="gzipで圧縮する")
+    build.add_argument("--title-only", action="store_true", help="タイトルだけを入れる(isbn、ccodeを入れない)")
+
+    dump = sub.add_parser("dump", help="パックの中身を表示する")
+    dump.add_argument("pack")
+    dump.add_argument("-n", type=int, default=20, help="表示する件数")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        records:list[tuple[str, str, str]] = []
+        for path in args.inputs:
+            with open(path, encoding="utf-8") as f:
+                seq = json.load(f)
+            if seq and all(isinstance(s, str) for s in seq):
+                records += [(s, "", "") for s in seq]
+            else:
+                records += records_from_openbd(seq)
+        if args.title_only:
+            data = encode([r[0] for r in records], compress=args.gzip)
+        else:
+            data = encode(records, ("title", "isbn", "ccode"), compress=args.gzip)
+        with open(args.output, "wb") as f:
+            f.write(data)
+        print(f"{len(records)} titles, {len(data)} bytes -> {args.output}")
+        return 0
+
+    with open(args.pack, "rb") as f:
+        pack = TitlePack(f.read())
+    print(f"{len(pack)} titles, fields={pack.fields}")
+    for i in range(min(args.n, len(pack))):
+        print(pack.record(i))
+    return 0
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,204 @@
+# ==============================================================================
+#                              タイトルのプール
+# ==============================================================================
+
+# 降らせるタイトルを持っておき、next()で1つずつ取り出す。
+#
+#  - 取り出しはシャッフルしたバッグ(添字のlist)をカーソルで進めるだけなので O(1)。
+#    1巡するまでは同じタイトルを2度出さない。1巡したらシャッフルし直す。
+#  - 同じタイトルは1つしか持たない(add()で重複を捨てる)。
+#  - capacity を超えて追加する時は、この巡ですでに出したタイトルを置き換える。
+#    なのでメモリは capacity 件分で頭打ちになる。
+#  - この巡でまだ出していない数が low_watermark 以下になったら on_low(pool) を呼び出すので、
+#    そこで追加のタイトルを読み込んでおく(読み込み終わったら refill_done() を呼ぶこと)。
+#  - タイトルのCコードをジャンルの索引(genre.GenreIndex)に入れておき、set_filter()で絞り込める。
+#    絞り込み中はバッグを当てはまるslotだけにする(タイトル本体や索引は作り直さない)。
+#    いっぱいになってからは、当てはまらないタイトルは追加せず、当てはまるタイトルは当てはまらないslotと置き換える。
+#    当てはまるものが1つも無くても、next()のたびに補充を依頼する(min_intervalごと)。
+#  - 追加するタイトルは titlenorm.TitleNormalizer で正規化(NFKC、空白の整理)してから重複を確かめる。
+#    全角・半角だけが違うタイトルも1つしか持たず、補充をまたいで届いた同じタイトルは同じ文字列オブジェクトになる。
+
+import random
+from genre import GenreIndex, ccode_matches, parse_filter
+from titlenorm import TitleNormalizer, normalize
+
+class TitlePool:
+    # capacity      : 持っておくタイトルの最大数
+    # low_watermark : この巡で未出のタイトルがこの数以下になったら on_low を呼ぶ
+    # on_low        : 補充を依頼する関数。on_low(pool)
+    # min_interval  : 補充を依頼してから次に依頼するまでに最低限取り出す回数(失敗した時の連打防止)
+    # rng           : 乱数(random.Randomのインスタンスかrandomモジュール)
+    # normalizer    : タイトルの正規化(TitleNormalizer)。省略時はcapacityの4倍まで覚えるものを作る。Falseなら正規化しない。
+    def __init__(self, capacity:int = 2000, low_watermark:int = 100, on_low=None,
+                 min_interval:int = 50, rng=random, normalizer=None):
+        self.capacity = capacity
+        self.low_watermark = low_watermark
+        self.on_low = on_low
+        self.min_interval = min_interval
+        self.rng = rng
+        if normalizer is None:
+            normalizer = TitleNormalizer(capacity * 4)
+        self.normalizer:TitleNormalizer | None = None if normalizer is False else normalizer
+
+        # タイトル本体。添字(slot)で参照する。
+        self._titles:list[str] = []
+        # タイトル → slot (重複の確認用)
+        self._slot_of:dict[str, int] = {}
+        # 各slotのタイトルのCコード('' なら不明)と、ジャンルの索引
+        self._ccodes:list[str] = []
+        self.genres = GenreIndex()
+        # 絞り込みのキー。Noneなら絞り込まない。
+        self.filter:tuple[str, ...] | None = None
+        # slotのシャッフルされた並び。[0, _cursor) がこの巡ですでに出したもの。
+        self._bag:list[int] = []
+        self._cursor = 0
+        # 絞り込み中に当てはまらないslot(バッグに入っていないもの)。いっぱいの時はここから置き換える。
+        self._others:list[int] = []
+
+        # 補充中ならTrue
+        self.refilling = False
+        # 最後に補充を依頼してから取り出した回数
+        self._draws_since_refill = min_interval
+        # 巡の数(確認用)
+        self.rounds = 0
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    def __contains__(self, title:str) -> bool:
+        if self.normalizer is not None:
+            title = normalize(title)
+        return title in self._slot_of
+
+    # この巡でまだ出していないタイトルの数(絞り込み中は当てはまるものの中で)
+    def remaining(self) -> int:
+        return len(self._bag) - self._cursor
+
+    # slotのCコード
+    def ccode(self, slot:int) -> str:
+        return self._ccodes[slot]
+
+    # 絞り込みを変える。spec は genre.parse_filter() の形式("literature"、"a8+g9"など)。Noneか"all"で解除。
+    # バッグを当てはまるslotだけにしてシャッフルし直す。補充はすぐには依頼しない。
+    def set_filter(self, spec:str | None):
+        keys = parse_filter(spec)
+        self.filter = keys
+        if keys is None:
+            self._bag = list(range(len(self._titles)))
+            self._others = []
+        else:
+            self._bag = sorted(self.genres.slots(keys))
+            in_bag = set(self._bag)
+            self._others = [slot for slot in range(len(self._titles)) if slot not in in_bag]
+        self.rng.shuffle(self._bag)
+        self._cursor = 0
+        self._draws_since_refill = 0
+
+    def _matches(self, slot:int) -> bool:
+        return self.filter is None or self.genres.matches(slot, self.filter)
+
+    # 未出の範囲のランダムな位置とbag[i]を入れ替える。
+    def _shuffle_in(self, i:int):
+        j = self.rng.randrange(self._cursor, len(self._bag))
+        bag = self._bag
+        bag[i], bag[j] = bag[j], bag[i]
+
+    # タイトルを1つ追加する。追加できたらTrue。
+    # ccode : タイトルのCコード(不明なら'')
+    def add_title(self, title:str, ccode:str = '') -> bool:
+        if self.normalizer is not None:
+            title = self.normalizer.intern(title)
+        if not title or title in self._slot_of:
+            return False
+
+        if len(self._titles) < self.capacity:
+            slot = len(self._titles)
+            self._titles.append(title)
+            self._ccodes.append(ccode)
+            self._slot_of[title] = slot
+            self.genres.add(slot, ccode)
+            if self._matches(slot):
+                self._bag.append(slot)
+                self._shuffle_in(len(self._bag) - 1)
+            else:
+                self._others.append(slot)
+            return True
+
+        # いっぱいなので置き換える。
+        # 絞り込み中は、当てはまるタイトルだけを、当てはまらないslot(無ければこの巡ですでに出したもの)と置き換えて追加する。
+        if self.filter is not None:
+            if not ccode_matches(ccode, self.filter):
+                return False
+            if self._others:
+                slot = self._others.pop()
+                self._replace(slot, title, ccode)
+                self._bag.append(slot)
+                self._shuffle_in(len(self._bag) - 1)
+                return True
+        # この巡ですでに出したものを置き換える。
+        if self._cursor == 0:
+            return False
+        self._cursor -= 1
+        slot = self._bag[self._cursor]
+        self._replace(slot, title, ccode)
+        self._shuffle_in(self._cursor)
+        return True
+
+    # slotのタイトルを入れ替える。
+    def _replace(self, slot:int, title:str, ccode:str):
+        del self._slot_of[self._titles[slot]]
+        self.genres.remove(slot, self._ccodes[slot])
+        self._titles[slot] = title
+        self._ccodes[slot] = ccode
+        self._slot_of[title] = slot
+        self.genres.add(slot, ccode)
+
+    # タイトルをまとめて追加する。追加できた数を返す。
+    # ccodes : titlesと同じ順番のCコードのlist。省略時はすべて不明。
+    def add(self, titles, ccodes=None) -> int:
+        added = 0
+        if ccodes is None:
+            for title in titles:
+                if self.add_title(title):
+                    added += 1
+        else:
+            for title, ccode in zip(titles, ccodes):
+                if self.add_title(title, ccode):
+                    added += 1
+        return added
+
+    # 次のタイトルを返す。1つも無ければ(絞り込み中で当てはまるものが無ければ)None。
+    # 当てはまるものが無い時も、補充は依頼する。(届いたタイトルが当てはまれば降りはじめる)
+    def next(self) -> str | None:
+        if not self._bag:
+            self._draws_since_refill += 1
+            self._check_low()
+            return None
+        if self._cursor >= len(self._bag):
+            # 1巡したのでシャッフルし直す。
+            self.rng.shuffle(self._bag)
+            self._cursor = 0
+            self.rounds += 1
+        title = self._titles[self._bag[self._cursor]]
+        self._cursor += 1
+        self._draws_since_refill += 1
+        self._check_low()
+        return title
+
+    # 残りが少なければ補充を依頼する。
+    def _check_low(self):
+        if self.on_low is None or self.refilling:
+            return
+        low = self.low_watermark
+        if self.filter is not None and self._titles:
+            # 絞り込み中は、バッグの大きさの割合だけ少なくする(補充の頻度を変えないため)
+            low = low * len(self._bag) // len(self._titles)
+        if self.remaining() > low or self._draws_since_refill < self.min_interval:
+            return
+        self.refilling = True
+        self._draws_since_refill = 0
+        self.on_low(self)
+
+    # 補充が終わった時に呼び出す。
+    def refill_done(self):
+        self.refilling = False
@@ -0,0 +1,148 @@
+# ==============================================================================
+#                     Yaneurao Game SDK for Brython V1.10
+# ==============================================================================
+
+#  required : Python version >= 3.10
+#
+# 用途ごとのモジュールに分けてある。
+#   geometry : MathTools, Vector2D, MVector2D, Rect
+#   strutil  : StrUtil, query_params
+#   input    : KeyInput, TouchInput, MouseInput, VirtualKeyInput など
+#   audio    : Audio, AudioLoader         (参照された時に読み込む)
+#   image    : Image, ImageLoader         (参照された時に読み込む)
+#   canvas   : Canvas, TextSpriteCache, font_px
+#   timer    : GameTimer, ElapsedTimer, GCScheduler, FrameProfiler
+#   objects  : GameContext, GameObject, GameObjectManager
+#   dialogs  : Dialog, EntryDialog, InfoDialog (browser.widgets.dialog のclass。参照された時に読み込む)
+#
+# Brythonはモジュールをimportするたびにソースを変換(transpile)するので、起動が遅くなる。
+# 最初のフレームまでに使わない audio、image、dialogs と typing は、yanesdk.Audio のように参照された時に読み込む。
+# from yanesdk import * は以前と同じ名前をすべてimportするので、これらもその時に読み込まれる。
+# 起動を速くしたい時は from yanesdk import Canvas のように使う名前だけをimportし、
+# Audioなどは使う時に yanesdk.Audio のように参照すること。(main.pyを参照)
+#
+# 各モジュールの読み込みにかかった時間(変換+実行)は startup_report() で確認できる。
+
+from time import perf_counter as _clock
+
+# (モジュール名, 読み込みにかかった時間(ms), 参照されてから読み込んだものならTrue)
+_timings:list[tuple[str, float, bool]] = []
+_start = _clock()
+
+def _timed(name:str, start:float, lazy:bool = False):
+    _timings.append((name, (_clock() - start) * 1000, lazy))
+
+_t = _clock()
+from browser import document, window , DOMEvent # type:ignore
+_timed("browser", _t)
+
+_t = _clock()
+from enum import IntEnum
+import traceback
+import math
+import gc
+import random
+_timed("stdlib", _t)
+
+# typingは読み込みが重いので、実行時には読み込まない。
+# 各モジュールは from __future__ import annotations で型の注釈を評価しないようにして、
+# 注釈にだけ使う Callable などは if TYPE_CHECKING: の中でimportしている。
+# cast は main.py で使われているので、実行時は何もしない同じ名前の関数を用意しておく。
+# (Callable、Generator は yanesdk.Callable のように参照された時に typing から読み込む)
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import cast
+else:
+    def cast(typ, value):
+        return value
+
+_t = _clock()
+from .geometry import MathTools, Vector2D, MVector2D, Rect
+_timed("geometry", _t)
+
+_t = _clock()
+from .strutil import StrUtil, query_params
+_timed("strutil", _t)
+
+_t = _clock()
+from .input import KEY, KeyInput, TouchInfo, TouchInput, MouseInfo, MouseInput, VKEY, VirtualKeyInput
+_timed("input", _t)
+
+_t = _clock()
+from .canvas import TextSpriteCache, font_px, Canvas
+_timed("canvas", _t)
+
+_t = _clock()
+from .timer import GCScheduler, FrameProfiler, GameTimer, ElapsedTimer
+_timed("timer", _t)
+# import .timer でここに入ったモジュールを、1つのファイルだった時と同じ timer(timeit.default_timer)にしておく。
+# (default_timer は perf_counter なので、timeitは読み込まない)
+# timerモジュールのものは from yanesdk.timer import GameTimer のようにimportすること。
+timer = _clock
+
+_t = _clock()
+from .objects import GameContext, GameObject, GameObjectManager
+_timed("objects", _t)
+
+_timed("yanesdk", _start)
+
+__all__ = [
+    "document", "window", "DOMEvent",
+    "IntEnum", "cast", "traceback", "math", "gc", "random",
+    "MathTools", "Vector2D", "MVector2D", "Rect",
+    "StrUtil", "query_params",
+    "KEY", "KeyInput", "TouchInfo", "TouchInput", "MouseInfo", "MouseInput", "VKEY", "VirtualKeyInput",
+    "TextSpriteCache", "font_px", "Canvas",
+    "GCScheduler", "FrameProfiler", "GameTimer", "ElapsedTimer", "timer",
+    "GameContext", "GameObject", "GameObjectManager",
+    "startup_report", "format_startup_report",
+    # 以下は参照された時に読み込む(_LAZY)
+    "Audio", "AudioLoader", "Image", "ImageLoader",
+    "Dialog", "EntryDialog", "InfoDialog",
+    "Callable", "Generator",
+]
+
+# 参照された時に読み込むもの。名前 → (モジュール名, モジュールでの名前)
+# モジュール名が . ではじまるものはyanesdkのモジュール。
+_LAZY = {
+    "Audio"      : (".audio", "Audio"),
+    "AudioLoader": (".audio", "AudioLoader"),
+    "Image"      : (".image", "Image"),
+    "ImageLoader": (".image", "ImageLoader"),
+    "Dialog"     : (".dialogs", "Dialog"),
+    "EntryDialog": (".dialogs", "EntryDialog"),
+    "InfoDialog" : (".dialogs", "InfoDialog"),
+    "Callable"   : ("typing", "Callable"),
+    "Generator"  : ("typing", "Generator"),
+}
+
+# yanesdk.Audio のように参照された時に呼び出される。(PEP 562)
+def __getattr__(name:str):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name = _LAZY[name][0]
+    start = _clock()
+    if module_name.startswith("."):
+        module = __import__(__name__ + module_name, fromlist=["_"])
+    else:
+        module = __import__(module_name, fromlist=["_"])
+    _timed(module_name.lstrip("."), start, lazy=True)
+    # 同じモジュールの名前はまとめて登録しておく。(次からは__getattr__を通らない)
+    for key, (value, attr) in _LAZY.items():
+        if value == module_name:
+            globals()[key] = getattr(module, attr)
+    return globals()[name]
+
+# 各モジュールの読み込みにかかった時間。(モジュール名, 時間(ms), 参照されてから読み込んだか) のlist。
+# "yanesdk" は、すぐに読み込むモジュール全体の時間。
+def startup_report()->list[tuple[str, float, bool]]:
+    return list(_timings)
+
+# startup_report()を表示用の文字列にする。
+# yanesdkの読み込み開始から、これを呼び出すまでの時間も最後に付け加える。
+def format_startup_report()->str:
+    lines = [f"{'module':<10}{'ms':>9}"]
+    for name, ms, lazy in _timings:
+        lines.append(f"{name:<10}{ms:>9.1f}" + ("  (lazy)" if lazy else ""))
+    lines.append(f"{'elapsed':<10}{(_clock() - _start) * 1000:>9.1f}")
+    return "\n".join(lines)
@@ -0,0 +1,93 @@
+# ==============================================================================
+#                     Yaneurao Game SDK for Brython : 音声
+# ==============================================================================
+
+from browser import document, DOMEvent # type:ignore
+
+# ------------------------------------------------------------------------------
+#                              音声・Multimedia
+# ------------------------------------------------------------------------------
+
+# 音声用class
+class Audio:
+    # sound_filename : 音声ファイル("audios"フォルダに配置してあるものとする)
+    def __init__(self, audio_filename:str):
+        path = "audios\\" + audio_filename
+        audio = document.createElement("audio")
+        audio["src"] = path
+        self.audio = audio
+
+        # unlock()が呼び出されたかのフラグ
+        self.unlocked = False
+
+    # 再生する。
+    #    sound = Sound("se.wav")
+    #    document.body.bind("mousemove", lambda ev : sound.play() )
+    # のようにユーザーがアクションを行った時のイベントハンドラでしか再生されない。
+    # 現在、ほとんどのブラウザがそういうポリシーに変更されてしまったようだ。
+    # なので、以下のUnlockAudio()と組み合わせて使う。
+    def play(self):
+        if not self.unlocked:
+            return
+        self.audio.currentTime = 0
+        self.audio.play()
+
+    # 停止する。
+    def stop(self):
+        if not self.unlocked:
+            return
+        self.audio.stop()
+
+    # 使える状態にする。ユーザーのタップイベントなどでまとめてunlockしておくと良い。
+    # cf. JavaScript で音声再生まとめ (marmooo's blog) : https://marmooo.blogspot.com/2021/06/javascript.html
+    def unlock(self):
+        self.unlocked = True
+        self.audio.volume = 0
+        self.audio.play()
+        self.audio.pause()
+        self.currentTime = 0
+        self.audio.volume = 1
+
+# audioを管理してくれる。
+class AudioLoader:
+    # hookするevent
+    # keydownは、KeyInputのハンドラが
+    #    e.preventDefault()
+    #    e.stopPropagation()
+    # としているが、前者は、FORMのsubmitみたいな動作をキャンセルするだけだし、後者は親要素への伝播を停止するだけなので、
+    # ここでのkeydownが呼び出されなくなるわけではないのでセーフ。
+    event_names:list[str] = ["touchstart", "keydown" , "mousedown"]
+
+    # 使いたいaudioファイルの一覧を渡す。
+    def __init__(self , audio_filenames:list[str]):
+
+        # ↓ここに読み込まれる。
+        self.audios:list[Audio] = []
+        for filename in audio_filenames:
+            self.audios.append(Audio(filename))
+
+        self._unlocked = False
+        self._add_events()
+
+    def _add_events(self):
+        for event_name in AudioLoader.event_names:
+            document.addEventListener(event_name, self._event_handler )
+        
+    def _remove_events(self):
+        # 一度だけ呼び出されればOKなのでイベントハンドラの登録を解除しておく。
+        for event_name in AudioLoader.event_names:
+            document.removeEventListener(event_name, self._event_handler )
+
+    def _event_handler(self, evt:DOMEvent):
+        self._unlock_audios()
+        self._remove_events()
+
+    # Audioをunlockして良いタイミングで呼び出す。(ユーザーのキーイベントなど)
+    def _unlock_audios(self):
+        if self._unlocked:
+            return # タイミングのずれで二度呼び出されることがある
+
+        for audio in self.audios:
+            audio.unlock()
+
+        self._unlocked = True
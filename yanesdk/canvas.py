@@ -0,0 +1,416 @@
+# ==============================================================================
+#                     Yaneurao Game SDK for Brython : 画面(Canvas)
+# ==============================================================================
+
+from __future__ import annotations
+
+from browser import document, window # type:ignore
+
+# 型の注釈用。実行時は読み込まない。(__init__.pyを参照)
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Callable
+
+from .geometry import Vector2D, Rect
+
+# ------------------------------------------------------------------------------
+#                              画面
+# ------------------------------------------------------------------------------
+
+# 文字列を一度だけオフスクリーンのcanvasに描いておき、以降はdrawImage一回で描画するためのキャッシュ。
+# 落ちてくるタイトルのように、同じ文字列・大きさ・色で何度も描くものに使う。
+# キャッシュの大きさはピクセル数で制限し、あふれたら最も長く使われていないものから捨てる(LRU)。
+# 色を反転した時などは clear() で丸ごと捨てる。
+class TextSpriteCache:
+    # 上下左右の余白(px)。アンチエイリアスではみ出す分。
+    PADDING = 2
+
+    # canvas       : 文字幅の計測に使うCanvas
+    # pixel_budget : キャッシュしておく画像のピクセル数の合計の上限
+    def __init__(self, canvas:"Canvas", pixel_budget:int = 8_000_000):
+        self.canvas = canvas
+        self.pixel_budget = pixel_budget
+        # (text, font, color) → (オフスクリーンcanvas, 文字幅, 画像の幅, 画像の高さ)
+        # dictは追加順を保持するので、使うたびに末尾へ入れ直せば先頭が最も古いものになる。
+        self._sprites:dict[tuple[str,str,str], tuple] = {}
+        self.pixels = 0
+        # 画像を何倍の解像度で作るか(Canvas.dpr)。変える時はclear()すること。
+        self.scale = 1.0
+
+        # 統計
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self)->int:
+        return len(self._sprites)
+
+    # 文字列の画像を返す。無ければ作る。
+    def get(self, text:str, font:str, color:str)->tuple:
+        key = (text, font, color)
+        sprite = self._sprites.pop(key, None)
+        if sprite is None:
+            self.misses += 1
+            sprite = self._render(text, font, color)
+            self.pixels += self._pixels(sprite)
+            self._evict()
+        else:
+            self.hits += 1
+        self._sprites[key] = sprite
+        return sprite
+
+    # 画像の実際のピクセル数
+    def _pixels(self, sprite:tuple)->int:
+        return int(sprite[2] * self.scale) * int(sprite[3] * self.scale)
+
+    # オフスクリーンのcanvasに文字列を描く。
+    # 画像の大きさはscale倍にして、描く時にCanvas上の大きさ(幅, 高さ)に縮めて貼る。
+    def _render(self, text:str, font:str, color:str)->tuple:
+        text_width = self.canvas.measure_text(text, font)
+
+        pad = TextSpriteCache.PADDING
+        width = int(text_width) + 1 + pad * 2
+        # 文字の高さはfontのpx数より少し大きくとっておく。(下にはみ出す文字があるので)
+        height = int(font_px(font) * 1.3) + pad * 2
+
+        element = document.createElement("canvas")
+        element.attrs['width'] = int(width * self.scale)
+        element.attrs['height'] = int(height * self.scale)
+        sctx = element.getContext("2d")
+        if self.scale != 1.0:
+            sctx.setTransform(self.scale, 0, 0, self.scale, 0, 0)
+        sctx.font = font
+        sctx.fillStyle = color
+        sctx.textBaseline = "top"
+        sctx.fillText(text, pad, pad)
+        return (element, text_width, width, height)
+
+    # ピクセル数の上限を超えていたら古いものから捨てる。
+    def _evict(self):
+        while self.pixels > self.pixel_budget and len(self._sprites) > 0:
+            key = next(iter(self._sprites))
+            sprite = self._sprites.pop(key)
+            self.pixels -= self._pixels(sprite)
+            self.evictions += 1
+
+    # キャッシュを丸ごと捨てる。
+    def clear(self):
+        self._sprites.clear()
+        self.pixels = 0
+
+# font指定("32px serif"など)からpx数を取り出す。取り出せなければ32。
+def font_px(font:str)->int:
+    for token in font.split():
+        if token.endswith("px"):
+            try:
+                return int(float(token[:-2]))
+            except ValueError:
+                break
+    return 32
+
+# 描画用canvas
+class Canvas:
+    # canvas_id_name : HTML5のcanvasにつけたid名。defaultでは"canvas"
+    # max_dpr        : devicePixelRatioの上限。高DPIの画面でもこれより細かくは描かない。
+    #                  (描くピクセル数はdprの2乗に比例するので、上げすぎると重くなる)
+    # resize_delay   : 大きさが変わってから、canvasを作り直すまで待つ時間(ms)。
+    #                  回転やウィンドウのドラッグ中に何度も作り直さないようにする。
+    def __init__(self, canvas_id_name:str = "canvas", max_dpr:float = 2.0, resize_delay:float = 150):
+        # 描画するcanvasのcontextの取得。
+        # wrapper要素の縦横を取得して、self.canvasもそれに合致させることで文字のぼやけを防ぐ
+        self.canvas = document[canvas_id_name]
+        self.wrapper = document['wrapper']
+        self.ctx = self.canvas.getContext("2d")
+
+        # debug
+        # print('キャンバスの要素')
+        # for key, value in self.canvas.__dict__.items():
+        #     print(key, ':', value)
+        # print('wrapperの要素')
+        # for key, value in self.wrapper.__dict__.items():
+        #     print(key, ':', value)
+
+        self.max_dpr = max_dpr
+        self.resize_delay = resize_delay
+
+        # draw_text_center_cached()で使う文字列の画像のキャッシュ
+        self.sprites = TextSpriteCache(self)
+
+        # measure_text()で計測した文字幅のキャッシュ。(text, font) → 幅
+        self._widths:dict[tuple[str,str], float] = {}
+        self.max_widths = 4096
+
+        # 画面いっぱいにcanvasを合わせる
+        # スマホ、PCどちらでも同じレイアウト
+        # width, height : 描画に使う座標での大きさ(CSSのpx)
+        # dpr           : canvasの実際のピクセル数の倍率
+        self.width:int = 0
+        self.height:int = 0
+        self.dpr = 0.0
+        self._allocate()
+
+        # 大きさが変わった時に呼び出す関数
+        self._resize_listeners:list[Callable[["Canvas"],None]] = []
+        self._resize_timer = None
+        # canvasを作り直した回数
+        self.resizes = 0
+        self._observe_resize()
+
+    # wrapper要素の大きさとdevicePixelRatioに合わせてcanvasを用意する。
+    def _allocate(self):
+        width = self.wrapper.clientWidth
+        height = self.wrapper.clientHeight
+        dpr = min(getattr(window, "devicePixelRatio", 1.0) or 1.0, self.max_dpr)
+
+        # canvasの実際のピクセル数はdpr倍にして、CSSでの大きさは画面に合わせる。
+        self.canvas.attrs['width'] = int(width * dpr)
+        self.canvas.attrs['height'] = int(height * dpr)
+        self.canvas.style.width = f"{width}px"
+        self.canvas.style.height = f"{height}px"
+        self.width = width
+        self.height = height
+
+        # 文字のぼやけ解消のためパーセンテージ調整
+        # self.width :int = int(self.width*0.5)
+        # self.height:int = int(self.height*0.5)
+
+        # canvasの大きさを設定するとcontextの状態は初期化されるので、設定し直す。
+        # 描画は width, height の座標で行い、dpr倍に拡大して描かれるようにしておく。
+        self.ctx.setTransform(dpr, 0, 0, dpr, 0, 0)
+
+        # canvasのRect
+        self.rect = Rect(
+            Vector2D(0,0) ,
+            Vector2D(self.width, self.height)
+        )
+
+        # 文字列の画像は、dprが変わったら作り直す。
+        if dpr != self.dpr:
+            self.sprites.clear()
+            self.sprites.scale = dpr
+        self.dpr = dpr
+
+        # ctxに最後に設定したfont、fillStyle、textBaseline。
+        # 同じ値を設定し直すのもBrython↔JavaScriptの行き来になるので、変わる時だけ設定する。
+        self._reset_state()
+
+    # 大きさが変わるのを監視する。
+    # ResizeObserverがあればwrapper要素を、なければwindowのresizeイベントを見る。
+    def _observe_resize(self):
+        observer = getattr(window, "ResizeObserver", None)
+        if observer is not None:
+            self._observer = observer.new(self._on_resize)
+            self._observer.observe(self.wrapper)
+        else:
+            window.bind("resize", self._on_resize)
+
+    # 大きさが変わった。少し待ってから作り直す。(その間にまた変わったら、待ち直す)
+    def _on_resize(self, *args):
+        if self._resize_timer is not None:
+            window.clearTimeout(self._resize_timer)
+        self._resize_timer = window.setTimeout(self._apply_resize, self.resize_delay)
+
+    # 大きさかdprが変わっていれば、canvasを作り直してlistenerに知らせる。
+    def _apply_resize(self):
+        self._resize_timer = None
+        dpr = min(getattr(window, "devicePixelRatio", 1.0) or 1.0, self.max_dpr)
+        if (self.wrapper.clientWidth, self.wrapper.clientHeight, dpr) == (self.width, self.height, self.dpr):
+            return
+        self._allocate()
+        self.resizes += 1
+        for listener in self._resize_listeners:
+            listener(self)
+
+    # 大きさが変わった時に呼び出す関数を登録する。listener(canvas)
+    def add_resize_listener(self, listener:Callable[["Canvas"],None]):
+        self._resize_listeners.append(listener)
+
+    # 画面のクリア
+    # 任意の色で初期化したい時はcolorに好きな色を入れる
+    def clear(self, color:str="black"):
+        # canvas丸ごと塗りつぶし
+        self.draw_rect(self.rect.p , self.rect.s, color)
+
+    # 矩形の描画(塗りつぶし)
+    # p  : 左上の座標 ( left  ,   top )
+    # s  : 矩形サイズ ( width , height)
+    def draw_rect(self, p:Vector2D, s:Vector2D, color:str="black"):
+        self._set_fill(color)
+        self.ctx.fillRect(p.x, p.y, s.x, s.y)
+
+    # 矩形の描画(指定した座標に矩形の中央が来るように描画)
+    # colorは make_color()を使ってRGBで指定することもできる。
+    # ("red","blue"のような文字列と"#808080"のような16進数RGB文字列が使える)
+    def draw_rect_center(self, p:Vector2D, s:Vector2D, color:str="black"):
+        self.draw_rect(p - s//2 , s , color)
+
+    # 矩形の線だけの描画
+    # p  : 左上の座標 ( left  ,   top )
+    # s  : 矩形サイズ ( width , height)
+    def draw_rectline(self, p:Vector2D, s: Vector2D, color:str="black"):
+        self.ctx.strokeStyle = color
+        self.ctx.strokeRect(p.x, p.y, s.x, s.y);        
+
+    # Imageクラスの描画
+    # p       : 描画したい座標
+    # srcPos  : 転送元画像の転送したい矩形の左上の座標(Noneを指定すれば (0,0) を指定したのと同じ)
+    # srcSize : 転送元画像の転送したい矩形の大きさ    (Noneを指定すれば転送元の画像全体と同じ大きさ)
+    # dstSize : 描画先での大きさ                    (Noneを指定すれば転送元と同じ)
+    def draw_image(self,image:"Image", p:Vector2D ,\
+         srcPos:Vector2D = Vector2D(0,0) , srcSize:Vector2D | None = None,
+         dstSize:Vector2D | None =None ):
+
+        # 読み込みが完了していなければ(失敗しているなどでも) width == 0 なので
+        # その状態なら、描画をskipする。
+        if not image.load_completed():
+            return 
+        if not srcSize: # srcSizeが指定されていなければ、転送元画像のサイズそのまま
+            srcSize = image.get_size()
+        if not dstSize: # dstSizeが指定されていなければ、転送元のサイズと同じ(等倍)
+            dstSize = srcSize
+
+        self.ctx.drawImage(image.image, srcPos.x , srcPos.y, \
+            srcSize.x , srcSize.y , p.x, p.y , dstSize.x, dstSize.y )
+
+    # Imageクラスを描画(指定した座標に画像の中央が来るように描画)
+    # p       : 描画したい座標
+    # srcPos  : 転送元画像の転送したい矩形の左上の座標(Noneを指定すれば (0,0) を指定したのと同じ)
+    # srcSize : 転送元画像の転送したい矩形の大きさ    (Noneを指定すれば転送元の画像全体と同じ大きさ)
+    # dstSize : 描画先での大きさ                    (Noneを指定すれば転送元と同じ)
+    def draw_image_center(self, image:"Image", p:Vector2D, \
+         srcPos:Vector2D = Vector2D(0,0) , srcSize:Vector2D | None = None,
+         dstSize:Vector2D | None =None ):
+
+        if not srcSize: # srcSizeが指定されていなければ、転送元画像のサイズそのまま
+            srcSize = image.get_size()
+        if not dstSize: # dstSizeが指定されていなければ、転送元のサイズと同じ(等倍)
+            dstSize = srcSize
+
+        self.draw_image(image , p - dstSize // 2 ,\
+             srcPos = srcPos , srcSize = srcSize , dstSize = dstSize)
+
+    # 文字をcanvasに描画
+    # p : 文字列の左上の座標
+    # colorは make_color()を使ってRGBで指定することもできる。
+    # ("red","blue"のような文字列と"#808080"のような16進数RGB文字列が使える)
+    def draw_text(self, text:str, p:Vector2D, font:str="32px serif",color:str="white"):
+        self._set_font(font)
+        self._set_fill(color)
+        self._set_baseline("top")
+        self.ctx.fillText(text, p.x, p.y)
+
+    # 文字をcanvasに描画
+    # draw_textの中央揃え版。
+    # p : 文字列の中央にしたい座標。
+    def draw_text_center(self, text:str, p:Vector2D, font:str="32px serif",color:str="white"):
+        # 描画される幅を計測する
+        textWidth = self.measure_text(text, font)
+
+        self._set_font(font)
+        self._set_fill(color)
+        self._set_baseline("top")
+
+        # その幅の分だけ左側から表示。
+        self.ctx.fillText(text, p.x - textWidth//2, p.y)
+
+    # FrameProfilerの統計を左上に重ねて描く。
+    # p : 左上の座標
+    def draw_profiler(self, profiler:"FrameProfiler", p:Vector2D = Vector2D(8, 8), font:str = "14px monospace"):
+        stats = profiler.stats()
+        lines = [f"{'phase':<9}{'p50':>7}{'p95':>7}{'p99':>7}  (ms)"]
+        for name, st in stats.items():
+            lines.append(f"{name:<9}{st['p50']:>7.2f}{st['p95']:>7.2f}{st['p99']:>7.2f}")
+        line_height = int(font_px(font) * 1.3)
+        width = max(self.measure_text(line, font) for line in lines) + 16
+        self.draw_rect(p, Vector2D(width, line_height * len(lines) + 8), "rgba(0,0,0,0.6)")
+        for i, line in enumerate(lines):
+            self.draw_text(line, Vector2D(p.x + 8, p.y + 4 + line_height * i), font=font, color="#80ff80")
+
+    # 文字をまとめてcanvasに描画
+    # draw_text_centerを何度も呼び出す代わりに使う。
+    # items : (text, x, y, font, color) の並び。x, yは文字列の中央(横)と上端(縦)の座標。
+    # fontとcolorで並べ替えてから描くので、ctx.font、fillStyleの設定は変わる時の1回ずつで済む。
+    # (重なった時の描画順は保証しない)
+    def draw_texts_center(self, items:list[tuple[str, float, float, str, str]]):
+        ctx = self.ctx
+        self._set_baseline("top")
+        for text, x, y, font, color in sorted(items, key=lambda item: (item[3], item[4])):
+            textWidth = self.measure_text(text, font)
+            if font != self._font:
+                self._set_font(font)
+            if color != self._fill:
+                self._set_fill(color)
+            ctx.fillText(text, x - textWidth//2, y)
+
+    # 文字列の描画される幅を返す。
+    # 同じ(text, font)の幅は覚えておき、measureText()は初回だけ呼び出す。
+    def measure_text(self, text:str, font:str)->float:
+        key = (text, font)
+        width = self._widths.get(key)
+        if width is None:
+            self._set_font(font)
+            width = self.ctx.measureText(text).width
+            if len(self._widths) >= self.max_widths:
+                # 一番古いものを捨てる
+                del self._widths[next(iter(self._widths))]
+            self._widths[key] = width
+        return width
+
+    # ctxの状態を設定する。変わらない時は何もしない。
+    def _set_font(self, font:str):
+        if font != self._font:
+            self.ctx.font = font
+            self._font = font
+
+    def _set_fill(self, color:str):
+        if color != self._fill:
+            self.ctx.fillStyle = color
+            self._fill = color
+
+    def _set_baseline(self, baseline:str):
+        if baseline != self._baseline:
+            self.ctx.textBaseline = baseline
+            self._baseline = baseline
+
+    # ctxの状態がわからなくなった時(canvasの大きさを変えた時など)に呼び出す。
+    def _reset_state(self):
+        self._font:str | None = None
+        self._fill:str | None = None
+        self._baseline:str | None = None
+
+    # 文字をcanvasに描画
+    # draw_text_centerのキャッシュ版。
+    # 初回だけオフスクリーンのcanvasに描き、2回目以降はそれをdrawImageで描画する。
+    # 何度も同じ文字列・font・colorで描くものに使う。
+    def draw_text_center_cached(self, text:str, p:Vector2D, font:str="32px serif",color:str="white"):
+        self.draw_text_center_cached_xy(text, p.x, p.y, font, color)
+
+    # draw_text_center_cachedの座標を数値で渡す版。(Vector2Dを作らずに済む)
+    def draw_text_center_cached_xy(self, text:str, x:float, y:float, font:str="32px serif",color:str="white"):
+        image, textWidth, width, height = self.sprites.get(text, font, color)
+        pad = TextSpriteCache.PADDING
+        self.ctx.drawImage(image, x - textWidth//2 - pad, y - pad, width, height)
+
+    # draw_text_centerの座標を数値で渡す版。(Vector2Dを作らずに済む)
+    def draw_text_center_xy(self, text:str, x:float, y:float, font:str="32px serif",color:str="white"):
+        textWidth = self.measure_text(text, font)
+        self._set_font(font)
+        self._set_fill(color)
+        self._set_baseline("top")
+        self.ctx.fillText(text, x - textWidth//2, y)
+
+    # RGB値からCSSで使う文字列を作る。
+    # r,g,b : 0-255の範囲
+    # r=g=b=128なら"#808080"という文字が返る。
+    @staticmethod
+    def make_color(r:int,g:int,b:int)->str:
+        # 2文字の16進数にする。
+        def toHex(x:int):
+            return ('0' + format(x,"x"))[-2:]
+        return f"#{toHex(r)}{toHex(g)}{toHex(b)}"
+
+    # message dialogを出す。
+    @staticmethod
+    def message_dialog(text:str):
+        from .dialogs import Dialog
+        Dialog(text , ok_cancel=True)
@@ -0,0 +1,9 @@
+# ==============================================================================
+#                     Yaneurao Game SDK for Brython : ダイアログ
+# ==============================================================================
+
+# browser.widgets.dialog は読み込み(変換)に時間がかかるのに、ダイアログを出すのはエラーの時ぐらいなので、
+# yanesdkはこのモジュールを yanesdk.InfoDialog のように参照された時に読み込む。(yanesdk/__init__.pyの_LAZY)
+# yanesdkの中で使う時も、ダイアログを出す時にimportすること。
+
+from browser.widgets.dialog import Dialog, EntryDialog, InfoDialog # type:ignore
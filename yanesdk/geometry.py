@@ -0,0 +1,258 @@
+# ==============================================================================
+#                     Yaneurao Game SDK for Brython : 数学・図形
+# ==============================================================================
+
+from __future__ import annotations
+
+import math
+import random
+
+# ------------------------------------------------------------------------------
+#                              数学関係のツール
+# ------------------------------------------------------------------------------
+
+# 数学関係のツール
+class MathTools:
+
+    # 円周率(定数)
+    PI:float = math.pi
+
+    # xを区間[min,max]の範囲に収める
+    @staticmethod
+    def clamp(x:int | float, min:int | float, max: int | float)-> int | float:
+        if x < min:
+            x = min
+        if x > max:
+            x = max
+        return x
+
+    # 乱数。random.Randomのインスタンスかrandomモジュール。
+    # 同じ結果を再現したい時(ベンチマークなど)は set_rng(random.Random(seed)) で差し替える。
+    rng = random
+
+    # 乱数を差し替える。
+    @staticmethod
+    def set_rng(rng)->None:
+        MathTools.rng = rng
+
+    # 区間[min,max)の整数の乱数を返す。
+    # maxが指定されなかった場合は、区間[0,min)の整数の乱数を返す。
+    @staticmethod
+    def randint(min:int,max:int | None=None)->int:
+        if max:
+            return math.floor(MathTools.rng.random() * (max - min)) + min
+        return math.floor(MathTools.rng.random() * min)
+
+    # sin関数。単位は角度(360を指定すると2π[rad])
+    @staticmethod
+    def sin_deg(x:int | float)->float:
+        return math.sin(math.pi*2 * x / 360)
+
+    # sin関数。単位はrad。
+    @staticmethod
+    def sin(x:float)->float:
+        return math.sin(x)
+
+    # cos関数。単位は角度(360を指定すると2π[rad])
+    @staticmethod
+    def cos_deg(x:int | float)->float:
+        return math.cos(math.pi*2 * x / 360)
+
+    # cos関数。単位はrad。
+    @staticmethod
+    def cos(x:int | float)->float:
+        return math.cos(x)
+
+    # ベクトルの方向を0-360で返す。(右方向が0、上方向(スクリーン座標での上なのでVector2D(0,-1)が上方向であることに注意) が90、..)
+    @staticmethod
+    def atan_deg(v:"Vector2D")->float:
+        # JavaScriptのatan2は 区間[-π,+π](-180°～180°)の範囲で返ってくるので360足して 360で割ったあまりを考えることで補整。
+        return (360 - math.atan2(v.y, v.x) * 180 / math.pi) % 360
+
+    # atan_degのベクトルを数値で渡す版。
+    @staticmethod
+    def atan_deg_xy(x:int | float, y:int | float)->float:
+        return (360 - math.atan2(y, x) * 180 / math.pi) % 360
+
+# ------------------------------------------------------------------------------
+#                              図形関連
+# ------------------------------------------------------------------------------
+
+# 2次元ベクトル
+# このclassはimmutable
+# (毎フレーム同じ座標を動かすような場所では、書き換えられるMVector2Dを使うとオブジェクトの生成を減らせる)
+class Vector2D:
+    # 属性を固定して、生成と属性アクセスを軽くしておく。
+    __slots__ = ('_x', '_y')
+
+    def __init__(self, x:int | float = 0, y:int | float = 0):
+        self._x = x
+        self._y = y
+
+    # readonly
+    @property
+    def x(self)->int | float:
+        return self._x
+
+    # readonly
+    @property
+    def y(self)->int | float:
+        return self._y
+
+    # operator ==
+    def __eq__(self, other:object)->bool:
+        other_:Vector2D = other # type:ignore
+        return self._x == other_._x and self._y == other_._y
+
+    # operator !=
+    def __ne__(self, other:object)->bool:
+        other_:Vector2D = other # type:ignore
+        return not (self._x == other_._x and self._y == other_._y)
+
+    # operator +
+    # z : Vector2D
+    def __add__(self,z:"Vector2D") -> "Vector2D":
+        return Vector2D(self._x + z._x , self._y + z._y)
+
+    # operator +=
+    # def __iadd__(self,z:"Vector2D")-> "Vector2D":
+    #     self.x += z.x
+    #     self.y += z.y
+    #     return self
+    # → immutableなので実装せず。isub、imulについても同様。
+    #   書き換えたい時は MVector2D の iadd()、isub()、imul() を使う。
+
+    # operator -
+    # z : Vector2D
+    def __sub__(self, z:"Vector2D") -> "Vector2D":
+        return Vector2D(self._x - z._x , self._y - z._y)
+
+    # operator *
+    # z : Vector2D
+    def __mul__(self, z:float | int) -> "Vector2D":
+        return Vector2D(self._x * z , self._y * z)
+
+    # operator //
+    def __floordiv__(self,z:float | int)-> "Vector2D":
+        return Vector2D( self._x // z , self._y // z )
+
+    # 文字列化
+    def __str__(self):
+        return f"({self._x},{self._y})"
+
+    # Vectorを矩形の範囲に収まるようにclampする。
+    def clamp(self,rect:"Rect")->"Vector2D":
+        return Vector2D(
+            MathTools.clamp(self._x, rect.left ,rect.right - 1),
+            MathTools.clamp(self._y, rect.top ,rect.bottom - 1)
+        )
+
+    # 単位ベクトルを返す。
+    # kが指定されていれば、そのk倍したものを返す。
+    def unit(self,k:float = 1.0)->"Vector2D":
+        r = math.sqrt(self._x**2 + self._y**2)
+        # ゼロ除算回避
+        if r == 0.0:
+            return Vector2D(0,0)
+        return Vector2D(self._x * k / r , self._y * k / r)
+
+    # このベクトルを座標として見た時に、矩形の範囲内にああるか
+    def is_in_rect(self, rect:"Rect") -> bool:
+        return rect.contains(self._x, self._y)
+
+    # ベクトルのノルム(大きさ)を返す。
+    def norm(self)->float:
+        return math.sqrt(self._x**2 + self._y**2)
+
+# 書き換えられる2次元ベクトル
+# Vector2Dとして使えるが、iadd()などでその場で値を書き換えられる。
+# 演算子(+ - * //)の結果は、Vector2Dと同じく新しいVector2Dになる。
+# 他から参照されているものを書き換えると、参照している側の値も変わってしまうことに注意。
+# 例)
+#   p = MVector2D(0, 0)
+#   p.iadd_scaled(v, dt)   # p += v * dt をオブジェクトを作らずに行う
+class MVector2D(Vector2D):
+    __slots__ = ()
+
+    # 値を設定する。
+    def set(self, x:int | float, y:int | float) -> "MVector2D":
+        self._x = x
+        self._y = y
+        return self
+
+    # operator += 相当
+    def iadd(self, z:Vector2D) -> "MVector2D":
+        self._x += z._x
+        self._y += z._y
+        return self
+
+    # operator -= 相当
+    def isub(self, z:Vector2D) -> "MVector2D":
+        self._x -= z._x
+        self._y -= z._y
+        return self
+
+    # operator *= 相当
+    def imul(self, k:int | float) -> "MVector2D":
+        self._x *= k
+        self._y *= k
+        return self
+
+    # self += z * k 相当
+    def iadd_scaled(self, z:Vector2D, k:int | float) -> "MVector2D":
+        self._x += z._x * k
+        self._y += z._y * k
+        return self
+
+    # 今の値を、immutableなVector2Dとして返す。
+    def freeze(self) -> Vector2D:
+        return Vector2D(self._x, self._y)
+
+# 矩形領域
+# 右端、下端は作った時(p、sを設定した時)に計算しておく。
+# p、sにMVector2Dを渡して、あとからそれを書き換えた場合は反映されないので、設定し直すこと。
+class Rect:
+    __slots__ = ('_p', '_s', 'left', 'top', 'right', 'bottom')
+
+    # 矩形領域。
+    # p : 左上の座標
+    # s : 矩形のサイズ。(width, height)
+    def __init__(self,p:Vector2D,s:Vector2D):
+        # 左上の座標
+        self._p   = p
+        # 矩形のサイズ
+        self._s   = s
+        self._update()
+
+    def _update(self):
+        self.left   = self._p.x
+        self.top    = self._p.y
+        self.right  = self._p.x + self._s.x
+        self.bottom = self._p.y + self._s.y
+
+    # 左上の座標
+    @property
+    def p(self)->Vector2D:
+        return self._p
+
+    @p.setter
+    def p(self, p:Vector2D):
+        self._p = p
+        self._update()
+
+    # 矩形のサイズ
+    @property
+    def s(self)->Vector2D:
+        return self._s
+
+    @s.setter
+    def s(self, s:Vector2D):
+        self._s = s
+        self._update()
+
+    # 座標(x,y)が矩形の範囲内にあるか。
+    def contains(self, x:int | float, y:int | float) -> bool:
+        return self.left <= x < self.right and self.top <= y < self.bottom
+
+    def __str__(self):
+        return f"p={self._p}, s={self._s}"
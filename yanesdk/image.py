@@ -0,0 +1,51 @@
+# ==============================================================================
+#                     Yaneurao Game SDK for Brython : 画像
+# ==============================================================================
+
+from browser import window # type:ignore
+
+from .geometry import Vector2D
+
+# ------------------------------------------------------------------------------
+#                              画面・画像
+# ------------------------------------------------------------------------------
+
+# 画像用class
+class Image:
+    # image_filename : 画像ファイル名("images"フォルダに配置してあるものとする)
+    # ここで読み込んだ画像は、Canvas.draw_image()などで描画できる。
+    def __init__(self, image_filename:str):
+        self.image = window.Image.new()
+        # self.image.src = image_filename と書くとwarningが出る。
+        self.image["src"] = "images\\" + image_filename
+
+    # 画像サイズ
+    # self.size = Vector2D(self.image.naturalWidth , self.image.naturalHeight)
+    # →　このタイミングだと画像読み込みが完了していないため、(0,0)になってしまう。
+    def get_size(self)->"Vector2D":
+        return Vector2D(self.image.naturalWidth , self.image.naturalHeight)
+
+    # 画像が読み込み完了しているかを返す。
+    def load_completed(self)->bool:
+        # 読み込みが完了しているなら画像の幅が得られているはず。
+        return self.image.naturalWidth != 0
+
+# 画像を管理してくれる。
+class ImageLoader:
+    # 使いたい画像ファイルの一覧を渡す。
+    def __init__(self , image_filenames:list[str]):
+
+        # ↓ここに読み込まれる。
+        self.images:list[Image] = []
+
+        for filename in image_filenames:
+            self.images.append(Image(filename))
+
+    # 読み込みが完了している画像の数を返す
+    def completed_num(self)->int:
+        # generator式で書くと短く書ける。
+        return sum((image.load_completed() for image in self.images))
+
+    # すべての画像の読み込みが完了しているのか。していればTrueが返る。
+    def load_completed(self)->bool:
+        return self.completed_num() == len(self.images)
@@ -0,0 +1,579 @@
+# ==============================================================================
+#                     Yaneurao Game SDK for Brython : 入力(キー・タッチ・マウス)
+# ==============================================================================
+
+from __future__ import annotations
+
+from browser import document, DOMEvent # type:ignore
+
+from enum import IntEnum
+from array import array
+# 型の注釈用。実行時は読み込まない。(__init__.pyを参照)
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Callable
+
+from .geometry import MathTools, Vector2D, Rect
+
+# ------------------------------------------------------------------------------
+#                              キー入力
+# ------------------------------------------------------------------------------
+
+# キーコード
+class KEY(IntEnum):
+    LEFT  = 37
+    RIGHT = 39
+    UP    = 38
+    DOWN  = 40
+    SPACE = 32
+    ENTER = 13
+    # あとで追加する
+
+# キー入力
+class KeyInput:
+    def __init__(self):
+
+        # キー入力は、DOMの仕様上、document全体を対象とするしかない。(?)
+        self.element = document
+        
+        # 現在押されているキー
+        # set() でも良いが、keyCodeは最大でも256までしかないのでそういうテーブルを用意する。
+        self._keys      = [False]*256
+        # 前回のupdate()の時に押されていたキー
+        self._last_keys = [False]*256
+
+        # キーイベントのハンドラの設定
+        self.element.addEventListener("keydown", self._key_push)
+        self.element.addEventListener("keyup"  , self._key_up)
+
+        # ↑のイベントをremoveした時にTrueになるフラグ
+        self._event_removed = False
+
+    # キーが押された時のイベント
+    def _key_push(self, e:DOMEvent):
+        self._keys[e.keyCode] = True
+
+        # スクロールバーとか動いてしまうの嫌なので抑制
+        e.preventDefault()
+        e.stopPropagation()
+
+    # キーを離した時のイベント
+    def _key_up(self, e:DOMEvent):
+        self._keys[e.keyCode] = False
+        # スクロールバーとか動いてしまうの嫌なので抑制
+        e.preventDefault()
+        e.stopPropagation()
+
+    # キーが押されているかを判定して返す。
+    def is_key_pressed(self, key:KEY) -> bool:
+        return self._keys[key]
+
+    # 何かキーが押されているか？
+    def is_any_key_pressed(self) -> bool:
+        return any(self._keys)
+
+    # 明示的にeventをremoveする。
+    # キー入力がこのクラスに食われてF5キー等が利かなくて困る時に用いる。
+    def remove_event(self):
+        if not self._event_removed:
+            self.element.removeEventListener("keydown", self._key_push)
+            self.element.removeEventListener("keyup"  , self._key_up)
+            self._event_removed = True
+
+    # コンストラクタでhookしたEventを戻す
+    def __del__(self):
+        self.remove_event()
+
+# ------------------------------------------------------------------------------
+#                              Touchイベント
+# ------------------------------------------------------------------------------
+
+# タッチ情報
+class TouchInfo:
+    # p : 
+    def __init__(self, p:"Vector2D" , id:int):
+        # タッチされている座標
+        self.p = p
+        # そのid(タッチ(指)が移動した場合、同一idであることが保証されている)
+        self.id = id
+
+# タッチイベント(スマホ等)の入力用
+class TouchInput:
+    # canvas_id_name : 対象としたいcanvasのid名。Noneを指定すると、document全体。
+    def __init__(self , id_name:str="canvas"):
+
+        self.element = document[id_name] if id_name else document
+        self.element.addEventListener("touchstart", self._touch_handler)
+        self.element.addEventListener("touchmove" , self._touch_handler)
+        self.element.addEventListener("touchend"  , self._touch_handler)    
+
+        # 現在押されているリスト
+        self.touches:list[TouchInfo] = []
+        # 前回の押されていたリスト
+        self.last_touches:list[TouchInfo] =[]
+
+    def _touch_handler(self, e:DOMEvent):
+        self.touches:list[TouchInfo] = []
+
+        touch_list = e.touches
+        for touch in touch_list:
+            self.touches.append(TouchInfo(Vector2D(touch.clientX,touch.clientY),touch.identifier))
+
+        # スクロールの防止
+        e.preventDefault();
+
+    # 明示的にeventをremoveする。
+    # キー入力がこのクラスに食われてF5キー等が利かなくて困る時に用いる。
+    def remove_event(self):
+        self.element.removeEventListener("touchstart", self._touch_handler)
+        self.element.removeEventListener("touchmove" , self._touch_handler)
+        self.element.removeEventListener("touchend"  , self._touch_handler)    
+
+    # 現在押されている箇所の一覧を返す。
+    def get_info(self)->list[TouchInfo]:
+        return self.touches
+
+    # 前回から新規に押されたところだけを返す。
+    def get_touchstart_info(self)->list[TouchInfo]:
+        touches:list[TouchInfo] = []        
+        for touch in self.touches:
+
+            # touch.id が self.last_touches のなかに見つからなければ新規に押されたということなので
+            # touchesに追加する。
+
+            found = False
+            for last_touch in self.last_touches:
+                if touch.id == last_touch.id:
+                    found = True
+                    break
+
+            if not found:
+                touches.append(touch)
+
+        # 保存しておく
+        self.last_touches = self.touches
+        return touches
+
+    # コンストラクタでhookしたEventを戻す
+    def __del__(self):
+        self.remove_event()
+
+# マウス情報
+class MouseInfo:
+    def __init__(self, pos:"Vector2D" , left_button:bool , middle_button:bool , right_button:bool):
+
+        # 座標(x,y) 対象とするelementの左上を原点とする。
+        self.p = pos
+
+        # 各ボタンの状態
+        self.left_button   = left_button
+        self.middle_button = middle_button
+        self.right_button  = right_button
+
+    def clone(self)->"MouseInfo":
+        return MouseInfo(self.p, self.left_button, self.middle_button, self.right_button)
+
+    def __str__(self)->str:
+        return f"{self.p} , L={self.left_button}, M={self.middle_button}, R={self.right_button}"
+
+# マウス入力
+class MouseInput:
+    # canvas_id_name : 対象としたいcanvasのid名。Noneを指定すると、document全体。
+    def __init__(self , id_name:str="canvas"):
+        self.element = document[id_name] if id_name else document
+        self.element.addEventListener("mousemove"   , self._mouse_move  )
+        self.element.addEventListener("mousedown"   , self._mouse_updown)
+        self.element.addEventListener("mouseup"     , self._mouse_updown)
+        self.element.addEventListener("contextmenu" , self._contextmenu )
+
+        # マウスの現在の状態(次のframeまでに書き換わるので、そのあと書き換わって困るなら、clone()して用いること。)
+        self.info      = MouseInfo(Vector2D(-99999,-99999), False,False,False)
+
+    # マウスの現在の状態(次のframeまでに書き換わるので、そのあと書き換わって困るなら、clone()して用いること。)
+    def get_info(self)->MouseInfo:
+        return self.info
+
+    # マウスの移動ハンドラ
+    def _mouse_move(self, e:DOMEvent):
+        self.info.p = Vector2D(e.offsetX, e.offsetY)
+
+    # マウスのボタン押し下げハンドラ
+    def _mouse_updown(self, e:DOMEvent):
+        self.info.left_button   = bool(e.buttons & 1)
+        self.info.right_button  = bool(e.buttons & 2)
+        self.info.middle_button = bool(e.buttons & 4)
+
+    def _contextmenu(self, e:DOMEvent):
+        # コンテキストメニューの出現をキャンセル
+        e.preventDefault();
+        
+    # 明示的にeventをremoveする。
+    # キー入力がこのクラスに食われてF5キー等が利かなくて困る時に用いる。
+    def remove_event(self):
+        self.element.removeEventListener("mousemove"   , self._mouse_move  )
+        self.element.removeEventListener("mousedown"   , self._mouse_updown)
+        self.element.removeEventListener("mouseup"     , self._mouse_updown)
+        self.element.removeEventListener("contextmenu" , self._contextmenu )
+
+    # コンストラクタでhookしたEventを戻す
+    def __del__(self):
+        self.remove_event()
+
+# 仮想キー(VirtualKeyInputを使う時に使えるかも)
+class VKEY(IntEnum):
+    SPACE = 0
+    ENTER = 1
+    LEFT  = 2
+    RIGHT = 3
+    DOWN  = 4
+    UP    = 5
+    # あとで追加するかも
+
+# 仮想キー入力
+# スペースキー、マウスクリック(右 or 左)、画面タッチ(スマホ)のいずれでもスペースキーが押されたとみなす、みたいな感じのことができる。
+# 使い方)
+#  register_handler()でハンドラを登録するか、configure_1key_game()のようなconfigureを自動でやってくれる関数を呼び出す。
+#  以降は、1 frameごとにupdate()を呼び出し、そのあと is_key_pressed() / is_key_pushed() で、
+#  ある仮想キーが押されているか/押し下げられたかを判定できる。
+class VirtualKeyInput:
+
+    # id_name : キー入力の対象とするHTML element。document全体にするならNoneを指定。
+    def __init__(self, id_name : str = "canvas"):
+        self.key_input = KeyInput()
+        self.touch_input = TouchInput(id_name)
+        self.mouse_input = MouseInput(id_name)
+
+        # update()が呼び出された時に呼び出されるハンドラ。
+        # 仮想キーごとにハンドラを用意すると、touch_inputに対するハンドラが書きにくくて良くない設計。
+        self.handler:Callable[[],None] | None = None
+
+        # 前回と今回、それぞれのキーが押されていたかの情報。update()呼び出しごとに更新される。
+        self._key_pressed_previous:list[bool] = []
+        self. key_pressed_current :list[bool] = [False]*16 # 最大 16key
+
+        # update()のあと、(有効矩形内で)タッチされていた箇所。なければNone。configure_6keys_8directions_game()などを用いる時のみ有効。
+        self.touch_pos:Vector2D | None = None
+
+        # update()のあと、今回のフレームで起きたイベント(push_event()で渡された文字列)のlist。
+        self.events:list[str] = []
+        # 次のupdate()で渡すイベント
+        self._pending_events:list[str] = []
+
+        # 入力の記録と再生。(start_recording()、start_replay()を参照)
+        self._recording:array | None = None
+        self._recorded_touch:dict[int, tuple[float, float]] = {}
+        self._recorded_events:list[list] = []
+        self._replay:array | None = None
+        self._replay_touch:dict[int, tuple[float, float]] = {}
+        self._replay_events:dict[int, list[str]] = {}
+        self._replay_frame = 0
+
+    # ワンキーゲーム用のお手軽設定
+    # 仮想キー VKEY.SPACE として以下のように設定する。
+    #   key   : Space、Enter
+    #   mouse : 左・右ボタン
+    #   touch : 画面タッチ
+    def configure_1key_game(self):
+        def handler():
+            mouse = self.mouse_input.get_info()
+            self.key_pressed_current[VKEY.SPACE] = \
+                self.key_input.is_key_pressed(KEY.SPACE) or self.key_input.is_key_pressed(KEY.ENTER) or \
+                mouse.left_button or mouse.right_button or \
+                len(self.touch_input.get_info()) > 0 
+
+        self.register_handler(handler)
+
+    # 左右キーのみのゲーム用のお手軽設定
+    # ※　あくまで書き方のサンプル。この仕様が気にいらなければ、この関数をコピペして書き換えてregister_handler()を呼び出すと良いと思う。
+    # 仮想キー VKEY.LEFT として以下のように設定する。
+    #   key   : 左カーソル
+    #   mouse : 左ボタン
+    #   touch : 画面左半分のタッチ
+    # 仮想キー VKEY.RIGHT として以下のように設定する。
+    #   key   : 右カーソル
+    #   mouse : 右ボタン
+    #   touch : 画面右半分のタッチ
+    # 仮想キー VKEY.SPACE , VKEY.ENTER として以下のように設定する。
+    #   key   : SPACE , Enter
+    #
+    # r0 : タッチされた時に 仮想キー0としてみなす矩形領域(デフォルトでは400px × 400px のcanvasの左半分)
+    # r1 : タッチされた時に 仮想キー1としてみなす矩形領域(デフォルトでは400px × 400px のcanvasの右半分)
+    def configure_4keys_2directions_game(self, r0:Rect=Rect(Vector2D(0,0),Vector2D(200,400)), r1:Rect=Rect(Vector2D(200,0),Vector2D(200,400))):
+
+        def handler():
+            mouse = self.mouse_input.get_info()
+            self.key_pressed_current[VKEY.LEFT ] = self.key_input.is_key_pressed(KEY.LEFT ) or\
+                    mouse.left_button or \
+                    (len(self.touch_input.get_info()) > 0 and self.touch_input.get_info()[0].p.is_in_rect(r0))
+
+            self.key_pressed_current[VKEY.RIGHT] = self.key_input.is_key_pressed(KEY.RIGHT) or\
+                    mouse.right_button or \
+                    (len(self.touch_input.get_info()) > 0 and self.touch_input.get_info()[0].p.is_in_rect(r1))
+
+            self.key_pressed_current[VKEY.SPACE] = self.key_input.is_key_pressed(KEY.SPACE)
+            self.key_pressed_current[VKEY.ENTER] = self.key_input.is_key_pressed(KEY.ENTER)
+
+        self.register_handler(handler)
+
+    # 上下左右キーのみのゲーム用のお手軽設定。斜め入力は無しの場合について。(ありの場合はconfigure_6keys_8directions_game()を呼び出すこと。)
+    # ※　あくまで書き方のサンプル。この仕様が気にいらなければ、この関数をコピペして書き換えてregister_handler()を呼び出すと良いと思う。
+    # 仮想キー VKEY.LEFTとして以下のように設定する。
+    #   key   : 左カーソル
+    #   mouse , touch : 指定した矩形の左らへんのタッチ
+    # 仮想キー VKEY.RIGHTとして以下のように設定する。
+    #   key   : 右カーソル
+    #   mouse , touch : 指定した矩形の右らへんのタッチ
+    # 仮想キー VKEY.DOWNとして以下のように設定する。
+    #   key   : 下カーソル
+    #   mouse , touch : 指定した矩形の下らへんのタッチ
+    # 仮想キー VKEY.UPとして以下のように設定する。
+    #   key   : 上カーソル
+    #   mouse , touch : 指定した矩形の上らへんのタッチ
+    # 仮想キー VKEY.SPACE として以下のように設定する。
+    #   key   : Space
+    #   mouse : 左クリック
+    #   touch : 任意箇所
+    # 仮想キー VKEY.ENTER として以下のように設定する。
+    #   key   : Enter
+    # 
+    #  r      : マウスクリック、タッチの有効矩形。このなかだけ有効。
+    # タッチされた箇所は、self.touch_posに反映される。
+    def configure_6keys_4directions_game(self, r:Rect=Rect(Vector2D(0,0),Vector2D(200,200))):
+        self.register_handler(lambda : self._6keys_handler(r, 45))
+
+    # 上下左右キーのみのゲーム用のお手軽設定。斜め入力もありうる場合について。(なしの場合はconfigure_6directios_game()を呼び出すこと。)
+    # その他は、configure_6keys_4directios_gameと同じ。
+    def configure_6keys_8directions_game(self, r:Rect=Rect(Vector2D(0,0),Vector2D(200,200))):
+        self.register_handler(lambda : self._6keys_handler(r, 45))
+
+    # ↑で使うhandler
+    # r              : マウスクリック、タッチの有効矩形。このなかだけ有効。
+    def _6keys_handler(self, r:Rect, tolerance:float)->None:
+        mouse = self.mouse_input.get_info()
+
+        # キー入力
+        self.key_pressed_current[VKEY.SPACE] = self.key_input.is_key_pressed(KEY.SPACE) or \
+                mouse.left_button or \
+                len(self.touch_input.get_info()) > 0
+                # 仮想キー VEKY.SPACEに、これらを入れておかないと is_any_key_pressed()で開始待ちをしている時に画面タッチしてもゲームが始まらない。
+
+        self.key_pressed_current[VKEY.ENTER] = self.key_input.is_key_pressed(KEY.ENTER)
+
+        self.key_pressed_current[VKEY.LEFT ] = self.key_input.is_key_pressed(KEY.LEFT )
+        self.key_pressed_current[VKEY.RIGHT] = self.key_input.is_key_pressed(KEY.RIGHT)
+        self.key_pressed_current[VKEY.DOWN ] = self.key_input.is_key_pressed(KEY.DOWN )
+        self.key_pressed_current[VKEY.UP   ] = self.key_input.is_key_pressed(KEY.UP   )
+                
+        # マウスか、タッチで矩形内のものを探す。マウスは、左クリックされていなければ無視。
+        p:Vector2D | None = None
+        if mouse.left_button and r.contains(mouse.p.x, mouse.p.y):
+            p = mouse.p
+        else:
+            # マウスは矩形内になかったのでタッチを調べる。
+            touch_list = self.touch_input.get_info()
+            for touch in touch_list:
+                if r.contains(touch.p.x, touch.p.y):
+                    # 矩形内にあった。
+                    p = touch.p
+                    break
+
+        # タッチされていた。
+        if p:
+            # rect中心からどの方角なのか
+            # (毎フレーム呼ばれるので、Vector2Dを作らずに数値で計算する)
+            dx = p.x - (r.left + r.s.x//2)
+            dy = p.y - (r.top  + r.s.y//2)
+            if dx*dx + dy*dy <= 5*5:
+                # 矩形中心から小さすぎる距離なのでニュートラル(レバーが中央のままで、入力なし)扱い。
+                p = None
+            else:
+                # ベクトルの角度を0-360で返す。
+                deg = MathTools.atan_deg_xy(dx, dy)
+
+                # 4方向を考える。例えば、右上なら 45°方向。右下なら -45°(270+45)方向。
+                # 
+                # このとき、上としてみなしたいのは、90°±45°。
+                # ゆえに、45° <= deg <= 180°-45° には、"上"方向の成分の入力があると考えられる。
+                # 以下、同様。ゆえに以下の式でtolerance = 45。
+
+                # 8方向を考える場合。
+                # 
+                # このとき、右上としてみなしたいのは、45°±22.5°。
+                # 　　　　　左上としてみなしたいのは、90+45±22.5°。
+                # ゆえに、22.5° <= deg <= 180°-22.5° には、"上"方向の成分の入力があると考えられる。
+                # 以下、同様。ゆえに以下の式でtolerance = 22.5。
+
+                if  90 + tolerance <= deg <= 270 - tolerance:       # 左方向
+                    self.key_pressed_current[VKEY.LEFT ] = True
+                if deg <= 90 - tolerance or 270 + tolerance <= deg: # 右方向
+                    self.key_pressed_current[VKEY.RIGHT] = True
+                if 180 + tolerance <= deg <= 360 - tolerance:       # 下方向
+                    self.key_pressed_current[VKEY.DOWN ] = True
+                if   0 + tolerance <= deg <= 180 - tolerance:       # 上方向
+                    self.key_pressed_current[VKEY.UP   ] = True
+                
+        self.touch_pos = p
+
+
+    # update()の時に呼び出されるハンドラを登録する。
+    # このハンドラは、
+    #  1. self.key_pressed_currentを更新しなければならない。
+    #  2. 登録する時に self.key_pressed_currentを仮想キーの数だけ確保しなくてはならない。
+    def register_handler(self,handler:Callable[[],None]):
+        self.handler = handler
+
+    # 仮想キーが押されたかを返す。
+    # key : 仮想キー番号(0から register_handler()を呼び出した回数 - 1 まで)
+    def is_key_pressed(self,key:VKEY):
+        # 登録されているハンドラを呼び出すだけ。
+        return self.key_pressed_current[key]
+
+    # いずれかの仮想キーが押されていたらTrueを返す。
+    def is_any_key_pressed(self):
+        return any(self.key_pressed_current)
+
+    # 仮想キーが(前回のupdate呼び出し時は押されていなくて)新規に押されたのかを返す。
+    # そのframeでまずupdate()を一度呼び出して、そのあと、各仮想キーに対してこのメソッドを呼び出していく。
+    # 例)
+    #  keyinput.update()
+    #  if keyinput.is_key_pushed(0):
+    #    ...
+    def is_key_pushed(self,key:VKEY):
+
+        if len(self._key_pressed_previous) != len(self.key_pressed_current):
+            # update()を呼び忘れている。
+            raise Exception("please call VirtualKeyInput.update()")
+
+        # 前回押されていなくて、今回押されている。
+        return not self._key_pressed_previous[key] and self.key_pressed_current[key]
+
+    # 仮想キー以外の操作(キーで何かを切り替えるなど)を、イベント(文字列)として次のupdate()で渡す。
+    # update()のあと self.events に入るので、そこで処理すれば、キーと同じように記録・再生される。
+    def push_event(self, event:str):
+        self._pending_events.append(event)
+
+    # is_key_pushed()を使いたいなら、この関数を1 frameごとに呼び出すこと。
+    def update(self):
+        # 前回の情報を退避させる。
+        self._key_pressed_previous = self.key_pressed_current.copy()
+        
+        if self._replay is not None:
+            # 記録した入力を再生中
+            self._replay_next(self._replay)
+        else:
+            if self.handler:
+                # ハンドラを呼び出す。
+                # (このハンドラが self.key_pressed_currentを更新してくれる。)
+                self.handler()
+            self.events = self._pending_events
+            self._pending_events = []
+
+        if self._recording is not None:
+            self._record(self._recording)
+
+    # ------------------------------------------------------------------
+    # 入力の記録と再生
+    # update()ごとに、仮想キーの状態(ビットごとに1キー)とtouch_posを記録しておき、あとで同じ順に再生する。
+    # 乱数の種をそろえておけば、同じ操作でのフレームの処理をCPython上で再現できる。(bench/bench_frames.py --replay)
+    #
+    # push_event()で渡したイベントも、そのフレームで記録・再生する。
+    #
+    # 記録の形式(JSONにできるdict)
+    #   {"v": 1, "frames": フレーム数,
+    #    "keys"  : [[キーの状態, 続いたフレーム数], ...]   (同じ状態が続く間をまとめたもの)
+    #    "touch" : [[フレーム, x, y], ...]               (touch_posがあったフレームだけ)
+    #    "events": [[フレーム, イベント], ...]}           (イベントがあったフレームだけ。無い記録もある)
+    # ------------------------------------------------------------------
+
+    # 記録を開始する。(前の記録は捨てる)
+    def start_recording(self):
+        self._recording = array('H')
+        self._recorded_touch = {}
+        self._recorded_events = []
+
+    # 記録をやめる。
+    def stop_recording(self):
+        self._recording = None
+
+    # 記録中ならTrue
+    @property
+    def recording(self)->bool:
+        return self._recording is not None
+
+    def _record(self, recording:array):
+        mask = 0
+        for i, pressed in enumerate(self.key_pressed_current):
+            if pressed:
+                mask |= 1 << i
+        if self.touch_pos is not None:
+            self._recorded_touch[len(recording)] = (self.touch_pos.x, self.touch_pos.y)
+        for event in self.events:
+            self._recorded_events.append([len(recording), event])
+        recording.append(mask)
+
+    # ここまでの記録を返す。
+    def get_recording(self)->dict:
+        keys:list[list[int]] = []
+        for mask in self._recording or ():
+            if keys and keys[-1][0] == mask:
+                keys[-1][1] += 1
+            else:
+                keys.append([mask, 1])
+        return {
+            "v"     : 1,
+            "frames": len(self._recording or ()),
+            "keys"  : keys,
+            "touch" : [[frame, x, y] for frame, (x, y) in sorted(self._recorded_touch.items())],
+            "events": list(self._recorded_events),
+        }
+
+    # get_recording()で得た記録の再生を開始する。再生中はハンドラ(実際の入力)とpush_event()を使わない。
+    # 記録の最後まで再生したら、実際の入力に戻る。
+    def start_replay(self, record:dict):
+        if record.get("v") != 1:
+            raise ValueError("unsupported input record")
+        replay = array('H')
+        for mask, count in record["keys"]:
+            replay.extend([mask] * count)
+        self._replay = replay
+        self._replay_touch = {frame: (x, y) for frame, x, y in record.get("touch", [])}
+        self._replay_events = {}
+        for frame, event in record.get("events", []):
+            self._replay_events.setdefault(frame, []).append(event)
+        self._replay_frame = 0
+
+    # 再生中ならTrue
+    @property
+    def replaying(self)->bool:
+        return self._replay is not None
+
+    def _replay_next(self, replay:array):
+        frame = self._replay_frame
+        if frame >= len(replay):
+            # 最後まで再生したので実際の入力に戻る
+            self._replay = None
+            if self.handler:
+                self.handler()
+            self.events = self._pending_events
+            self._pending_events = []
+            return
+        mask = replay[frame]
+        current = self.key_pressed_current
+        for i in range(len(current)):
+            current[i] = bool(mask >> i & 1)
+        touch = self._replay_touch.get(frame)
+        self.touch_pos = Vector2D(touch[0], touch[1]) if touch is not None else None
+        self.events = self._replay_events.get(frame, [])
+        self._pending_events.clear()
+        self._replay_frame = frame + 1
+
+    # 明示的にeventをremoveする。
+    # キー入力がこのクラスに食われてF5キー等が利かなくて困る時に用いる。
+    def remove_event(self):
+        self.key_input  .remove_event()
+        self.touch_input.remove_event()
+        self.mouse_input.remove_event()
+        
+    # コンストラクタでhookしたEventを戻す
+    def __del__(self):
+        self.remove_event()
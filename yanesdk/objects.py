@@ -0,0 +1,122 @@
+# ==============================================================================
+#                     Yaneurao Game SDK for Brython : GameObject
+# ==============================================================================
+
+# ------------------------------------------------------------------------------
+#                              GameObject
+# ------------------------------------------------------------------------------
+
+# GameObjectのOnDraw()で渡すパラメーターの基底class。これから派生させる。
+class GameContext:
+    pass
+
+# ゲームに出てくる物体
+class GameObject:
+    # p : Vector2D , 座標
+    def __init__(self):
+
+        # オブジェクトの削除マーク
+        # (これがTrueだと、次のフレームで削除される)
+        self.deleted = False
+
+    # 描画に対して呼び出される。派生クラス側でoverrideする。
+    # contextは、描画に必要なためのクラスを指定する。
+    def onDraw(self,context:GameContext):
+        pass
+
+# GameObjectを追加したり削除したりする。
+#
+# 削除されたオブジェクトは、create()で作ったclassのものに限り、free list(使い回し用のlist)に戻しておき、
+# 次のcreate()でreset()して使い回す。
+# 削除されたものを取り除く時は、末尾のものをその位置に移す(swap-remove)ので、objectsの順番は保たれない。
+class GameObjectManager(GameObject):
+    # free listにclassごとに持っておく最大数
+    MAX_FREE = 64
+
+    def __init__(self):
+        # ゲーム上の物体
+        self.objects:list[GameObject] = []
+        # 削除されたオブジェクトの使い回し用。class → そのclassのオブジェクトのlist
+        self._free:dict[type, list[GameObject]] = {}
+
+    # このclassをiterableにしておく。
+    # def __iter__(self):
+    #     # yield from self.objects
+    #     # →　途中でappend()される可能性を考慮して以下のように書く。     
+    #     i = 0
+    #     while i < len(self.objects):
+    #         yield self.objects[i]
+    #         i += 1
+    # →　わかりにくいので素直に self.objects 使ったほうがいいと思う。
+
+    # GameObjectを追加する。
+    def append(self,object:GameObject):
+        self.objects.append(object)
+
+    # clsのGameObjectを作って追加し、それを返す。
+    # free listに削除済みのものがあれば、それのreset(*args)を呼び出して使い回す。
+    # clsは、__init__と同じ引数を取るreset()を持っていること。
+    def create(self, cls:type, *args) -> GameObject:
+        free = self._free.setdefault(cls, [])
+        if free:
+            obj = free.pop()
+            obj.reset(*args)
+            obj.deleted = False
+        else:
+            obj = cls(*args)
+        self.objects.append(obj)
+        return obj
+
+    # 削除されたオブジェクトをfree listに戻す。create()で作ったことのあるclassのものだけ。
+    def _release(self, obj:GameObject):
+        free = self._free.get(type(obj))
+        if free is not None and len(free) < self.MAX_FREE:
+            free.append(obj)
+
+    # このクラスの持つ objects(GameObjectのlist)に対してonDraw()を呼び出してやる。
+    # onDraw()のなかで このクラスのappend()が呼び出されてもうまく動くようになっている。
+    def onDraw(self,context:GameContext):
+
+        # ゲームオブジェクトの描画
+        # onDrawのなかで追加されることがあるのでappendに対して安全にしておく必要がある。
+        # また、このframeで追加されたものに対してonDraw()を呼び出すことを保証したい。
+        # なので通常のforループでは書けない。
+
+        objects = self.objects
+        deleted = 0
+        i = 0
+        while i < len(objects):
+            obj = objects[i]
+            if obj.deleted:
+                # 先に描画された他のオブジェクトに削除されたものは描画しない。
+                deleted += 1
+            else:
+                obj.onDraw(context)
+                if obj.deleted:
+                    deleted += 1
+            i += 1
+
+        # 備考) listに対してforで回している時のappend、Pythonでは現状問題がないようだ。
+        #       しかし今後、変わる恐れがあるのでこの仕様に依存した書き方をしない。
+        #       https://dev.classmethod.jp/articles/python-delete-element-of-list/
+
+        # deleteフラグが立っているものはremoveする。
+        # 削除されたものがない時は、listを作り直さない。
+        if deleted:
+            self._compact()
+
+    # deleteフラグが立っているものを取り除く。
+    # 末尾のものを空いた位置に移して、最後にまとめて末尾を切り詰める。
+    def _compact(self):
+        objects = self.objects
+        n = len(objects)
+        i = 0
+        while i < n:
+            obj = objects[i]
+            if obj.deleted:
+                n -= 1
+                objects[i] = objects[n]
+                self._release(obj)
+            else:
+                i += 1
+        del objects[n:]
@@ -0,0 +1,34 @@
+# ==============================================================================
+#                     Yaneurao Game SDK for Brython : 文字列操作など
+# ==============================================================================
+
+from browser import window # type:ignore
+
+# ------------------------------------------------------------------------------
+#                              文字列操作など
+# ------------------------------------------------------------------------------
+
+class StrUtil:
+    # 左からn文字切り出す
+    @staticmethod
+    def left(s:str,n:int):
+        return s[:n]
+
+    # 右からn文字切り出す
+    @staticmethod
+    def right(s:str,n:int):
+        return s[-n:]
+
+    # 真ん中n文字目からm文字切り出す
+    @staticmethod
+    def mid(s:str, n:int, m:int):
+        return s[n:n+m]
+
+# URLのクエリ文字列("?a=1&b=2")をdictにして返す。
+def query_params()->dict[str,str]:
+    params:dict[str,str] = {}
+    for pair in str(window.location.search).lstrip("?").split("&"):
+        if pair:
+            key, _, value = pair.partition("=")
+            params[key] = value
+    return params
@@ -0,0 +1,446 @@
+# ==============================================================================
+#                     Yaneurao Game SDK for Brython : Timerなど
+# ==============================================================================
+
+from __future__ import annotations
+
+from browser import document, window, DOMEvent # type:ignore
+
+import traceback
+import gc
+import json
+from array import array
+from time import perf_counter as timer
+# 型の注釈用。実行時は読み込まない。(__init__.pyを参照)
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Callable
+
+
+# ------------------------------------------------------------------------------
+#                              Timerなど
+# ------------------------------------------------------------------------------
+
+# ガベージコレクション(gc.collect())を行うタイミングを決める。
+# 描画中に毎回 gc.collect() を呼ぶとフレームがカクつくので、
+# request()で依頼だけしておき、フレームの処理時間に余裕があった時(か、ブラウザが暇な時)にまとめて行う。
+# GameTimerが1つ持っている。
+# 依頼するのは、1冊ごとにオブジェクトを作る描き方(main.pyの ?renderer=objects のBook)だけ。
+# 既定の描き方(BookField)や ?renderer=layer はオブジェクトを捨てないので依頼せず、一度も行われない。
+#
+# いつ行うか(min_interval、max_delay)はElapsedTimerの時計で決めるので、時計を差し替えたベンチマークでは毎回同じになる。
+# 止まっていた時間(pause)だけは、実際にかかった時間(perf_counter)で測る。
+class GCScheduler:
+    # batch       : これだけ依頼がたまったら、余裕のあるフレームの終わりに行う
+    # headroom    : フレームの処理時間が予算(1000/fps ms)のこの割合以下なら「余裕がある」とみなす
+    # min_interval: 前回から最低限あける時間(秒)
+    # max_delay   : 依頼からこれだけ(秒)経ったら、余裕がなくても行う
+    # clock       : 時計。現在の時刻(ms)を返す関数。省略時はElapsedTimerと同じ。
+    def __init__(self, batch:int = 8, headroom:float = 0.5, min_interval:float = 1.0, max_delay:float = 10.0,
+                 clock:Callable[[],float] | None = None):
+        self.batch = batch
+        self.headroom = headroom
+        self.min_interval = min_interval
+        self.max_delay = max_delay
+        self._clock = ElapsedTimer(clock)
+
+        # まだ行っていない依頼の数と、その最初の依頼の時刻
+        self.pending = 0
+        self._first_request = 0.0
+        # 前回行った時刻
+        self._last_collect = -min_interval
+        # requestIdleCallbackを登録済みならTrue
+        self._idle_scheduled = False
+
+        # 統計
+        # collections : 行った回数
+        # pause_total : 止まっていた時間の合計(ms)
+        # pause_max   : 止まっていた時間の最大(ms)
+        # pauses      : 直近の止まっていた時間(ms)
+        self.collections = 0
+        self.pause_total = 0.0
+        self.pause_max = 0.0
+        self.pauses:list[float] = []
+
+    # gc.collect()を依頼する。(実際に行うのは後で)
+    def request(self):
+        if self.pending == 0:
+            self._first_request = self._clock.now()
+        self.pending += 1
+
+    # いますぐ行う。止まっていた時間(ms)を返す。
+    def collect(self)->float:
+        start = timer()
+        gc.collect()
+        pause = (timer() - start) * 1000
+
+        self.pending = 0
+        self._last_collect = self._clock.now()
+        self.collections += 1
+        self.pause_total += pause
+        self.pause_max = max(self.pause_max, pause)
+        self.pauses.append(pause)
+        if len(self.pauses) > 32:
+            del self.pauses[0]
+        return pause
+
+    # 1フレームの処理が終わった時にGameTimerから呼び出される。
+    # frame_ms  : そのフレームの処理にかかった時間(ms)
+    # budget_ms : 1フレームの予算(ms)
+    def on_frame_end(self, frame_ms:float, budget_ms:float):
+        if self.pending == 0:
+            return
+        now = self._clock.now()
+        if now - self._first_request >= self.max_delay:
+            self.collect()
+            return
+        if now - self._last_collect < self.min_interval:
+            return
+        if self.pending >= self.batch and frame_ms <= budget_ms * self.headroom:
+            self.collect()
+            return
+        # ブラウザが暇な時に行ってもらう。
+        self._schedule_idle()
+
+    # requestIdleCallbackがあれば、暇な時に行うように登録する。
+    def _schedule_idle(self):
+        if self._idle_scheduled:
+            return
+        request_idle = getattr(window, "requestIdleCallback", None)
+        if not request_idle:
+            return
+        self._idle_scheduled = True
+        request_idle(self._on_idle)
+
+    def _on_idle(self, deadline):
+        self._idle_scheduled = False
+        if self.pending == 0:
+            return
+        # 前回止まっていた時間くらいの余裕があれば行う。
+        expected = self.pauses[-1] if self.pauses else 1.0
+        if deadline.timeRemaining() >= expected:
+            self.collect()
+
+    # 統計をdictで返す。
+    def stats(self)->dict:
+        return {
+            "collections": self.collections,
+            "pending"    : self.pending,
+            "pause_total_ms": self.pause_total,
+            "pause_max_ms"  : self.pause_max,
+            "pause_mean_ms" : self.pause_total / self.collections if self.collections else 0.0,
+        }
+
+# フレームの処理時間を段階(phase)ごとに計測する。
+# 各段階の直近size回分の時間(ms)をring bufferに持ち、stats()でp50/p95/p99を返す。
+# GameTimer.profilerに設定しておくと、GameTimerがbegin_frame()、end_frame()を呼び出す。
+# 使い方)
+#   prof = timer.profiler
+#   if prof is not None:
+#       prof.lap("clear")   # 前のlap()(かbegin_frame())からの時間を"clear"として記録する
+# 計測しない時は profiler を None にしておけば、呼び出し側のNoneの確認だけで済む。
+class FrameProfiler:
+    # stats()の結果を作り直す間隔(フレーム数)。毎フレーム並べ替えると重いので。
+    STATS_INTERVAL = 30
+
+    # size : 段階ごとに持っておく回数
+    def __init__(self, size:int = 600):
+        self.size = size
+        # 段階の名前 → 時間(ms)のring buffer。名前は最初に記録した順に並ぶ。
+        self._samples:dict[str, array] = {}
+        # 段階の名前 → 記録した回数
+        self._counts:dict[str, int] = {}
+        self._frame_start = 0.0
+        self._last = 0.0
+        self.frames = 0
+        self._stats:dict[str, dict[str, float]] = {}
+        self._stats_frame = -1
+        # to_json()に含める付加情報(乱数の種、URLのクエリ、入力の記録など)
+        self.meta:dict = {}
+
+    # フレームの処理の開始時に呼び出す。
+    def begin_frame(self):
+        self._frame_start = self._last = timer()
+
+    # 前のlap()(かbegin_frame())から今までの時間をnameの段階として記録する。
+    def lap(self, name:str):
+        now = timer()
+        self.record(name, (now - self._last) * 1000)
+        self._last = now
+
+    # フレームの処理の終了時に呼び出す。フレーム全体の時間を"frame"として記録する。
+    def end_frame(self):
+        self.record("frame", (timer() - self._frame_start) * 1000)
+        self.frames += 1
+
+    # nameの段階の時間(ms)を1つ記録する。
+    def record(self, name:str, ms:float):
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = array('d', bytes(8 * self.size))
+            self._counts[name] = 0
+        count = self._counts[name]
+        samples[count % self.size] = ms
+        self._counts[name] = count + 1
+
+    # nameの段階の記録を古い順に返す。
+    def samples(self, name:str)->list[float]:
+        samples = self._samples[name]
+        count = self._counts[name]
+        if count <= self.size:
+            return samples[:count].tolist()
+        i = count % self.size
+        return (samples[i:] + samples[:i]).tolist()
+
+    # 段階ごとの p50、p95、p99、max(ms) と記録数。
+    # STATS_INTERVALフレームごとにしか作り直さない。
+    def stats(self)->dict[str, dict[str, float]]:
+        if self._stats_frame < 0 or self.frames - self._stats_frame >= FrameProfiler.STATS_INTERVAL:
+            self._stats = {}
+            for name in self._samples:
+                values = sorted(self.samples(name))
+                n = len(values)
+                if n == 0:
+                    continue
+                self._stats[name] = {
+                    "p50": values[min(n - 1, n * 50 // 100)],
+                    "p95": values[min(n - 1, n * 95 // 100)],
+                    "p99": values[min(n - 1, n * 99 // 100)],
+                    "max": values[-1],
+                    "n"  : self._counts[name],
+                }
+            self._stats_frame = self.frames
+        return self._stats
+
+    # 統計と記録をJSON文字列にする。
+    def to_json(self)->str:
+        self._stats_frame = -1
+        return json.dumps({
+            "frames" : self.frames,
+            "size"   : self.size,
+            "stats"  : self.stats(),
+            "samples": {name: self.samples(name) for name in self._samples},
+            "meta"   : self.meta,
+        })
+
+    # to_json()の内容をファイルとしてダウンロードさせる。
+    def download(self, filename:str = "profile.json"):
+        blob = window.Blob.new([self.to_json()], {"type": "application/json"})
+        url = window.URL.createObjectURL(blob)
+        a = document.createElement("a")
+        a.href = url
+        a.download = filename
+        a.click()
+        # すぐに解放すると、FirefoxやSafariではダウンロードが始まる前に取り消されてしまうので、少し待ってから解放する。
+        window.setTimeout(lambda: window.URL.revokeObjectURL(url), 1000)
+
+# ゲーム用の描画ループ
+# 2つの動かし方がある。
+#   use_raf=False : window.setIntervalで 1000/fps ms ごとに呼び出す。
+#   use_raf=True  : window.requestAnimationFrameで画面の更新に合わせて呼び出す。
+#                   画面の更新がfpsより速ければ、fpsを超えないようにフレームを飛ばす。
+# どちらの場合も、タブが非表示の間(document.hidden)は完全に止まる。
+# 前回のフレームからの経過時間(秒)は self.dt で得られる。
+class GameTimer:
+    # dtの上限(秒)。処理落ちなどで間があいた時に、物体が飛ばないようにする。
+    MAX_DT = 0.25
+
+    # clock : 経過時間(dt)の計測に使う時計。現在の時刻(ms)を返す関数。省略時はElapsedTimerと同じ。
+    def __init__(self , onDrawFunction:Callable[[],None] | None = None, fps:int=15, use_raf:bool=False,
+                 clock:Callable[[],float] | None = None):
+
+        self._game_loop = None
+        self._raf_id = None
+        self._on_draw:Callable[[],None] | None = None
+        self.fps = fps
+        self.use_raf = use_raf
+
+        # 前回のフレームからの経過時間(秒)
+        self.dt = 1 / fps
+        self._clock = ElapsedTimer(clock)
+        self._last_frame_time:float | None = None
+        # requestAnimationFrameで、前回呼び出された時刻(ms)と、たまった時間(ms)
+        self._raf_last:float | None = None
+        self._raf_acc = 0.0
+
+        # 描画したフレーム数、fpsを超えないように飛ばした回数
+        self.frames = 0
+        self.skipped = 0
+        # 前回のフレームの処理にかかった時間(ms)
+        self.work_ms = 0.0
+
+        # タブが非表示で止まっている間はTrue
+        self.paused = False
+        self._visibility_hooked = False
+
+        # gc.collect()を行うタイミングの管理
+        self.gc = GCScheduler(clock=clock)
+
+        # フレームの処理時間の計測。計測する時だけFrameProfilerを設定する。
+        self.profiler:FrameProfiler | None = None
+
+        # 描画関数が設定されていれば、即座にstartさせる
+        if onDrawFunction:
+            self.start(onDrawFunction,fps = fps)
+
+    # 描画する関数を登録する。
+    # fps : 1秒間のフレーム数
+    # onDrawFunction : 1フレームごとに呼び出す描画用の関数
+    # use_raf : requestAnimationFrameで動かすか。Noneならコンストラクタで指定したまま。
+    def start(self, onDrawFunction:Callable[[],None],fps:int | float=15, use_raf:bool | None=None):
+
+        # 以前にstart()が呼び出されていたのなら、それを停止させる。
+        self.stop()
+
+        self._on_draw = onDrawFunction
+        self.fps = fps
+        if use_raf is not None:
+            self.use_raf = use_raf
+        self._last_frame_time = None
+
+        self._hook_visibility()
+        if document.hidden:
+            self.paused = True
+            return
+        self.paused = False
+        self._run()
+
+    # fpsを変更する。動いている途中でもよい。
+    def set_fps(self, fps:int | float):
+        if fps == self.fps:
+            return
+        self.fps = fps
+        # setIntervalで動いている時は、間隔を変えて設定し直す。
+        if self._game_loop:
+            self._halt()
+            self._run()
+
+    # 描画する関数onDrawを定期的に呼び出しはじめる
+    def _run(self):
+        if self.use_raf:
+            self._raf_last = None
+            self._raf_acc = 0.0
+            self._raf_id = window.requestAnimationFrame(self._on_animation_frame)
+        else:
+            self._game_loop = window.setInterval(self._gameloop, 1000 / self.fps)
+
+    # 呼び出しを止める
+    def _halt(self):
+        if self._game_loop:
+            window.clearInterval(self._game_loop)
+            self._game_loop = None
+        if self._raf_id:
+            window.cancelAnimationFrame(self._raf_id)
+            self._raf_id = None
+
+    # requestAnimationFrameから呼び出される。timestampの単位はms。
+    def _on_animation_frame(self, timestamp:float):
+        self._raf_id = window.requestAnimationFrame(self._on_animation_frame)
+
+        interval = 1000 / self.fps
+        if self._raf_last is None:
+            # 最初の1回はすぐに描画する
+            self._raf_acc = interval
+        else:
+            self._raf_acc += timestamp - self._raf_last
+        self._raf_last = timestamp
+
+        # 画面の更新がfpsより速い時は、時間がたまるまでフレームを飛ばす。
+        if self._raf_acc < interval:
+            self.skipped += 1
+            return
+        # 遅れた分をまとめて取り返そうとはしない(1回の描画で済ませる)
+        self._raf_acc = min(self._raf_acc - interval, interval)
+        self._gameloop()
+
+    # ゲーム用のループ。例外が出たらそのメッセージとトレースバックを表示
+    def _gameloop(self):
+        try:
+            now = self._clock.now()
+            if self._last_frame_time is None:
+                self.dt = 1 / self.fps
+            else:
+                self.dt = min(now - self._last_frame_time, GameTimer.MAX_DT)
+            self._last_frame_time = now
+
+            prof = self.profiler
+            if prof is not None:
+                prof.begin_frame()
+            start = timer()
+            if self._on_draw:
+                self._on_draw()
+            self.frames += 1
+            if prof is not None:
+                # onDrawのうち、計測していなかった残りの部分
+                prof.lap("other")
+            self.work_ms = (timer() - start) * 1000
+            self.gc.on_frame_end(self.work_ms, 1000 / self.fps)
+            if prof is not None:
+                prof.lap("gc")
+                prof.end_frame()
+        except Exception:
+            from .dialogs import InfoDialog
+            InfoDialog("Exception",traceback.format_exc())
+            self.stop()
+
+    # タブの表示・非表示を監視する
+    def _hook_visibility(self):
+        if self._visibility_hooked:
+            return
+        document.addEventListener("visibilitychange", self._on_visibility_change)
+        self._visibility_hooked = True
+
+    def _on_visibility_change(self, e:DOMEvent):
+        if self._on_draw is None:
+            return
+        if document.hidden:
+            if not self.paused:
+                self._halt()
+                self.paused = True
+        elif self.paused:
+            self.paused = False
+            # 止まっていた間の時間はdtに含めない
+            self._last_frame_time = None
+            self._run()
+
+    # start()で開始させたゲームを終了させる。
+    def stop(self):
+        self._halt()
+        self._on_draw = None
+
+# 経過時間の計測用
+# 時計は、現在の時刻(ms)を返す関数。省略時はブラウザの時計(performance.now())。
+# 同じ結果を再現したい時(ベンチマークなど)は、コンストラクタの clock か set_clock() で差し替える。
+class ElapsedTimer:
+    # 全体の時計。Noneならperformance.now()。
+    clock:Callable[[],float] | None = None
+
+    # すべてのElapsedTimer(clockを指定しなかったもの)の時計を差し替える。Noneで元に戻す。
+    @staticmethod
+    def set_clock(clock:Callable[[],float] | None)->None:
+        ElapsedTimer.clock = clock
+
+    # clock : このタイマーだけの時計。現在の時刻(ms)を返す関数。
+    def __init__(self, clock:Callable[[],float] | None = None):
+        self._clock = clock
+        self.reset()
+
+    # タイマーをリセットする。
+    # elapsed()を呼び出した時に、reset()からの経過時間が返る。
+    # コンストラクタでもreset()を呼び出しているので、コンストラクタ生成からの経過時間が知りたいなら、
+    # このreset()を呼び出す必要はない。
+    def reset(self):
+        # start_time : resetを呼び出してからの経過時間
+        self.start_time = self.now()
+
+    # 経過時間が返る。単位は秒。float型なので0.5秒なら0.5。
+    def elapsed(self)->float:
+        return self.now() - self.start_time
+
+    # 現在の時刻を返す。何かからの経過時間。単位は秒。
+    # ブラウザの時計(performance.now())を使う。requestAnimationFrameに渡される時刻と同じもの。
+    def now(self)->float:
+        clock = self._clock or ElapsedTimer.clock
+        if clock is not None:
+            return clock() / 1000
+        return window.performance.now() / 1000